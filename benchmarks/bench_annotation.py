@@ -0,0 +1,49 @@
+"""Time and peak memory of discrete annotations with a million elements
+
+Every case builds a `ListAnnotationBar` from one categorical column and colors it, as pheatmap
+does for a column annotation. numpy and pandas report their buffers to `tracemalloc`.
+
+    python benchmarks/bench_annotation.py --size 1000000 --categories 10 1000 30000
+"""
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=1000000)
+    parser.add_argument("--categories", type=int, nargs="+", default=[10, 1000, 30000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    from pheatmap._annotation import ListAnnotationBar
+    from pheatmap._utils import HORIZONTAL
+
+    rng = np.random.default_rng(0)
+    for num in args.categories:
+        names = np.array([f"category_{i}" for i in range(num)], dtype=object)
+        anno = pd.DataFrame(dict(group=names[rng.integers(0, num, args.size)]))
+        best, peak = np.inf, 0
+        for _ in range(args.repeat):
+            tracemalloc.start()
+            start = time.perf_counter()
+            bars = ListAnnotationBar(anno, cmaps=dict(), direction=HORIZONTAL)
+            bars.annotationbars[0].get_image(None)
+            best = min(best, time.perf_counter() - start)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        print(json.dumps(dict(
+            size=args.size, categories=num, seconds=best, peak_bytes=peak,
+            codes_dtype=str(bars.annotationbars[0].values.dtype)
+        )))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""Time of exact hierarchical clustering of rows as the number of rows grows
+
+Every case clusters the rows of a normal matrix on one thread: the distances by
+`pairwise_distances`, the linkage by `linkage` and the whole `cluster_order` are timed separately.
+The best of `--repeat` runs is recorded, and a case fails if `cluster_order` takes longer than
+`--max-seconds`.
+
+    python benchmarks/bench_cluster.py --rows 5000 10000 20000 --cols 50 --methods average ward
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+# One core, the BLAS threads would hide the time of the distances
+for _name in ["OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"]:
+    os.environ.setdefault(_name, "1")
+
+import numpy as np  # noqa: E402
+
+
+def _time(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[5000, 10000, 20000])
+    parser.add_argument("--cols", type=int, default=50)
+    parser.add_argument("--methods", nargs="+", default=["average", "ward"])
+    parser.add_argument("--metric", default="euclidean")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--max-seconds", type=float, default=20)
+    args = parser.parse_args()
+
+    from pheatmap._cluster import cluster_order, linkage, pairwise_distances
+
+    rng = np.random.default_rng(0)
+    # Warm up the imports and the BLAS
+    cluster_order(rng.normal(size=(500, args.cols)), args.metric, args.methods[0])
+    failed = False
+    for rows in args.rows:
+        X = rng.normal(size=(rows, args.cols))
+        distances = min(
+            _time(pairwise_distances, X, args.metric, 1024, np.float32)
+            for _ in range(args.repeat)
+        )
+        for method in args.methods:
+            linkages = []
+            for _ in range(args.repeat):
+                dist = pairwise_distances(X, args.metric, 1024, np.float32)
+                linkages.append(_time(linkage, dist, method))
+                del dist
+            total = min(
+                _time(cluster_order, X, args.metric, method) for _ in range(args.repeat)
+            )
+            within = total <= args.max_seconds
+            failed |= not within
+            print(json.dumps(dict(
+                rows=rows, cols=args.cols, metric=args.metric, method=method,
+                distances_seconds=distances, linkage_seconds=min(linkages), seconds=total,
+                within_target=within
+            )), flush=True)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
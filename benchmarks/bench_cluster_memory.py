@@ -0,0 +1,83 @@
+"""Peak memory of approximate clustering as the number of rows grows
+
+Every size runs in a fresh process. The matrix is written to a `numpy.memmap` first, so the peak
+RSS measured is the working memory of `cluster_order` plus the pages of the matrix read.
+
+    python benchmarks/bench_cluster_memory.py --rows 10000 50000 150000 --memory-limit 256e6
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+
+def _rss_kb(field: str) -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+
+def _worker(path: str, nrows: int, ncols: int, memory_limit: float) -> None:
+    import time
+    from pheatmap._cluster import cluster_order
+
+    X = np.memmap(path, dtype=np.float64, mode="r", shape=(nrows, ncols))
+    baseline = _rss_kb("VmRSS")
+    # Reset the peak RSS, so VmHWM only covers clustering
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+    start = time.perf_counter()
+    order = cluster_order(X, method="ward", memory_limit=memory_limit)
+    elapsed = time.perf_counter() - start
+    peak = (_rss_kb("VmHWM") - baseline) * 1024
+    print(json.dumps(dict(
+        rows=nrows, cols=ncols, memory_limit=memory_limit, peak_bytes=peak,
+        seconds=elapsed, within_limit=bool(peak <= memory_limit), n_ordered=len(order)
+    )))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 50000, 150000])
+    parser.add_argument("--cols", type=int, default=50)
+    parser.add_argument("--memory-limit", type=float, default=256e6)
+    parser.add_argument("--worker", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        path, nrows, ncols = args.worker
+        _worker(path, int(nrows), int(ncols), args.memory_limit)
+        return 0
+
+    failed = False
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(30, args.cols)) * 5
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for nrows in args.rows:
+            path = os.path.join(tmpdir, f"mat_{nrows}.dat")
+            X = np.memmap(path, dtype=np.float64, mode="w+", shape=(nrows, args.cols))
+            for start in range(0, nrows, 10000):
+                stop = min(start + 10000, nrows)
+                X[start:stop] = centers[rng.integers(0, 30, stop - start)] + \
+                    rng.normal(size=(stop - start, args.cols))
+            X.flush()
+            del X
+            result = subprocess.run(
+                [sys.executable, __file__, "--memory-limit", str(args.memory_limit),
+                 "--worker", path, str(nrows), str(args.cols)],
+                check=True, capture_output=True, text=True
+            )
+            record = json.loads(result.stdout)
+            failed |= not record["within_limit"]
+            print(json.dumps(record))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""Time of splitting a tall heatmap into groups by gaps against no gaps and composing a figure for
+every group
+
+Every case plots a matrix with a row annotation, downsampled by "mean", and saves it as PNG at
+100 dpi. "split" passes `gaps_row` between equal groups, "none" has no gaps, and "compose" draws
+every group by its own `pheatmap` call with the same `vmin`/`vmax`, as people emulate splits
+without gaps.
+
+    python benchmarks/bench_gaps.py --rows 50000 --groups 1 5 20 100
+"""
+import argparse
+import io
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def _render(mat: np.ndarray, anno: pd.DataFrame, groups: int, method: str) -> float:
+    from pheatmap import pheatmap
+
+    start = time.perf_counter()
+    bounds = np.linspace(0, mat.shape[0], groups + 1).astype(int)
+    if method == "compose":
+        vmin, vmax = np.min(mat), np.max(mat)
+        for top, bottom in zip(bounds[:-1], bounds[1:]):
+            fig = pheatmap(
+                mat[top:bottom], vmin=vmin, vmax=vmax, annotation_row=anno.iloc[top:bottom],
+                downsample="mean", show_rownames=False, height=6 / groups + 1
+            )
+            fig.savefig(io.BytesIO(), format="png", dpi=100)
+    else:
+        fig = pheatmap(
+            mat, annotation_row=anno, downsample="mean", show_rownames=False,
+            gaps_row=bounds[1:-1] if method == "split" else None
+        )
+        fig.savefig(io.BytesIO(), format="png", dpi=100)
+    return time.perf_counter() - start
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--cols", type=int, default=200)
+    parser.add_argument("--groups", type=int, nargs="+", default=[1, 5, 20, 100])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    mat = rng.normal(size=(args.rows, args.cols))
+    anno = pd.DataFrame(dict(
+        group=rng.choice(["a", "b", "c"], args.rows), score=rng.random(args.rows)))
+    # Warm up the imports, fonts and colormaps
+    _render(mat[:100], anno.iloc[:100], 1, "none")
+    for groups in args.groups:
+        for method in ["none", "split", "compose"]:
+            seconds = min(_render(mat, anno, groups, method) for _ in range(args.repeat))
+            print(json.dumps(dict(
+                rows=args.rows, groups=groups, method=method, seconds=seconds
+            )))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""Time of concatenating heatmaps which share rows by `HeatmapList` against a `pheatmap` call for
+every matrix
+
+Every case plots matrices of the same rows with a row annotation, clusters the rows, downsamples
+by "mean", and saves the figures as PNG at 100 dpi. "list" clusters the rows of the first matrix
+once and draws all heatmaps in one figure, "separate" calls `pheatmap` for every matrix with its
+own clustering and annotation, as people put heatmaps side by side without `HeatmapList`.
+
+    python benchmarks/bench_heatmap_list.py --rows 1000 5000 --cols 200 100 30
+"""
+import argparse
+import io
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def _render(mats: list, anno: pd.DataFrame, method: str) -> float:
+    from pheatmap import HeatmapList, pheatmap
+
+    start = time.perf_counter()
+    if method == "list":
+        fig = HeatmapList(
+            mats, cluster_rows=True, annotation_row=anno, downsample="mean", show_rownames=False
+        ).plot()
+        fig.savefig(io.BytesIO(), format="png", dpi=100)
+    else:
+        for mat in mats:
+            fig = pheatmap(
+                mat, cluster_rows=True, annotation_row=anno, downsample="mean",
+                show_rownames=False
+            )
+            fig.savefig(io.BytesIO(), format="png", dpi=100)
+    return time.perf_counter() - start
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--cols", type=int, nargs="+", default=[200, 100, 30])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    # Warm up the imports, fonts and colormaps
+    mats = [pd.DataFrame(rng.normal(size=(50, cols))) for cols in args.cols]
+    anno = pd.DataFrame(dict(group=rng.choice(["a", "b", "c"], 50), score=rng.random(50)))
+    _render(mats, anno, "list")
+    for rows in args.rows:
+        mats = [pd.DataFrame(rng.normal(size=(rows, cols))) for cols in args.cols]
+        anno = pd.DataFrame(dict(
+            group=rng.choice(["a", "b", "c"], rows), score=rng.random(rows)))
+        for method in ["separate", "list"]:
+            seconds = min(_render(mats, anno, method) for _ in range(args.repeat))
+            print(json.dumps(dict(
+                rows=rows, heatmaps=len(mats), method=method, seconds=seconds
+            )))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""Import time of pheatmap, measured by `python -X importtime`
+
+Every statement runs in a fresh interpreter several times and the best cumulative time of the
+slowest top-level import is reported. Use `--max-ms` to fail on regressions:
+
+    python benchmarks/bench_import.py --max-ms 50
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+STATEMENTS = {
+    "import pheatmap": "import pheatmap",
+    "from pheatmap import pheatmap": "from pheatmap import pheatmap",
+}
+# Never imported by pheatmap itself
+FORBIDDEN = ["matplotlib.pyplot", "pandas"]
+
+
+def _toplevel_imports(stderr: str) -> dict:
+    """Parse lines of "import time: self [us] | cumulative | imported package", top-level imports
+    have no indentation"""
+    imports = dict()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):
+            imports[name.strip()] = int(cumulative)
+    return imports
+
+
+def importtime(statement: str) -> dict:
+    """Run `statement` in a fresh interpreter, return the cumulative microseconds of the imports
+    it triggers and the forbidden modules loaded"""
+    check = f"import sys, json; print(json.dumps([m for m in {FORBIDDEN!r} if m in sys.modules]))"
+    startup = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import sys, json"],
+        check=True, capture_output=True, text=True
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"{statement}; {check}"],
+        check=True, capture_output=True, text=True
+    )
+    # Imports of the interpreter startup and the check itself are not counted
+    baseline = _toplevel_imports(startup.stderr)
+    imports = _toplevel_imports(result.stderr)
+    total = sum(v for k, v in imports.items() if k not in baseline)
+    return dict(microseconds=total, forbidden=json.loads(result.stdout))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=None,
+                        help="fail if `import pheatmap` is slower than it")
+    args = parser.parse_args()
+
+    failed = False
+    for label, statement in STATEMENTS.items():
+        runs = [importtime(statement) for _ in range(args.repeat)]
+        best = min(run["microseconds"] for run in runs) / 1000
+        forbidden = runs[0]["forbidden"]
+        failed |= bool(forbidden)
+        if label == "import pheatmap" and args.max_ms is not None:
+            failed |= best > args.max_ms
+        print(json.dumps(dict(statement=label, best_ms=best, forbidden_modules=forbidden)))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""Time of showing the values of cells by `display_numbers` against a `Text` for every cell
+
+Every case plots a square matrix with 0.2 inch cells, and saves it as PNG at 72 dpi. "pheatmap"
+draws the numbers by `display_numbers=True`, "text" adds them by `ax.text` for every cell as
+people do without it, and "none" shows no numbers. The "text" method is only timed up to
+`--max-text-cells`, as it takes minutes for larger matrices.
+
+    python benchmarks/bench_numbers.py --sizes 10 30 100 200 316
+"""
+import argparse
+import io
+import json
+import sys
+import time
+
+import numpy as np
+
+
+def _render(mat: np.ndarray, method: str) -> tuple:
+    from pheatmap import pheatmap
+
+    size = 0.2 * mat.shape[0] + 2
+    start = time.perf_counter()
+    fig = pheatmap(
+        mat, display_numbers=method == "pheatmap", number_format="%.1f", fontsize_number=4,
+        width=size, height=size, show_rownames=False, show_colnames=False
+    )
+    if method == "text":
+        ax = fig.axes[0]
+        for (row, col), value in np.ndenumerate(mat):
+            ax.text(col, row, f"{value:.1f}", ha="center", va="center", size=4)
+    built = time.perf_counter()
+    fig.savefig(io.BytesIO(), format="png", dpi=72)
+    return built - start, time.perf_counter() - built
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 30, 100, 200, 316])
+    parser.add_argument("--max-text-cells", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    # Warm up the imports, fonts and colormaps
+    _render(rng.normal(size=(5, 5)), "pheatmap")
+    for size in args.sizes:
+        mat = rng.normal(size=(size, size))
+        for method in ["none", "pheatmap", "text"]:
+            if method == "text" and mat.size > args.max_text_cells:
+                continue
+            timings = [_render(mat, method) for _ in range(args.repeat)]
+            build, draw = min(timings, key=sum)
+            print(json.dumps(dict(
+                cells=mat.size, method=method, build_seconds=build, savefig_seconds=draw,
+                seconds=build + draw
+            )))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""Peak memory of rendering a `.npy` matrix larger than the memory budget
+
+Every size runs in a fresh process. The matrix is saved to a `.npy` file first, then `pheatmap`
+renders the path of the file, so it's read by row chunks. Pages of the memory-mapped file are
+counted in RSS but the kernel reclaims them under pressure, so the anonymous RSS(`RssAnon`) is
+sampled instead, which is the memory pheatmap really holds.
+
+    python benchmarks/bench_out_of_core.py --rows 200000 1000000 --cols 200
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+
+def _rss_kb(field: str) -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+
+def _worker(path: str) -> None:
+    import threading
+    import time
+    from pheatmap import pheatmap
+
+    # Import matplotlib before the measurement
+    pheatmap(np.zeros((2, 2)))
+    baseline = _rss_kb("RssAnon")
+    samples = [baseline]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(0.005):
+            samples.append(_rss_kb("RssAnon"))
+
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    start = time.perf_counter()
+    fig = pheatmap(path, downsample="max", show_rownames=False, show_colnames=False)
+    fig.savefig(os.devnull, format="png")
+    elapsed = time.perf_counter() - start
+    done.set()
+    sampler.join()
+    peak = (max(samples) - baseline) * 1024
+    print(json.dumps(dict(
+        path_bytes=os.path.getsize(path), peak_bytes=peak, seconds=elapsed
+    )))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[200000, 1000000])
+    parser.add_argument("--cols", type=int, default=200)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        _worker(args.worker)
+        return 0
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for nrows in args.rows:
+            path = os.path.join(tmpdir, f"mat_{nrows}.npy")
+            X = np.lib.format.open_memmap(
+                path, mode="w+", dtype=np.float64, shape=(nrows, args.cols))
+            for start in range(0, nrows, 10000):
+                stop = min(start + 10000, nrows)
+                X[start:stop] = rng.normal(size=(stop - start, args.cols))
+            X.flush()
+            del X
+            result = subprocess.run(
+                [sys.executable, __file__, "--worker", path],
+                check=True, capture_output=True, text=True
+            )
+            record = json.loads(result.stdout)
+            record.update(rows=nrows, cols=args.cols)
+            print(json.dumps(record))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
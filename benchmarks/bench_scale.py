@@ -0,0 +1,59 @@
+"""Peak memory and time of row z-scores, the pandas idiom against `scale_matrix`
+
+numpy and pandas report their buffers to `tracemalloc`, so the peak traced memory is the memory
+allocated by scaling beyond the input. The input of the in-place case is a writable ndarray, as
+pandas with copy-on-write only exposes read-only views of DataFrames.
+
+    python benchmarks/bench_scale.py --rows 20000 --cols 1000
+"""
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+
+def _pandas_row(df: pd.DataFrame):
+    return df.sub(df.mean(axis=1), axis=0).div(df.std(axis=1), axis=0).to_numpy()
+
+
+def _cases():
+    """Every case is (the input made before tracing, the scaling traced)"""
+    from pheatmap._scale import scale_matrix
+    return {
+        "pandas": (pd.DataFrame, _pandas_row),
+        "scale_matrix float64": (pd.DataFrame, lambda df: scale_matrix(df.to_numpy(), "row")),
+        "scale_matrix float32": (
+            pd.DataFrame, lambda df: scale_matrix(df.to_numpy(), "row", dtype=np.float32)),
+        "scale_matrix inplace": (np.array, lambda mat: scale_matrix(mat, "row", inplace=True)),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--cols", type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for name, (make_input, func) in _cases().items():
+        mat = make_input(rng.normal(size=(args.rows, args.cols)))
+        tracemalloc.start()
+        start = time.perf_counter()
+        scaled = func(mat)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(json.dumps(dict(
+            method=name, rows=args.rows, cols=args.cols, input_bytes=np.asarray(mat).nbytes,
+            peak_bytes=peak, seconds=elapsed, dtype=str(scaled.dtype)
+        )))
+        del mat, scaled
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""Time and peak memory of exporting a `.npy` matrix as a tile pyramid
+
+Every size runs in a fresh process. The matrix is saved to a `.npy` file first, then
+`export_tiles` streams it to DZI tiles. The anonymous RSS(`RssAnon`) is sampled as in
+`bench_out_of_core.py`, the pages of the memory-mapped file are not counted.
+
+    python benchmarks/bench_tiles.py --rows 100000 500000 --cols 500 --workers 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+
+def _rss_kb(field: str) -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+
+def _worker(path: str, out: str, workers: int) -> None:
+    import threading
+    import time
+    from pheatmap import export_tiles
+
+    baseline = _rss_kb("RssAnon")
+    samples = [baseline]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(0.005):
+            samples.append(_rss_kb("RssAnon"))
+
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    start = time.perf_counter()
+    manifest = export_tiles(path, out, n_workers=workers)
+    elapsed = time.perf_counter() - start
+    done.set()
+    sampler.join()
+    peak = (max(samples) - baseline) * 1024
+    print(json.dumps(dict(
+        path_bytes=os.path.getsize(path), peak_bytes=peak, seconds=elapsed,
+        tiles=manifest["num_tiles"]
+    )))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 500000])
+    parser.add_argument("--cols", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--worker", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        _worker(*args.worker, args.workers)
+        return 0
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for nrows in args.rows:
+            path = os.path.join(tmpdir, f"mat_{nrows}.npy")
+            X = np.lib.format.open_memmap(
+                path, mode="w+", dtype=np.float64, shape=(nrows, args.cols))
+            for start in range(0, nrows, 10000):
+                stop = min(start + 10000, nrows)
+                X[start:stop] = rng.normal(size=(stop - start, args.cols))
+            X.flush()
+            del X
+            out = os.path.join(tmpdir, f"tiles_{nrows}")
+            result = subprocess.run(
+                [sys.executable, __file__, "--worker", path, out, "--workers", str(args.workers)],
+                check=True, capture_output=True, text=True
+            )
+            record = json.loads(result.stdout)
+            record.update(rows=nrows, cols=args.cols, workers=args.workers)
+            print(json.dumps(record))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
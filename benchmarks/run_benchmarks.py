@@ -0,0 +1,242 @@
+"""Time and peak memory of pheatmap and savefig over matrix sizes, annotations and formats
+
+Every case runs in a fresh process, so the peak memory of one case isn't hidden by the heap of
+another. A case makes its matrix and annotations first, then times `pheatmap` and `savefig`
+separately, and samples the anonymous RSS(`RssAnon`, Linux only) of each of them, which counts the
+buffers of the Agg renderer as well. The stage timings of `pheatmap.profile` are recorded too.
+
+The grid sweeps one factor at a time around a base case: the rows, the columns, the number of row
+and column annotations(every annotation adds a legend), the labels, the edges and the output
+format. The results are written as JSON with the commit, so two commits can be compared:
+
+    python benchmarks/run_benchmarks.py --quick --output before.json
+    python benchmarks/run_benchmarks.py --quick --output after.json
+    python benchmarks/run_benchmarks.py --compare before.json after.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+# The case which every sweep changes one factor of
+BASE = dict(
+    rows=1000, cols=100, row_annotations=0, col_annotations=0, names=False, edges=False,
+    format="png"
+)
+# The matrices larger than it are downsampled, as pheatmap recommends for large matrices
+MAX_RESOLUTION = 4096
+
+
+def _grid(quick: bool):
+    sizes = [100, 1000, 10000, 100000] if quick else [100, 1000, 10000, 100000, 1000000]
+    annotations = [0, 5, 20] if quick else [0, 5, 10, 20, 50]
+    sweeps = dict(
+        rows=sizes, cols=sizes if quick else sizes[:-1], row_annotations=annotations,
+        col_annotations=annotations, names=[False, True], edges=[False, True],
+        format=["png", "pdf", "svg"]
+    )
+    cases = []
+    for factor, values in sweeps.items():
+        for value in values:
+            case = dict(BASE, **{factor: value})
+            if case not in cases:
+                cases.append(case)
+    return cases
+
+
+def _rss_kb() -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("RssAnon"):
+                return int(line.split()[1])
+    raise KeyError("RssAnon")
+
+
+def _measure(func):
+    """Call `func`, return its result, the seconds and the peak anonymous RSS in bytes"""
+    baseline = _rss_kb()
+    samples = [baseline]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(0.005):
+            samples.append(_rss_kb())
+
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    start = time.perf_counter()
+    try:
+        result = func()
+    finally:
+        elapsed = time.perf_counter() - start
+        done.set()
+        sampler.join()
+    samples.append(_rss_kb())
+    return result, elapsed, (max(samples) - baseline) * 1024
+
+
+def _annotation(num: int, size: int, rng: np.random.Generator, prefix: str):
+    import pandas as pd
+    anno = dict()
+    for i in range(num):
+        # Half continuous and half discrete, the discrete ones with 8 categories
+        if i % 2 == 0:
+            anno[f"{prefix}{i}"] = rng.normal(size=size)
+        else:
+            anno[f"{prefix}{i}"] = np.array(list("abcdefgh"))[rng.integers(0, 8, size)]
+    return pd.DataFrame(anno) if num > 0 else None
+
+
+def _worker(case: dict) -> dict:
+    from pheatmap import pheatmap, profile
+
+    # Import matplotlib and warm the caches before the measurement
+    pheatmap(np.zeros((2, 2))).savefig(io.BytesIO(), format=case["format"])
+
+    rng = np.random.default_rng(0)
+    mat = rng.normal(size=(case["rows"], case["cols"]))
+    annotation_row = _annotation(case["row_annotations"], case["rows"], rng, "row")
+    annotation_col = _annotation(case["col_annotations"], case["cols"], rng, "col")
+    large = max(case["rows"], case["cols"]) > MAX_RESOLUTION
+    bars = max(case["row_annotations"], case["col_annotations"], 1)
+    legends = 1 + case["row_annotations"] + case["col_annotations"]
+    kwargs = dict(
+        annotation_row=annotation_row, annotation_col=annotation_col,
+        show_rownames=case["names"], show_colnames=case["names"],
+        rownames_thinning=case["names"], colnames_thinning=case["names"],
+        edgecolor="white" if case["edges"] else "none",
+        downsample="mean" if large else None,
+        # The bars and legends are sized relative to the figure, so narrow them to fit
+        annotation_bar_width=min(0.03, 0.15 / (1.2 * bars)),
+        legend_bar_width=min(1.5 * 0.03, 0.3 / (2 * legends))
+    )
+    with profile() as prof:
+        fig, pheatmap_seconds, pheatmap_peak = _measure(lambda: pheatmap(mat, **kwargs))
+        buffer = io.BytesIO()
+        _, savefig_seconds, savefig_peak = _measure(
+            lambda: fig.savefig(buffer, format=case["format"]))
+    return dict(
+        case, legends=legends,
+        pheatmap_seconds=pheatmap_seconds, pheatmap_peak_bytes=pheatmap_peak,
+        savefig_seconds=savefig_seconds, savefig_peak_bytes=savefig_peak,
+        output_bytes=buffer.tell(), stages=prof.stages, artists=prof.artists
+    )
+
+
+def _key(result: dict) -> str:
+    return ",".join(f"{factor}={result[factor]}" for factor in BASE)
+
+
+def _run(case: dict, repeat: int) -> dict:
+    """Run a case `repeat` times, keep the least seconds and the largest peak of them"""
+    best = None
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, __file__, "--worker", json.dumps(case)],
+            capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            # A worker killed by a signal, such as the OOM killer, prints nothing
+            lines = proc.stderr.strip().splitlines()
+            return dict(case, error=lines[-1] if lines else f"exit {proc.returncode}")
+        result = json.loads(proc.stdout.splitlines()[-1])
+        if best is None:
+            best = result
+            continue
+        for field in ["pheatmap_seconds", "savefig_seconds"]:
+            if result[field] < best[field]:
+                best[field] = result[field]
+                if field == "pheatmap_seconds":
+                    best["stages"] = result["stages"]
+        for field in ["pheatmap_peak_bytes", "savefig_peak_bytes"]:
+            best[field] = max(best[field], result[field])
+    return best
+
+
+def _metadata() -> dict:
+    import matplotlib
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return dict(
+        commit=commit, python=platform.python_version(), numpy=np.__version__,
+        matplotlib=matplotlib.__version__, machine=platform.machine(),
+        system=platform.system(), cpus=os.cpu_count(),
+        time=time.strftime("%Y-%m-%dT%H:%M:%S%z")
+    )
+
+
+def _write(path: str, report: dict) -> None:
+    """Replace the report at `path`, it's never left half written"""
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(report, f, indent=1)
+    os.replace(f"{path}.tmp", path)
+
+
+def _compare(old_path: str, new_path: str, threshold: float) -> int:
+    """Print the ratios of new to old of every case, return the number of regressions"""
+    with open(old_path) as f:
+        old = {_key(result): result for result in json.load(f)["results"]}
+    with open(new_path) as f:
+        new = json.load(f)["results"]
+    fields = [
+        "pheatmap_seconds", "savefig_seconds", "pheatmap_peak_bytes", "savefig_peak_bytes"
+    ]
+    regressions = 0
+    for result in new:
+        before = old.get(_key(result))
+        if before is None or "error" in before or "error" in result:
+            continue
+        ratios = dict()
+        for field in fields:
+            # Peaks under a megabyte are noise of the sampling
+            floor = 2 ** 20 if field.endswith("bytes") else 1e-3
+            ratios[field] = max(result[field], floor) / max(before[field], floor)
+        regressed = [field for field, ratio in ratios.items() if ratio > 1 + threshold]
+        regressions += len(regressed) > 0
+        print(json.dumps(dict(case=_key(result), **ratios, regressed=regressed)))
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="sizes up to 1e5 and fewer annotations")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    parser.add_argument(
+        "--threshold", type=float, default=0.2,
+        help="the ratio above 1 which --compare reports as a regression"
+    )
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        print(json.dumps(_worker(json.loads(args.worker))))
+        return 0
+    if args.compare is not None:
+        return 1 if _compare(*args.compare, args.threshold) > 0 else 0
+
+    metadata, results = _metadata(), []
+    for case in _grid(args.quick):
+        result = _run(case, args.repeat)
+        print(json.dumps(result), flush=True)
+        results.append(result)
+        # Written after every case, so the finished cases are kept if the sweep is stopped
+        _write(args.output, dict(metadata=metadata, results=results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -32,6 +32,9 @@ setup(
     packages=find_packages(where="src", exclude=["tests"]),  # Required
     python_requires=">=3.8, <4",
     install_requires=["numpy", "matplotlib", "pandas"],  # Optional
+    entry_points={  # Optional
+        "console_scripts": ["pheatmap=pheatmap._cli:main"]
+    },
     extras_require={  # Optional
         "dev": ["sphinx", "myst-parser"]
     },
@@ -1 +1,36 @@
-from ._pheatmap import pheatmap
+"""pheatmap for Python
+
+Heavy modules(matplotlib, the renderers) are imported on the first access of the public functions,
+so `import pheatmap` is cheap, see PEP 562.
+"""
+import importlib
+
+# The public names and the modules which define them
+_LAZY_ATTRS = {
+    "pheatmap": "._pheatmap",
+    "pheatmap_batch": "._batch",
+    "BatchResult": "._batch",
+    "pheatmap_pages": "._pages",
+    "PheatmapHandle": "._handle",
+    "cmap_cache_info": "._utils",
+    "clear_cmap_cache": "._utils",
+    "profile": "._profile",
+    "export_tiles": "._tiles",
+    "RenderCache": "._render_cache",
+    "HeatmapList": "._heatmap_list",
+}
+
+__all__ = list(_LAZY_ATTRS)
+
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRS:
+        value = getattr(importlib.import_module(_LAZY_ATTRS[name], __name__), name)
+        # Cache it, so `__getattr__` is only called once for every name
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
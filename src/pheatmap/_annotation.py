@@ -1,19 +1,32 @@
-import pandas as pd
+from __future__ import annotations
 import numpy as np
-import matplotlib.pyplot as plt
 from numpy import ndarray, number
-from pandas import DataFrame, Series
-from typing import Union, Dict, Tuple, List
+from typing import Union, Dict, Tuple, List, TYPE_CHECKING
 from matplotlib.colors import Colormap, Normalize, BoundaryNorm
 from matplotlib.axes import Axes
-from ._utils import get_norm, get_cmap, cycle_cmap, CONTINUOUS, DISCRETE, HORIZONTAL, VERTICAL
+from ._utils import (
+    get_norm, get_cmap, cycle_cmap, map_colors, CONTINUOUS, DISCRETE, HORIZONTAL, VERTICAL
+)
+from ._downsample import (
+    check_downsample_method, downsample, binned_gaps, axes_pixel_size, FIRST
+)
+from ._gaps import (
+    GAP_SIZE, check_gaps, gap_width, group_bounds, group_extents, imshow_groups, set_groups_data
+)
+
+if TYPE_CHECKING:
+    # pandas is only used by type hints, annotations are passed in by users
+    from pandas import DataFrame, Series
 
 
 def _object2categrey(anno: DataFrame) -> DataFrame:
-    """Transform columns without `category` or `numpy.number` type to `category`"""
+    """Transform columns without `category` or `numpy.number` type to `category`, other columns
+    are not copied"""
     need_transform_columns = anno.select_dtypes(exclude=[np.number, "category"]).columns
-    return anno.apply(lambda x: x.astype("category") if x.name in need_transform_columns else x,
-                      axis=0)
+    anno = anno.copy(deep=False)
+    for column in need_transform_columns:
+        anno[column] = anno[column].astype("category")
+    return anno
 
 
 def _get_bartype(values: Series) -> str:
@@ -34,12 +47,12 @@ def _transform_discrete_values(values: Series) -> Tuple[ndarray, Dict[str, numbe
     Returns
     -------
     Tuple[ndarray, Dict[str, number]]
-        return transformed numeric values and categories-numbers mapper
+        return the categorical codes(int8/int16/..., -1 is missing) without copy and
+        categories-numbers mapper
     """
     values_order = values.dtype.categories.to_list()
     values_mapper = {k: v for v, k in enumerate(values_order)}
-    values = values.map(values_mapper)
-    return values, values_mapper
+    return values.cat.codes.rename(values.name), values_mapper
 
 
 class AnnotationBar:
@@ -47,30 +60,44 @@ class AnnotationBar:
         self,
         values: ndarray, cmap: Union[str, Colormap, List],
         values_mapper: Dict[str, number] = None,
-        name: str = None, vmin: float = None, vmax: float = None,
+        name: str = None, vmin: Union[float, str] = None, vmax: Union[float, str] = None,
         bartype: str = CONTINUOUS, direction: str = HORIZONTAL,
-        tick_labels_params: Dict = dict(size=6)
+        tick_labels_params: Dict = dict(size=6), downsample: str = None, order: ndarray = None,
+        gaps: ndarray = None, gap_size: float = GAP_SIZE
     ) -> None:
         """single AnnotationBar
 
         Parameters
         ----------
         values : ndarray
-            values are used to draw annotation bar
+            values are used to draw annotation bar. DISCRETE values are the numbers of categories
+            in `values_mapper`, such as categorical codes, and -1 is missing
         cmap : Union[str, Colormap, List]
             colormap for annotation bar
         values_mapper : Dict[str, number], optional
             values_mapper is used to create legend for DISCRETE values, by default None
         name : str, optional
             AnnotationBar name, show it on the bar side and its legend, by default None
-        vmin : float, optional
-            the minemum value scaled. `None` means use the minemum value of values. by default None
-        vmax : float, optional
+        vmin : Union[float, str], optional
+            the minemum value scaled. `None` means use the minemum value of values. A percentile
+            such as "p1" or "symmetric" are supported, see `Heatmap`. by default None
+        vmax : Union[float, str], optional
             the maximum value scaled. `None` means use the maximum value of values. by default None
         bartype : str, optional
             bar values are CONTINUOUS or DISCRETE, by default CONTINUOUS
         direction : str, optional
             visualize bar as HORIZONTAL or VERTICAL, by default HORIZONTAL
+        downsample : str, optional
+            aggregate the values to the pixel grid of its Axes before rendering, see `Heatmap`.
+            DISCRETE values are always aggregated by "first". by default None
+        order : ndarray, optional
+            the indices of values in the order to show, the same as the order of its heatmap's
+            rows/columns. by default None, keep the original order
+        gaps : ndarray, optional
+            split the values shown at these positions, the same as the gaps of its heatmap's
+            rows/columns, see `Heatmap`. by default None, no gaps
+        gap_size : float, optional
+            the size of gaps in points, by default 4
         """
         self.name = name
         self.direction = direction
@@ -80,8 +107,20 @@ class AnnotationBar:
         self.values = self._check_direction(values)
         self.values_mapper = values_mapper
         self.cmap = get_cmap(cmap, self.bartype)
+        self.vmin, self.vmax = vmin, vmax
         self.norm = self._get_norm(vmin, vmax)
         self.tick_labels_params = tick_labels_params
+        self.downsample = check_downsample_method(downsample)
+        self.order = order
+        self.gaps = check_gaps(gaps, self.values.size, "col" if direction == HORIZONTAL else "row")
+        self.gap_size = gap_size
+        # The images of the groups split by gaps
+        self.images = []
+
+    @property
+    def image(self):
+        """The image drawn, the first group's if it's split by gaps"""
+        return self.images[0] if len(self.images) > 0 else None
 
     def _check_bartype(self, bartype: str) -> str:
         """Validate `bar_type`"""
@@ -99,14 +138,14 @@ class AnnotationBar:
         else:
             raise KeyError(f"`direction` have to be chose from {[HORIZONTAL, VERTICAL]}!")
 
-    def _get_norm(self, vmin: float, vmax: float) -> Normalize:
+    def _get_norm(self, vmin: Union[float, str], vmax: Union[float, str]) -> Normalize:
         """`Normalize` for CONTINUOUS and `BoundaryNorm` for DISCRETE
 
         Parameters
         ----------
-        vmin : float
+        vmin : Union[float, str]
             the minemum value scaled
-        vmax : float
+        vmax : Union[float, str]
             the maximum value scaled
 
         Returns
@@ -122,6 +161,22 @@ class AnnotationBar:
             bounds = np.arange(-0.5, num_colors)
             return BoundaryNorm(bounds, num_colors)
 
+    def set_values(self, values: ndarray) -> None:
+        """Replace the values by ones of the same size, DISCRETE values must be the numbers of the
+        same categories. The norm of CONTINUOUS values is computed again from `vmin` and `vmax`.
+
+        Raises
+        ------
+        ValueError
+            If the size of `values` is not the size of the values, will raise ValueError
+        """
+        values = self._check_direction(values)
+        if values.shape != self.values.shape:
+            raise ValueError(f"The size of the new values of '{self.name}' is not match!")
+        self.values = values
+        if self.bartype == CONTINUOUS:
+            self.norm = get_norm(self.values, self.vmin, self.vmax)
+
     def _get_name_attrs(self) -> Dict:
         """Config name's attrs used in visualized
 
@@ -141,8 +196,60 @@ class AnnotationBar:
             side_dict["labelrotation"] = 90
         return side_dict
 
+    def _get_render_values(self, ax: Axes) -> ndarray:
+        """Get the values rendered in `ax`, reordered and downsampled to the pixel grid of `ax` if
+        required"""
+        values = self.values
+        if self.order is not None:
+            values = np.take(values, self.order, axis=1 if self.direction == HORIZONTAL else 0)
+        if self.downsample is None:
+            return values
+        method = FIRST if self.bartype == DISCRETE else self.downsample
+        height, width = axes_pixel_size(ax)
+        if self.direction == HORIZONTAL:
+            return downsample(values, height, width, method, col_gaps=self.gaps)
+        return downsample(values, height, width, method, row_gaps=self.gaps)
+
+    def get_bounds(self, ax: Axes, image: ndarray) -> tuple:
+        """Get the (row, column) bounds of the groups split by gaps in `image` rendered in `ax`,
+        see `group_bounds`"""
+        along = 1 if self.direction == HORIZONTAL else 0
+        gaps = self.gaps
+        if self.downsample is not None:
+            gaps = binned_gaps(self.values.size, axes_pixel_size(ax)[along], gaps)
+        along_bounds = group_bounds(gaps, image.shape[along])
+        across_bounds = group_bounds([], image.shape[1 - along])
+        if self.direction == HORIZONTAL:
+            return across_bounds, along_bounds
+        return along_bounds, across_bounds
+
+    def get_extents(self, ax: Axes, across_extents: tuple) -> tuple:
+        """Get the (row, column) extents of the groups split by gaps in `ax`, see `group_extents`.
+        The extents across the bar are `across_extents`."""
+        num = self.values.size
+        axis = "col" if self.direction == HORIZONTAL else "row"
+        along_extents = group_extents(
+            self.gaps, num, gap_width(ax, axis, self.gaps, num, self.gap_size))
+        if self.direction == HORIZONTAL:
+            return across_extents, along_extents
+        return along_extents, across_extents
+
+    def get_image(self, ax: Axes) -> ndarray:
+        """Get the uint8 RGBA image of the bar rendered in `ax`, DISCRETE values are categorical
+        codes which index the colors directly"""
+        norm = self.norm if self.bartype == CONTINUOUS else None
+        return map_colors(self._get_render_values(ax), self.cmap, norm)
+
+    def update_image(self) -> None:
+        """Update the drawn images by the values set"""
+        ax = self.image.axes
+        image = self.get_image(ax)
+        set_groups_data(self.images, image, *self.get_bounds(ax, image))
+
     def draw(self, ax: Axes) -> None:
-        ax.imshow(self.values, norm=self.norm, cmap=self.cmap, aspect="auto")
+        image = self.get_image(ax)
+        self.images = imshow_groups(
+            ax, image, *self.get_bounds(ax, image), *self.get_extents(ax, ([-0.5], [0.5])))
         ax.tick_params(
             axis="both", pad=0, top=False, bottom=False, left=False, right=False,
             **self.name_attrs
@@ -161,7 +268,8 @@ class ListAnnotationBar:
     def __init__(
         self, anno: DataFrame, cmaps: Dict[str, Union[str, Colormap, List]],
         direction: str = HORIZONTAL, show_names: bool = True,
-        tick_labels_params: Dict = dict(size=6)
+        tick_labels_params: Dict = dict(size=6), downsample: str = None, order: ndarray = None,
+        limits: Dict[str, Tuple] = None, gaps: ndarray = None, gap_size: float = GAP_SIZE
     ) -> None:
         """Contain multiple Annotationbars
 
@@ -176,6 +284,18 @@ class ListAnnotationBar:
         show_names : bool, optional
             show AnnotationBar name or not, by default True
         tick_labels_params: Dict
+        downsample : str, optional
+            aggregate the values to the pixel grid before rendering, see `AnnotationBar`. by
+            default None
+        order : ndarray, optional
+            the indices of values in the order to show, see `AnnotationBar`. by default None
+        limits : Dict[str, Tuple], optional
+            the (vmin, vmax) of CONTINUOUS Annotationbars, keys are the DataFrame's columns, see
+            `AnnotationBar`. by default None, use the minemum and maximum values
+        gaps : ndarray, optional
+            split the values shown at these positions, see `AnnotationBar`. by default None
+        gap_size : float, optional
+            the size of gaps in points, by default 4
         """
         anno = _object2categrey(anno)
 
@@ -183,7 +303,21 @@ class ListAnnotationBar:
         self.direction = direction
         self.show_names = show_names
         self.tick_labels_params = tick_labels_params
+        self.downsample = downsample
+        self.order = order
+        self.gaps, self.gap_size = gaps, gap_size
+        self.limits = limits if limits is not None else dict()
+        # cmaps, limits and legends are chosen by the names, see `set_anno`
+        self.columns = list(anno.columns)
         self.annotationbars = self._get_annotation_bars(anno)
+        # The images and their (space, resolution) if drawn by `draw_composite`
+        self.images = []
+        self.composite = None
+
+    @property
+    def image(self):
+        """The image drawn by `draw_composite`, the first group's if it's split by gaps"""
+        return self.images[0] if len(self.images) > 0 else None
 
     def _get_annotation_bars(self, anno: DataFrame) -> List[AnnotationBar]:
         """Create AnnotationBars along columns
@@ -206,15 +340,121 @@ class ListAnnotationBar:
             else:
                 values, values_mapper = _transform_discrete_values(values)
                 cmap = self.cmaps.pop(name, "tab20")
+            vmin, vmax = self.limits.get(name, (None, None))
             name = name if self.show_names else None
             tmp_annobar = AnnotationBar(
                 values=values.to_numpy(), cmap=cmap, values_mapper=values_mapper,
-                name=name, vmin=None, vmax=None, bartype=bartype, direction=self.direction,
-                tick_labels_params=self.tick_labels_params
+                name=name, vmin=vmin, vmax=vmax, bartype=bartype, direction=self.direction,
+                tick_labels_params=self.tick_labels_params, downsample=self.downsample,
+                order=self.order, gaps=self.gaps, gap_size=self.gap_size
             )
             annotationbars.append(tmp_annobar)
         return annotationbars
 
+    def set_anno(self, anno: DataFrame) -> bool:
+        """Replace the values of all Annotationbars, such as the next frame of an animation
+
+        Parameters
+        ----------
+        anno : DataFrame
+            DataFrame with the same columns, types and categories as the one used to create the
+            Annotationbars, and the same number of rows
+
+        Returns
+        -------
+        bool
+            whether the values are replaced. Nothing is changed if `anno` doesn't match, its
+            Annotationbars and legends need a new layout.
+        """
+        anno = _object2categrey(anno)
+        if list(anno.columns) != self.columns:
+            return False
+        new_values = []
+        for annobar, (_, values) in zip(self.annotationbars, anno.items()):
+            bartype = _get_bartype(values)
+            if bartype != annobar.bartype or values.size != annobar.values.size:
+                return False
+            if bartype == DISCRETE:
+                values, values_mapper = _transform_discrete_values(values)
+                if values_mapper != annobar.values_mapper:
+                    return False
+            new_values.append(values.to_numpy())
+        for annobar, values in zip(self.annotationbars, new_values):
+            annobar.set_values(values)
+        return True
+
+    def update_images(self) -> None:
+        """Update the drawn images by the values set"""
+        if self.composite is not None:
+            ax = self.image.axes
+            image = self.get_composite_image(ax, *self.composite)
+            set_groups_data(self.images, image, *self.annotationbars[0].get_bounds(ax, image))
+            return
+        for annobar in self.annotationbars:
+            annobar.update_image()
+
     def draw(self, axes: List[Axes]) -> None:
         for annobar, ax in zip(self.annotationbars, axes):
             annobar.draw(ax)
+
+    def get_composite_image(self, ax: Axes, space: float = 0.2, resolution: int = 5) -> ndarray:
+        """Get the uint8 RGBA image of all Annotationbars stacked, see `draw_composite`"""
+        gap = int(round(space * resolution))
+        # Bars are stacked along the axis across them, rows for HORIZONTAL bars
+        stack_axis = 0 if self.direction == HORIZONTAL else 1
+        parts = []
+        for i, annobar in enumerate(self.annotationbars):
+            image = annobar.get_image(ax)
+            if i > 0 and gap > 0:
+                gap_shape = list(image.shape)
+                gap_shape[stack_axis] = gap
+                parts.append(np.zeros(gap_shape, dtype=np.uint8))
+            parts.append(np.repeat(image, resolution, axis=stack_axis))
+        return np.concatenate(parts, axis=stack_axis)
+
+    def draw_composite(self, ax: Axes, space: float = 0.2, resolution: int = 5) -> None:
+        """Draw all Annotationbars as one image in one Axes, their names are one set of ticks
+
+        Parameters
+        ----------
+        ax : Axes
+            the Axes of all Annotationbars
+        space : float, optional
+            the space between Annotationbars, the fraction of the bar width, by default 0.2
+        resolution : int, optional
+            the pixels of a bar in the image across the bars, the space is rounded to them. by
+            default 5
+        """
+        image = self.get_composite_image(ax, space, resolution)
+        self.composite = (space, resolution)
+
+        # Bar i covers [i * step, i * step + 1] across the bars
+        gap = int(round(space * resolution))
+        step = 1 + gap / resolution
+        total = len(self.annotationbars) * step - gap / resolution
+        locs = np.arange(len(self.annotationbars)) * step + 0.5
+        names = [annobar.name for annobar in self.annotationbars]
+        name_attrs = self.annotationbars[0].name_attrs
+        ax.tick_params(
+            axis="both", pad=0, top=False, bottom=False, left=False, right=False, **name_attrs
+        )
+        # The groups split by gaps are the same for all bars
+        first = self.annotationbars[0]
+        bounds = first.get_bounds(ax, image)
+        # The repeated pixels of bars are not smoothed
+        self.images = imshow_groups(
+            ax, image, *bounds, *first.get_extents(ax, ([0], [total])), interpolation="nearest")
+        if self.direction == HORIZONTAL:
+            ax.set_xticks([])
+            if self.show_names:
+                ax.set_yticks(locs, names, **self.tick_labels_params)
+            else:
+                ax.set_yticks([])
+        else:
+            ax.set_yticks([])
+            if self.show_names:
+                ax.set_xticks(locs, names, **self.tick_labels_params)
+            else:
+                ax.set_xticks([])
+        ax.spines[:].set_visible(False)
+        ax.grid(False)
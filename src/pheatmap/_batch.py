@@ -0,0 +1,117 @@
+import os
+import time
+from typing import Any, Dict, Iterable, Iterator, NamedTuple, Tuple
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from ._pheatmap import pheatmap, savefig_dpi
+
+# The read-only inputs shared by all jobs of a worker process, see `_init_worker`
+_SHARED: Dict[str, Any] = dict()
+
+
+class BatchResult(NamedTuple):
+    """The result of a job rendered by `pheatmap_batch`
+
+    index : int
+        the position of the job in `jobs`
+    path : str
+        the output path of the job
+    seconds : float
+        the time used to render and save the heatmap, `None` if the job failed
+    error : BaseException
+        the exception raised by the job, `None` if the job succeeded
+    """
+    index: int
+    path: str
+    seconds: float = None
+    error: BaseException = None
+
+
+def _init_worker(shared: Dict[str, Any]) -> None:
+    """Keep the shared inputs in the worker, they are only pickled once for every worker"""
+    global _SHARED
+    _SHARED = shared
+
+
+def _render_job(
+    mat, annotations: Dict[str, Any], kwargs: Dict[str, Any], path: str,
+    savefig_kwargs: Dict[str, Any]
+) -> float:
+    """Render a heatmap and save it, return the seconds used"""
+    start = time.perf_counter()
+    params = dict(_SHARED)
+    params.update(annotations if annotations is not None else dict())
+    params.update(kwargs if kwargs is not None else dict())
+    fig = pheatmap(mat, **savefig_dpi(params, savefig_kwargs))
+    fig.savefig(path, **savefig_kwargs)
+    return time.perf_counter() - start
+
+
+def pheatmap_batch(
+    jobs: Iterable[Tuple[Any, Dict[str, Any], Dict[str, Any], str]],
+    n_workers: int = None, shared: Dict[str, Any] = None,
+    savefig_kwargs: Dict[str, Any] = None, max_pending: int = None,
+    mp_context=None
+) -> Iterator[BatchResult]:
+    """Render many heatmaps to files in a process pool
+
+    Parameters
+    ----------
+    jobs : Iterable[Tuple[Any, Dict[str, Any], Dict[str, Any], str]]
+        every job is a tuple of (mat, annotations, kwargs, path). `annotations` and `kwargs` are
+        the keyword arguments of `pheatmap`, such as `dict(annotation_row=...)` and
+        `dict(cmap="Reds")`, either can be None. The heatmap is saved to `path`. `jobs` is consumed
+        lazily, so it can be a generator.
+    n_workers : int, optional
+        the number of worker processes, by default None, the number of CPUs
+    shared : Dict[str, Any], optional
+        keyword arguments of `pheatmap` shared by all jobs, such as a common `annotation_col`.
+        They are sent to every worker once instead of with every job. Arguments of a job override
+        the shared ones. by default None
+    savefig_kwargs : Dict[str, Any], optional
+        keyword arguments of `Figure.savefig`, such as `dict(dpi=300)`, its dpi is also the dpi of
+        `pheatmap` if the job doesn't set it. by default None
+    max_pending : int, optional
+        the maximum number of jobs submitted but not finished, which bounds the memory of queued
+        inputs. by default None, 2 * n_workers
+    mp_context : optional
+        the multiprocessing context of the pool, by default None, the default start method
+
+    Yields
+    ------
+    Iterator[BatchResult]
+        the result of every job as soon as it is finished, which is not the order of `jobs`.
+        Exceptions of jobs are returned in `BatchResult.error` instead of being raised.
+    """
+    n_workers = n_workers if n_workers is not None else (os.cpu_count() or 1)
+    max_pending = max_pending if max_pending is not None else 2 * n_workers
+    shared = shared if shared is not None else dict()
+    savefig_kwargs = savefig_kwargs if savefig_kwargs is not None else dict()
+
+    jobs = enumerate(jobs)
+    pending = dict()
+    with ProcessPoolExecutor(
+        max_workers=n_workers, mp_context=mp_context,
+        initializer=_init_worker, initargs=(shared,)
+    ) as executor:
+        def submit() -> bool:
+            """Submit the next job, return False if there are no more jobs"""
+            try:
+                index, (mat, annotations, kwargs, path) = next(jobs)
+            except StopIteration:
+                return False
+            future = executor.submit(_render_job, mat, annotations, kwargs, path, savefig_kwargs)
+            pending[future] = (index, path)
+            return True
+
+        while len(pending) < max_pending and submit():
+            pass
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, path = pending.pop(future)
+                error = future.exception()
+                if error is None:
+                    yield BatchResult(index, path, seconds=future.result())
+                else:
+                    yield BatchResult(index, path, error=error)
+                submit()
@@ -0,0 +1,167 @@
+import os
+import numpy as np
+from numpy import ndarray
+from typing import Any, Iterator, Tuple, Union
+from ._sketch import QuantileSketch
+from ._downsample import MEAN, MAX, MIN, FIRST, DOWNSAMPLE_METHODS, split_bin_edges, reduce_axis
+
+# The bytes of a row chunk read at once
+CHUNK_BYTES = 2**26
+# The maximum rows/columns kept for an out-of-core matrix, more than the pixels of most Axes
+MAX_RESOLUTION = 4096
+
+
+def load_matrix(mat: Any) -> Any:
+    """Get the matrix from the input of `Heatmap`
+
+    A path of a `.npy` file is memory-mapped, a DataFrame is transformed to ndarray, others are
+    returned as they are.
+    """
+    if isinstance(mat, (str, os.PathLike)):
+        return np.load(mat, mmap_mode="r")
+    elif hasattr(mat, "to_numpy"):
+        return mat.to_numpy()
+    else:
+        return mat
+
+
+def is_out_of_core(mat: Any) -> bool:
+    """Whether the matrix should be read by row chunks instead of loading it in memory
+
+    They are `numpy.memmap` and objects of the chunked-array protocol, which have a 2D `shape` and
+    return an array-like from `mat[start:stop]`, such as `h5py.Dataset` and `zarr.Array`.
+    """
+    if isinstance(mat, np.memmap):
+        return True
+    elif isinstance(mat, np.ndarray):
+        return False
+    else:
+        return hasattr(mat, "shape") and len(mat.shape) == 2 and hasattr(mat, "__getitem__")
+
+
+def chunk_rows(mat: Any, chunk_bytes: int = CHUNK_BYTES) -> int:
+    """Get the number of rows read at once, a multiple of the row chunks of `mat` if it has"""
+    itemsize = np.dtype(getattr(mat, "dtype", np.float64)).itemsize
+    rows = max(1, chunk_bytes // max(1, itemsize * mat.shape[1]))
+    chunks = getattr(mat, "chunks", None)
+    if isinstance(chunks, tuple) and len(chunks) > 0 and isinstance(chunks[0], (int, np.integer)):
+        rows = max(1, rows // chunks[0]) * chunks[0]
+    return int(rows)
+
+
+def iter_row_chunks(mat: Any, rows: int = None) -> Iterator[Tuple[int, ndarray]]:
+    """Read `mat` by contiguous row chunks, yield the start row and the chunk as ndarray"""
+    rows = rows if rows is not None else chunk_rows(mat)
+    for start in range(0, mat.shape[0], rows):
+        yield start, np.asarray(mat[start:min(start + rows, mat.shape[0])])
+
+
+def read_rows(mat: Any, rows: Union[slice, ndarray]) -> ndarray:
+    """Read rows of `mat` by a slice or indices, indices are read in increasing order as h5py
+    needs"""
+    if isinstance(rows, slice):
+        return np.asarray(mat[rows])
+    index = np.argsort(rows)
+    values = np.asarray(mat[rows[index]])
+    ordered = np.empty_like(values)
+    ordered[index] = values
+    return ordered
+
+
+def reduce_chunks(
+    mat: Any, nrows: int, ncols: int, method: str = MEAN,
+    row_order: ndarray = None, col_order: ndarray = None, rows: int = None,
+    sketch: QuantileSketch = None, row_gaps: ndarray = None, col_gaps: ndarray = None
+) -> Tuple[ndarray, float, float]:
+    """Reduce a matrix to at most `nrows` x `ncols` cells and find its bounds in one pass over row
+    chunks
+
+    Only a row chunk and the reduced matrix are held in memory. Rows are binned by their positions
+    in `row_order`, so the chunks are still read in the original order.
+
+    Parameters
+    ----------
+    mat : Any
+        a `numpy.memmap` or an object of the chunked-array protocol, see `is_out_of_core`
+    nrows : int
+        the maximum number of rows kept
+    ncols : int
+        the maximum number of columns kept
+    method : str, optional
+        how to aggregate the cells in a bin("mean", "max", "min" or "first"), by default "mean"
+    row_order : ndarray, optional
+        the indices of rows in the order to show, by default None
+    col_order : ndarray, optional
+        the indices of columns in the order to show, by default None
+    rows : int, optional
+        the number of rows read at once, by default None, see `chunk_rows`
+    sketch : QuantileSketch, optional
+        the values of every chunk are added to it in the same pass, such as for percentile
+        limits. by default None
+    row_gaps : ndarray, optional
+        the positions of gaps between the rows shown, no bin crosses them, see
+        `split_bin_edges`. by default None
+    col_gaps : ndarray, optional
+        the positions of gaps between the columns shown, by default None
+
+    Returns
+    -------
+    Tuple[ndarray, float, float]
+        the reduced matrix in the order to show, the minimum and maximum values of `mat` ignoring
+        NaN
+    """
+    if method not in DOWNSAMPLE_METHODS:
+        raise KeyError(f"`method` have to be chose from {DOWNSAMPLE_METHODS}!")
+    num_rows, num_cols = mat.shape
+    row_starts = split_bin_edges(num_rows, nrows, row_gaps)
+    col_starts = split_bin_edges(num_cols, ncols, col_gaps)
+    # The bin of every row by its position to show
+    positions = np.arange(num_rows)
+    if row_order is not None:
+        positions[row_order] = np.arange(num_rows)
+    row_bins = np.searchsorted(row_starts, positions, side="right") - 1
+
+    shape = (len(row_starts), len(col_starts))
+    if method == MAX:
+        reduced = np.full(shape, -np.inf)
+    elif method == MIN:
+        reduced = np.full(shape, np.inf)
+    else:
+        reduced = np.zeros(shape)
+    vmin, vmax = np.inf, -np.inf
+    for start, chunk in iter_row_chunks(mat, rows):
+        chunk = chunk.astype(np.float64, copy=False)
+        if chunk.size > 0 and not np.all(np.isnan(chunk)):
+            vmin, vmax = min(vmin, np.nanmin(chunk)), max(vmax, np.nanmax(chunk))
+        if sketch is not None:
+            sketch.update(chunk)
+        if col_order is not None:
+            chunk = np.take(chunk, col_order, axis=1)
+        chunk = reduce_axis(chunk, col_starts, method, axis=1)
+        if method == MEAN:
+            # Sum the rows of each bin, divided by the bin sizes after all chunks
+            chunk = chunk * np.diff(np.append(col_starts, num_cols))
+        bins = row_bins[start:start + chunk.shape[0]]
+        if method == FIRST:
+            first = positions[start:start + chunk.shape[0]] == row_starts[bins]
+            reduced[bins[first]] = chunk[first]
+            continue
+        # Group the rows of the same bin, then merge them into the reduced matrix
+        index = np.argsort(bins, kind="stable")
+        bins, chunk = bins[index], chunk[index]
+        groups = np.flatnonzero(np.diff(bins, prepend=-1))
+        if method == MAX:
+            reduced[bins[groups]] = np.maximum(
+                reduced[bins[groups]], np.maximum.reduceat(chunk, groups, axis=0))
+        elif method == MIN:
+            reduced[bins[groups]] = np.minimum(
+                reduced[bins[groups]], np.minimum.reduceat(chunk, groups, axis=0))
+        else:
+            reduced[bins[groups]] += np.add.reduceat(chunk, groups, axis=0)
+    if method == MEAN:
+        row_counts = np.diff(np.append(row_starts, num_rows))
+        col_counts = np.diff(np.append(col_starts, num_cols))
+        reduced /= np.outer(row_counts, col_counts)
+    if vmin > vmax:
+        vmin, vmax = np.nan, np.nan
+    return reduced, vmin, vmax
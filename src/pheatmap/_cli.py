@@ -0,0 +1,301 @@
+"""The `pheatmap` command, render a heatmap from CSV/TSV files
+
+The matrix is read by row chunks into a temporary memory-mapped file, so files larger than memory
+are rendered as out-of-core matrices, see `pheatmap`.
+
+    pheatmap matrix.tsv -o heatmap.png --annotation-row groups.tsv --vmin p1 --vmax p99 -v
+"""
+import os
+import sys
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+from numpy import ndarray
+from pandas import DataFrame
+from typing import List, Tuple, Union
+from ._chunked import CHUNK_BYTES
+from ._profile import profile
+
+# The options of how row/column names are shown, "thin" only shows names which don't overlap
+NAMES_OPTIONS = ["all", "thin", "none"]
+
+
+def _get_sep(path: str, sep: str = None) -> str:
+    """Get the separator of a table, tab for `.tsv`/`.txt`(optionally compressed), otherwise
+    comma"""
+    if sep is not None:
+        return sep
+    stem = path.lower()
+    for suffix in [".gz", ".bz2", ".xz", ".zip", ".zst"]:
+        if stem.endswith(suffix):
+            stem = stem[:-len(suffix)]
+    return "\t" if stem.endswith((".tsv", ".tab", ".txt")) else ","
+
+
+def read_matrix(
+    path: str, directory: str, sep: str = None, index_col: Union[int, None] = 0,
+    dtype=np.float64, names: bool = True, rows: int = None
+) -> Tuple[np.memmap, Union[ndarray, None], ndarray]:
+    """Read a numeric table by row chunks into a memory-mapped file
+
+    Only a row chunk is held in memory, besides the row names.
+
+    Parameters
+    ----------
+    path : str
+        the path of a CSV/TSV file, the first line is the column names
+    directory : str
+        the directory of the memory-mapped file, which has to exist as long as the matrix is used
+    sep : str, optional
+        the separator, by default None, see `_get_sep`
+    index_col : Union[int, None], optional
+        the column of row names, by default 0. None if the table has no row names.
+    dtype : optional
+        the dtype of the matrix, by default np.float64
+    names : bool, optional
+        whether keep the row names, by default True
+    rows : int, optional
+        the number of rows read at once, by default None, rows of about `CHUNK_BYTES`
+
+    Returns
+    -------
+    Tuple[np.memmap, Union[ndarray, None], ndarray]
+        the matrix, the row names(None if `names` is False) and the column names
+
+    Raises
+    ------
+    ValueError
+        If the table has no rows or its values aren't numbers, will raise ValueError
+    """
+    sep = _get_sep(path, sep)
+    dtype = np.dtype(dtype)
+    colnames = pd.read_csv(path, sep=sep, index_col=index_col, nrows=0).columns.to_numpy()
+    if rows is None:
+        # Parsed chunks are several times larger than their values
+        rows = max(1, CHUNK_BYTES // 4 // max(1, dtype.itemsize * len(colnames)))
+
+    fd, mmap_path = tempfile.mkstemp(dir=directory, suffix=".bin")
+    nrows, rownames = 0, []
+    with os.fdopen(fd, "wb") as f:
+        for chunk in pd.read_csv(path, sep=sep, index_col=index_col, chunksize=rows):
+            try:
+                values = chunk.to_numpy(dtype=dtype)
+            except ValueError as error:
+                raise ValueError(f"The values of {path} are not numbers!") from error
+            values.tofile(f)
+            nrows += values.shape[0]
+            if names:
+                rownames.append(chunk.index.astype(str).to_numpy(dtype=str))
+    if nrows == 0:
+        raise ValueError(f"{path} has no rows!")
+    mat = np.memmap(mmap_path, dtype=dtype, mode="r", shape=(nrows, len(colnames)))
+    rownames = np.concatenate(rownames) if names else None
+    return mat, rownames, colnames
+
+
+def read_annotation(path: str, sep: str = None, rows: int = 2**16) -> DataFrame:
+    """Read an annotation table by row chunks, the first column is the names
+
+    Columns which aren't numbers are stored as categoricals by chunks, so their strings are only
+    kept once. The categories are sorted, the same as `pheatmap` does.
+    """
+    sep = _get_sep(path, sep)
+    chunks = []
+    for chunk in pd.read_csv(path, sep=sep, index_col=0, chunksize=rows):
+        for column in chunk.select_dtypes(exclude=[np.number, "category"]).columns:
+            chunk[column] = chunk[column].astype("category")
+        chunks.append(chunk)
+    if len(chunks) == 0:
+        raise ValueError(f"{path} has no rows!")
+
+    anno = pd.concat(chunks)
+    for column in anno.columns:
+        dtypes = [chunk[column].dtype for chunk in chunks]
+        if all(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes):
+            anno[column] = pd.Categorical(pd.api.types.union_categoricals(
+                [chunk[column] for chunk in chunks], sort_categories=True))
+    return anno
+
+
+def _align(
+    anno: DataFrame, names: Union[ndarray, None], by_position: bool = False
+) -> DataFrame:
+    """Reorder the rows of an annotation by the names of the matrix. The rows are matched by their
+    positions only if the matrix has no names or `by_position`
+
+    Raises
+    ------
+    ValueError
+        If the annotation has duplicated names or some names of the matrix aren't annotated, will
+        raise ValueError
+    """
+    if names is None or by_position:
+        return anno
+    index = anno.index.astype(str)
+    if len(index) == len(names) and np.array_equal(index.to_numpy(), names):
+        return anno
+    if not index.is_unique:
+        duplicated = index[index.duplicated()].unique()
+        raise ValueError(f"The annotation has duplicated names: {_head(duplicated)}!")
+    positions = index.get_indexer(names)
+    missing = np.asarray(names)[positions < 0]
+    if missing.size > 0:
+        raise ValueError(
+            f"{missing.size} names of the matrix aren't in the annotation: {_head(missing)}! "
+            "Use --match-by-position to match the rows by their positions."
+        )
+    return anno.iloc[positions]
+
+
+def _head(names, num: int = 5) -> str:
+    """Join the first names for an error message"""
+    names = [str(name) for name in names]
+    return ", ".join(names[:num]) + (", ..." if len(names) > num else "")
+
+
+def _limit(value: str) -> Union[float, str, None]:
+    """Parse `--vmin`/`--vmax`, a number or a string such as "p1" and "symmetric" """
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="pheatmap", description="Plot a heatmap with annotation bars from CSV/TSV files.")
+    parser.add_argument(
+        "mat", help="the matrix, a CSV/TSV file whose first column is the row names, or `.npy`")
+    parser.add_argument(
+        "-o", "--output", required=True, help="the output file, such as heatmap.png")
+    parser.add_argument(
+        "--format", default=None, help="png, pdf, svg, ..., by default the output's extension")
+    parser.add_argument("--dpi", type=float, default=None)
+    parser.add_argument(
+        "--sep", default=None, help="the separator, by default tab for .tsv/.txt, otherwise comma")
+    parser.add_argument("--no-index", action="store_true", help="the matrix has no row names")
+    parser.add_argument("--dtype", default="float64", choices=["float32", "float64"])
+    parser.add_argument("--tmpdir", default=None, help="the directory of the temporary matrix")
+
+    group = parser.add_argument_group("heatmap")
+    group.add_argument("--cmap", default="bwr")
+    group.add_argument(
+        "--vmin", default=None, help='a number, a percentile such as "p1", or "symmetric"')
+    group.add_argument("--vmax", default=None, help='such as "p99", see --vmin')
+    group.add_argument("--name", default=None, help="the title of the heatmap's legend")
+    group.add_argument("--scale", default="none", choices=["none", "row", "column"])
+    group.add_argument("--downsample", default="mean", choices=["mean", "max", "min", "first"])
+    group.add_argument("--lut-size", type=int, default=None)
+    group.add_argument("--edgecolor", default="none")
+    group.add_argument("--rownames", default="thin", choices=NAMES_OPTIONS)
+    group.add_argument("--colnames", default="thin", choices=NAMES_OPTIONS)
+    group.add_argument("--rownames-side", default="left", choices=["left", "right"])
+    group.add_argument("--colnames-side", default="bottom", choices=["top", "bottom"])
+    group.add_argument("--width", type=float, default=8)
+    group.add_argument("--height", type=float, default=6)
+
+    group = parser.add_argument_group("clustering")
+    group.add_argument("--cluster-rows", action="store_true")
+    group.add_argument("--cluster-cols", action="store_true")
+    group.add_argument(
+        "--clustering-distance-rows", default="euclidean", choices=["euclidean", "correlation"])
+    group.add_argument(
+        "--clustering-distance-cols", default="euclidean", choices=["euclidean", "correlation"])
+    group.add_argument(
+        "--clustering-method", default="complete",
+        choices=["single", "complete", "average", "ward"])
+    group.add_argument(
+        "--clustering-memory-limit", type=float, default=None, help="bytes, such as 1e9")
+    group.add_argument(
+        "--cutree-rows", type=int, default=None, help="split clustered rows into k clusters")
+    group.add_argument(
+        "--cutree-cols", type=int, default=None, help="split clustered columns into k clusters")
+
+    group = parser.add_argument_group("annotations")
+    group.add_argument(
+        "--annotation-row", default=None,
+        help="a CSV/TSV file whose rows are the rows of the matrix, matched by names")
+    group.add_argument(
+        "--annotation-col", default=None,
+        help="a CSV/TSV file whose rows are the columns of the matrix, matched by names")
+    group.add_argument(
+        "--match-by-position", action="store_true",
+        help="match the rows of annotation files to the matrix by positions instead of names")
+    group.add_argument("--annotation-composite", action="store_true")
+
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="print the seconds of every stage to stderr")
+    return parser
+
+
+def _print_stage(name: str, seconds: float) -> None:
+    print(f"{name:<20}{seconds:10.4f}s", file=sys.stderr)
+
+
+def _pheatmap_from_args(
+    args: argparse.Namespace, mat, rownames: ndarray, colnames: ndarray,
+    annotation_row: DataFrame, annotation_col: DataFrame
+):
+    """Call `pheatmap` with the parsed arguments"""
+    from ._pheatmap import pheatmap
+
+    return pheatmap(
+        mat, cmap=args.cmap, vmin=_limit(args.vmin), vmax=_limit(args.vmax), name=args.name,
+        rownames=rownames, colnames=colnames,
+        rownames_side=args.rownames_side, colnames_side=args.colnames_side,
+        show_rownames=args.rownames != "none", show_colnames=args.colnames != "none",
+        rownames_thinning=args.rownames == "thin", colnames_thinning=args.colnames == "thin",
+        edgecolor=args.edgecolor, downsample=args.downsample, lut_size=args.lut_size,
+        scale=args.scale, scale_dtype=np.dtype(args.dtype),
+        cluster_rows=args.cluster_rows, cluster_cols=args.cluster_cols,
+        clustering_distance_rows=args.clustering_distance_rows,
+        clustering_distance_cols=args.clustering_distance_cols,
+        clustering_method=args.clustering_method,
+        clustering_memory_limit=args.clustering_memory_limit,
+        cutree_rows=args.cutree_rows, cutree_cols=args.cutree_cols,
+        annotation_row=annotation_row, annotation_col=annotation_col,
+        annotation_composite=args.annotation_composite,
+        width=args.width, height=args.height, dpi=args.dpi
+    )
+
+
+def main(argv: List[str] = None) -> int:
+    """The entry point of the `pheatmap` command"""
+    args = build_parser().parse_args(argv)
+    fmt = args.format or os.path.splitext(args.output)[1].lstrip(".").lower() or "png"
+
+    with profile(_print_stage if args.verbose else None) as prof, \
+            tempfile.TemporaryDirectory(dir=args.tmpdir) as tmpdir:
+        with prof.stage("read_matrix"):
+            if args.mat.endswith(".npy"):
+                mat, rownames, colnames = args.mat, None, None
+            else:
+                mat, rownames, colnames = read_matrix(
+                    args.mat, tmpdir, sep=args.sep, index_col=None if args.no_index else 0,
+                    dtype=args.dtype, names=not args.no_index and (
+                        args.rownames != "none" or args.annotation_row is not None)
+                )
+        with prof.stage("read_annotations"):
+            annotations = []
+            for path, names in [(args.annotation_row, rownames), (args.annotation_col, colnames)]:
+                annotations.append(
+                    None if path is None else
+                    _align(read_annotation(path, args.sep), names, args.match_by_position))
+
+        fig = _pheatmap_from_args(args, mat, rownames, colnames, *annotations)
+        with prof.stage("savefig"):
+            savefig_kwargs = dict() if args.dpi is None else dict(dpi=args.dpi)
+            fig.savefig(args.output, format=fmt, **savefig_kwargs)
+        # The memory-mapped file is removed with the directory
+        del mat, fig
+    if args.verbose:
+        print(f"{'total':<20}{prof.total:10.4f}s", file=sys.stderr)
+        print(", ".join(f"{k}={v}" for k, v in prof.artists.items()), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,481 @@
+import numpy as np
+from numpy import ndarray
+from typing import Tuple, Union
+
+EUCLIDEAN = "euclidean"
+CORRELATION = "correlation"
+DISTANCE_METRICS = [EUCLIDEAN, CORRELATION]
+
+SINGLE = "single"
+COMPLETE = "complete"
+AVERAGE = "average"
+WARD = "ward"
+LINKAGE_METHODS = [SINGLE, COMPLETE, AVERAGE, WARD]
+
+# Bytes used by every row in approximate clustering: label, projection and order
+_BYTES_PER_ROW = 24
+# `linkage` doesn't compact fewer clusters, their rows are already cheap to scan
+_COMPACT_MIN = 256
+
+
+def _check_metric(metric: str) -> str:
+    """Validate the distance metric"""
+    if metric in DISTANCE_METRICS:
+        return metric
+    else:
+        raise KeyError(f"The distance metric have to be chose from {DISTANCE_METRICS}!")
+
+
+def _check_method(method: str) -> str:
+    """Validate the linkage method"""
+    if method in LINKAGE_METHODS:
+        return method
+    else:
+        raise KeyError(f"The linkage method have to be chose from {LINKAGE_METHODS}!")
+
+
+def _check_finite(X: ndarray) -> ndarray:
+    """Validate the rows to cluster, NaN and infinite values have no distance to other rows"""
+    if not np.all(np.isfinite(X)):
+        raise ValueError(
+            "Can't cluster a matrix with NaN or infinite values, rows and columns with zero "
+            "deviation become NaN when they are scaled!"
+        )
+    return X
+
+
+def _standardize_rows(X: ndarray) -> ndarray:
+    """Center and scale every row to unit length, then correlation is the dot product of rows"""
+    X = np.array(X, dtype=np.float64)
+    X -= X.mean(axis=1, keepdims=True)
+    norms = np.sqrt(np.einsum("ij,ij->i", X, X))
+    # Constant rows are uncorrelated with all the others
+    norms[norms == 0] = np.inf
+    X /= norms[:, None]
+    return X
+
+
+def pairwise_distances(
+    X: ndarray, metric: str = EUCLIDEAN, block_size: int = 1024, dtype=np.float64
+) -> ndarray:
+    """Compute the distances between all rows of `X` block by block
+
+    Parameters
+    ----------
+    X : ndarray
+        a 2D matrix, distances are computed between its rows
+    metric : str, optional
+        "euclidean" or "correlation"(1 - pearson correlation), by default "euclidean"
+    block_size : int, optional
+        the number of rows computed at once, which bounds the temporary memory, by default 1024
+    dtype : optional
+        the dtype of the distance matrix, by default np.float64
+
+    Returns
+    -------
+    ndarray
+        the square distance matrix
+
+    Raises
+    ------
+    ValueError
+        If `X` has NaN or infinite values, will raise ValueError
+    """
+    metric = _check_metric(metric)
+    if metric == CORRELATION:
+        X = _standardize_rows(_check_finite(np.asarray(X)))
+    else:
+        X = _check_finite(np.asarray(X, dtype=np.float64))
+        sq_norms = np.einsum("ij,ij->i", X, X)
+
+    n = X.shape[0]
+    dist = np.empty((n, n), dtype=dtype)
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        # Only the upper triangle is computed, the blocks left of the diagonal are transposed
+        dist[start:stop, :start] = dist[:start, start:stop].T
+        block = X[start:stop] @ X[start:].T
+        if metric == CORRELATION:
+            np.subtract(1, block, out=block)
+        else:
+            block *= -2
+            block += sq_norms[start:stop, None]
+            block += sq_norms[None, start:]
+            np.maximum(block, 0, out=block)
+            np.sqrt(block, out=block)
+        dist[start:stop, start:] = block
+    np.fill_diagonal(dist, 0)
+    return dist
+
+
+def _lance_williams(
+    dist: ndarray, x: int, y: int, sizes: ndarray, method: str
+) -> ndarray:
+    """The distances between the cluster merged by `x` and `y` and all other clusters"""
+    dx, dy, dxy = dist[x], dist[y], dist[x, y]
+    sx, sy = sizes[x], sizes[y]
+    if method == SINGLE:
+        return np.minimum(dx, dy)
+    elif method == COMPLETE:
+        return np.maximum(dx, dy)
+    elif method == AVERAGE:
+        return (sx * dx + sy * dy) / (sx + sy)
+    else:
+        total = sx + sy + sizes
+        new = ((sx + sizes) * dx * dx + (sy + sizes) * dy * dy - sizes * dxy * dxy) / total
+        return np.sqrt(np.maximum(new, 0, out=new), out=new)
+
+
+def _relabel(merges: ndarray, heights: ndarray, n: int) -> ndarray:
+    """Sort the merges by height and label clusters like `scipy.cluster.hierarchy.linkage`"""
+    order = np.argsort(heights, kind="mergesort")
+    parent = np.arange(2 * n - 1)
+    sizes = np.ones(2 * n - 1, dtype=np.intp)
+
+    def find(i):
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return root
+
+    Z = np.empty((n - 1, 4))
+    for label, k in enumerate(order, start=n):
+        a, b = find(merges[k, 0]), find(merges[k, 1])
+        a, b = min(a, b), max(a, b)
+        parent[a] = parent[b] = label
+        sizes[label] = sizes[a] + sizes[b]
+        Z[label - n] = a, b, heights[k], sizes[label]
+    return Z
+
+
+def linkage(dist: ndarray, method: str = COMPLETE) -> ndarray:
+    """Hierarchical clustering by the nearest-neighbor-chain algorithm
+
+    Parameters
+    ----------
+    dist : ndarray
+        the square distance matrix, see `pairwise_distances`. It is used as the working memory and
+        will be overwritten, so only O(n^2) memory is needed.
+    method : str, optional
+        "single", "complete", "average" or "ward", by default "complete"
+
+    Returns
+    -------
+    ndarray
+        the linkage matrix, which is the same format as `scipy.cluster.hierarchy.linkage`
+    """
+    method = _check_method(method)
+    n = dist.shape[0]
+    if n < 2:
+        return np.empty((0, 4))
+
+    # Only the row of the merged cluster is written, a strided column write would touch a cache
+    # line of every row. The other rows are patched when they are read: the distances to the
+    # clusters merged since are copied from their rows, and the removed clusters become infinite,
+    # so the nearest neighbor of a cluster is the minimum of its row without masking. When half of
+    # the clusters are removed, the remaining are compacted to the top left of `dist`.
+    np.fill_diagonal(dist, np.inf)
+    ids = np.arange(n)
+    sizes = np.ones(n)
+    active = np.ones(n, dtype=bool)
+    merges = np.empty((n - 1, 2), dtype=np.intp)
+    heights = np.empty(n - 1)
+    # The merged and removed clusters since the last compaction, and the merges seen by every row
+    merged, removed = np.empty(n, dtype=np.intp), np.empty(n, dtype=np.intp)
+    seen = np.zeros(n, dtype=np.intp)
+    chain, since = [], 0
+
+    def refresh(z: int) -> ndarray:
+        if seen[z] < since:
+            columns = merged[seen[z]:since]
+            dist[z, columns] = dist[columns, z]
+            dist[z, removed[seen[z]:since]] = np.inf
+            seen[z] = since
+        return dist[z]
+
+    for k in range(n - 1):
+        if not chain:
+            chain.append(int(np.argmax(active)))
+        # Grow the chain until it ends with a pair of reciprocal nearest neighbors
+        while True:
+            row = refresh(chain[-1])
+            y = int(np.argmin(row))
+            # `argmin` finds NaN first, and the chain would never end with a NaN distance
+            if np.isnan(row[y]):
+                raise ValueError("The distances can't be NaN!")
+            if len(chain) > 1 and row[chain[-2]] <= row[y]:
+                break
+            chain.append(y)
+        y = chain.pop()
+        x = chain.pop()
+        x, y = min(x, y), max(x, y)
+        refresh(x)
+        refresh(y)
+        merges[k] = ids[x], ids[y]
+        heights[k] = dist[x, y]
+
+        # The merged cluster takes the place of `x` and `y` is removed
+        new = _lance_williams(dist, x, y, sizes, method)
+        new[x] = new[y] = np.inf
+        sizes[x] += sizes[y]
+        active[y] = False
+        dist[x] = new
+        merged[since], removed[since] = x, y
+        since += 1
+        seen[x] = since
+
+        if since >= len(ids) // 2 and len(ids) - since > _COMPACT_MIN:
+            keep = np.flatnonzero(active)
+            # All rows are patched before any of them is moved
+            for z in keep:
+                refresh(z)
+            for i, z in enumerate(keep):
+                dist[i, :len(keep)] = dist[z, keep]
+            dist = dist[:len(keep), :len(keep)]
+            positions = np.cumsum(active) - 1
+            chain = [int(positions[c]) for c in chain]
+            ids, sizes, active = ids[keep], sizes[keep], active[keep]
+            seen[:], since = 0, 0
+    return _relabel(merges, heights, n)
+
+
+def leaves_order(Z: ndarray) -> ndarray:
+    """Get the order of leaves from left to right in the dendrogram of linkage matrix `Z`"""
+    n = Z.shape[0] + 1
+    children = Z[:, :2].astype(np.intp)
+    order = np.empty(n, dtype=np.intp)
+    stack, k = [2 * n - 2], 0
+    while stack:
+        node = stack.pop()
+        if node < n:
+            order[k] = node
+            k += 1
+        else:
+            left, right = children[node - n]
+            stack.extend([right, left])
+    return order
+
+
+def cutree(Z: ndarray, n_clusters: int) -> ndarray:
+    """Cut the dendrogram of linkage matrix `Z` into `n_clusters` clusters, as R's `cutree`
+
+    Returns
+    -------
+    ndarray
+        the cluster of every leaf, from 0 to `n_clusters - 1` in the order of their first leaves.
+        The leaves of a cluster are contiguous in `leaves_order(Z)`
+    """
+    n = Z.shape[0] + 1
+    n_clusters = max(1, min(int(n_clusters), n))
+    # Apply the lowest n - n_clusters merges, then find the root of every leaf by pointer jumping
+    parent = np.arange(2 * n - 1)
+    merged = Z[:n - n_clusters, :2].astype(np.intp)
+    parent[merged[:, 0]] = parent[merged[:, 1]] = np.arange(n, 2 * n - n_clusters)
+    while True:
+        roots = parent[parent]
+        if np.array_equal(roots, parent):
+            break
+        parent = roots
+    # Clusters are numbered by their first leaves as R
+    _, first, clusters = np.unique(parent[:n], return_index=True, return_inverse=True)
+    return np.argsort(np.argsort(first))[clusters.reshape(n)]
+
+
+def _prepare_rows(rows: ndarray, metric: str) -> ndarray:
+    """Read rows as float64, rows are standardized for "correlation", then the euclidean distance
+    between rows is monotonic with their correlation distance"""
+    chunk = _check_finite(np.asarray(rows, dtype=np.float64))
+    return _standardize_rows(chunk) if metric == CORRELATION else chunk
+
+
+def _nearest_centroids(chunk: ndarray, centroids: ndarray, sq_norms: ndarray) -> ndarray:
+    """Get the index of the nearest centroid of every row in `chunk`"""
+    # |x - c|^2 = |x|^2 - 2xc + |c|^2, |x|^2 is the same for all centroids
+    dist = chunk @ centroids.T
+    dist *= -2
+    dist += sq_norms[None, :]
+    return np.argmin(dist, axis=1)
+
+
+def minibatch_kmeans(
+    X: ndarray, n_clusters: int, metric: str = EUCLIDEAN, batch_size: int = 1024,
+    n_iter: int = 100, random_state: int = 0
+) -> ndarray:
+    """Find centroids of rows by mini-batch k-means
+
+    Parameters
+    ----------
+    X : ndarray
+        a 2D matrix, its rows are clustered. Only `batch_size` rows are read at once, so
+        `numpy.memmap` works without loading the whole matrix.
+    n_clusters : int
+        the number of centroids
+    metric : str, optional
+        "euclidean" or "correlation", by default "euclidean"
+    batch_size : int, optional
+        the number of rows sampled in every iteration, by default 1024
+    n_iter : int, optional
+        the number of iterations, by default 100
+    random_state : int, optional
+        the seed of sampling, by default 0
+
+    Returns
+    -------
+    ndarray
+        the centroids
+    """
+    metric = _check_metric(metric)
+    rng = np.random.default_rng(random_state)
+    n = X.shape[0]
+    init = np.sort(rng.choice(n, size=n_clusters, replace=False))
+    centroids = _prepare_rows(X[init], metric)
+    counts = np.zeros(n_clusters)
+    for _ in range(n_iter):
+        rows = np.sort(rng.choice(n, size=min(batch_size, n), replace=False))
+        batch = _prepare_rows(X[rows], metric)
+        labels = _nearest_centroids(batch, centroids, np.einsum("ij,ij->i", centroids, centroids))
+        # Move every centroid towards the mean of its rows with a decreasing learning rate
+        batch_counts = np.bincount(labels, minlength=n_clusters)
+        batch_sums = np.zeros_like(centroids)
+        np.add.at(batch_sums, labels, batch)
+        counts += batch_counts
+        updated = batch_counts > 0
+        centroids[updated] += (
+            batch_sums[updated] - batch_counts[updated, None] * centroids[updated]
+        ) / counts[updated, None]
+    return centroids
+
+
+def approximate_cluster_order(
+    X: ndarray, metric: str = EUCLIDEAN, method: str = COMPLETE, memory_limit: float = 2 ** 30,
+    n_centroids: int = 2000, random_state: int = 0, n_clusters: int = None
+) -> Union[ndarray, Tuple[ndarray, ndarray]]:
+    """Order the rows of `X` approximately in bounded memory
+
+    Rows are clustered to centroids by mini-batch k-means, then the centroids are ordered by exact
+    hierarchical clustering and rows in every centroid are ordered by their projection on the
+    direction from the previous centroid to the next one.
+
+    Parameters
+    ----------
+    X : ndarray
+        a 2D matrix, its rows are clustered. It is read by chunks of rows, so `numpy.memmap` works.
+    metric : str, optional
+        "euclidean" or "correlation", by default "euclidean"
+    method : str, optional
+        the linkage method for centroids, by default "complete"
+    memory_limit : float, optional
+        the maximum bytes of working memory, not including `X`, by default 2 ** 30(1 GiB)
+    n_centroids : int, optional
+        the maximum number of centroids, fewer centroids are used if they don't fit in
+        `memory_limit`. by default 2000
+    random_state : int, optional
+        the seed of k-means, by default 0
+    n_clusters : int, optional
+        also cut the dendrogram of centroids into `n_clusters` clusters, rows are in the clusters
+        of their centroids. by default None
+
+    Returns
+    -------
+    Union[ndarray, Tuple[ndarray, ndarray]]
+        the indices of rows in the approximate order, and the cluster of every row if
+        `n_clusters` is provided
+
+    Raises
+    ------
+    ValueError
+        If `memory_limit` is too small to order the rows, will raise ValueError
+    """
+    metric = _check_metric(metric)
+    method = _check_method(method)
+    n, ncols = X.shape
+    # Half of the remaining memory for the linkage of centroids and half for chunks of rows
+    remaining = memory_limit - n * _BYTES_PER_ROW
+    n_centroids = min(n_centroids, n, int(np.sqrt(max(remaining, 0) / 2 / 12)))
+    chunk_rows = int(remaining / 2 / ((ncols + n_centroids) * 8 * 3)) if n_centroids > 0 else 0
+    if n_centroids < 2 or chunk_rows < 1:
+        raise ValueError(f"`memory_limit` is too small to order {n} rows!")
+    batch_size = min(chunk_rows, 1024)
+
+    centroids = minibatch_kmeans(X, n_centroids, metric, batch_size, random_state=random_state)
+    centroids_order = cluster_order(centroids, EUCLIDEAN if metric == CORRELATION else metric,
+                                    method, block_size=batch_size, n_clusters=n_clusters)
+    if n_clusters is not None:
+        centroids_order, centroids_clusters = centroids_order
+    ranks = np.empty(n_centroids, dtype=np.intp)
+    ranks[centroids_order] = np.arange(n_centroids)
+
+    # The direction of every centroid, from its previous neighbor to its next neighbor
+    ordered = centroids[centroids_order]
+    directions = np.empty_like(ordered)
+    directions[1:-1] = ordered[2:] - ordered[:-2]
+    directions[0] = ordered[1] - ordered[0]
+    directions[-1] = ordered[-1] - ordered[-2]
+    directions = directions[ranks]
+
+    sq_norms = np.einsum("ij,ij->i", centroids, centroids)
+    labels = np.empty(n, dtype=np.intp)
+    projections = np.empty(n)
+    for start in range(0, n, chunk_rows):
+        stop = min(start + chunk_rows, n)
+        chunk = _prepare_rows(X[start:stop], metric)
+        labels[start:stop] = _nearest_centroids(chunk, centroids, sq_norms)
+        projections[start:stop] = np.einsum("ij,ij->i", chunk, directions[labels[start:stop]])
+    order = np.lexsort((projections, ranks[labels]))
+    if n_clusters is not None:
+        return order, centroids_clusters[labels]
+    return order
+
+
+def cluster_order(
+    X: ndarray, metric: str = EUCLIDEAN, method: str = COMPLETE, block_size: int = 1024,
+    dtype=np.float32, memory_limit: float = None, n_clusters: int = None
+) -> Union[ndarray, Tuple[ndarray, ndarray]]:
+    """Order the rows of `X` by hierarchical clustering
+
+    Parameters
+    ----------
+    X : ndarray
+        a 2D matrix, its rows are clustered
+    metric : str, optional
+        "euclidean" or "correlation", by default "euclidean"
+    method : str, optional
+        "single", "complete", "average" or "ward", by default "complete"
+    block_size : int, optional
+        the number of rows whose distances are computed at once, by default 1024
+    dtype : optional
+        the dtype of the distance matrix, by default np.float32, which halves the memory and is
+        precise enough for ordering
+    memory_limit : float, optional
+        the maximum bytes of working memory. If the distance matrix doesn't fit in it, order rows
+        by `approximate_cluster_order` instead. by default None, no limit
+    n_clusters : int, optional
+        also cut the dendrogram into `n_clusters` clusters by `cutree`, by default None
+
+    Returns
+    -------
+    Union[ndarray, Tuple[ndarray, ndarray]]
+        the indices of rows ordered by the dendrogram, and the cluster of every row if
+        `n_clusters` is provided
+
+    Raises
+    ------
+    ValueError
+        If `X` has NaN or infinite values, will raise ValueError
+    """
+    method = _check_method(method)
+    n, ncols = X.shape
+    if n < 3:
+        order = np.arange(n)
+        if n_clusters is not None:
+            return order, np.minimum(order, max(1, n_clusters) - 1)
+        return order
+    exact_memory = n * n * np.dtype(dtype).itemsize + n * ncols * 8 + block_size * n * 8
+    if memory_limit is not None and exact_memory > memory_limit:
+        return approximate_cluster_order(X, metric, method, memory_limit, n_clusters=n_clusters)
+    Z = linkage(pairwise_distances(X, metric, block_size, dtype), method)
+    if n_clusters is not None:
+        return leaves_order(Z), cutree(Z, n_clusters)
+    return leaves_order(Z)
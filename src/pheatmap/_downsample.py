@@ -0,0 +1,147 @@
+import numpy as np
+from numpy import ndarray
+
+MEAN = "mean"
+MAX = "max"
+MIN = "min"
+FIRST = "first"
+DOWNSAMPLE_METHODS = [MEAN, MAX, MIN, FIRST]
+
+
+def check_downsample_method(method: str) -> str:
+    """Validate the aggregation method used by downsampling"""
+    if method is None or method in DOWNSAMPLE_METHODS:
+        return method
+    else:
+        raise KeyError(f"`downsample` have to be chose from {DOWNSAMPLE_METHODS}!")
+
+
+def bin_edges(num: int, nbins: int) -> ndarray:
+    """Split `num` cells into `nbins` nearly equal contiguous bins
+
+    Parameters
+    ----------
+    num : int
+        the number of cells along an axis
+    nbins : int
+        the number of bins expected. If `nbins >= num`, every cell is a bin
+
+    Returns
+    -------
+    ndarray
+        the start index of every bin, its length is `min(num, nbins)`. The bins are the same for the
+        same `num` and `nbins`, so the heatmap and its annotation bars are binned consistently.
+    """
+    nbins = max(1, min(int(nbins), num))
+    return np.floor(np.arange(nbins) * (num / nbins)).astype(np.intp)
+
+
+def split_bin_edges(num: int, nbins: int, gaps: ndarray = None) -> ndarray:
+    """Split `num` cells into about `nbins` bins which don't cross the gaps
+
+    Parameters
+    ----------
+    num : int
+        the number of cells along an axis
+    nbins : int
+        the number of bins expected, every group between gaps gets a share of them in proportion
+        to its cells, at least one
+    gaps : ndarray, optional
+        the sorted positions of gaps, a gap at `p` is between cell `p - 1` and cell `p`. by
+        default None, the same as `bin_edges`
+
+    Returns
+    -------
+    ndarray
+        the start index of every bin, the gaps are always starts of bins
+    """
+    if gaps is None or len(gaps) == 0:
+        return bin_edges(num, nbins)
+    bounds = np.concatenate([[0], gaps, [num]])
+    sizes = np.diff(bounds)
+    group_bins = np.maximum(1, np.round(sizes * (nbins / num))).astype(np.intp)
+    return np.concatenate([
+        start + bin_edges(size, group_nbins)
+        for start, size, group_nbins in zip(bounds[:-1], sizes, group_bins)
+    ])
+
+
+def binned_gaps(num: int, nbins: int, gaps: ndarray) -> ndarray:
+    """Get the positions of gaps among the bins of `split_bin_edges`"""
+    return np.searchsorted(split_bin_edges(num, nbins, gaps), gaps)
+
+
+def reduce_axis(values: ndarray, starts: ndarray, method: str, axis: int) -> ndarray:
+    """Aggregate contiguous bins of `values` along `axis` by vectorized block reductions
+
+    Parameters
+    ----------
+    values : ndarray
+        a 2D array
+    starts : ndarray
+        the start index of every bin, see `bin_edges`
+    method : str
+        one of "mean", "max", "min" and "first"
+    axis : int
+        reduce along which axis
+
+    Returns
+    -------
+    ndarray
+    """
+    if len(starts) == values.shape[axis]:
+        return values
+    if method == FIRST:
+        return np.take(values, starts, axis=axis)
+    elif method == MAX:
+        return np.maximum.reduceat(values, starts, axis=axis)
+    elif method == MIN:
+        return np.minimum.reduceat(values, starts, axis=axis)
+    elif method == MEAN:
+        sums = np.add.reduceat(values, starts, axis=axis, dtype=np.float64)
+        counts = np.diff(np.append(starts, values.shape[axis]))
+        shape = [1, 1]
+        shape[axis] = -1
+        return sums / counts.reshape(shape)
+    else:
+        raise KeyError(f"`method` have to be chose from {DOWNSAMPLE_METHODS}!")
+
+
+def downsample(
+    values: ndarray, nrows: int, ncols: int, method: str = MEAN,
+    row_gaps: ndarray = None, col_gaps: ndarray = None
+) -> ndarray:
+    """Reduce a 2D matrix to about `nrows` x `ncols` cells
+
+    Parameters
+    ----------
+    values : ndarray
+        the 2D matrix
+    nrows : int
+        the maximum number of rows kept, usually the pixel height of the Axes
+    ncols : int
+        the maximum number of columns kept, usually the pixel width of the Axes
+    method : str, optional
+        how to aggregate the cells in a bin("mean", "max", "min" or "first"), by default "mean"
+    row_gaps : ndarray, optional
+        the positions of gaps between rows, no bin crosses them, see `split_bin_edges`. by
+        default None
+    col_gaps : ndarray, optional
+        the positions of gaps between columns, by default None
+
+    Returns
+    -------
+    ndarray
+    """
+    values = reduce_axis(
+        values, split_bin_edges(values.shape[0], nrows, row_gaps), method, axis=0)
+    values = reduce_axis(
+        values, split_bin_edges(values.shape[1], ncols, col_gaps), method, axis=1)
+    return values
+
+
+def axes_pixel_size(ax) -> tuple:
+    """Get the (height, width) of an Axes in pixels at the figure's dpi, the figure is saved at
+    it unless `savefig` is given another dpi"""
+    bbox = ax.get_window_extent()
+    return max(1, int(np.ceil(bbox.height))), max(1, int(np.ceil(bbox.width)))
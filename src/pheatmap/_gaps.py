@@ -0,0 +1,123 @@
+import numpy as np
+from numpy import ndarray
+from typing import List, Sequence, Tuple
+from matplotlib.axes import Axes
+from matplotlib.image import AxesImage
+
+# The size of gaps in points, as R's pheatmap
+GAP_SIZE = 4
+
+
+def check_gaps(gaps: Sequence, num: int, axis: str) -> ndarray:
+    """Check the positions of gaps as `gaps_row` of R's pheatmap, a gap at `p` splits the first
+    `p` rows/columns shown from the others
+
+    Returns
+    -------
+    ndarray
+        the sorted unique positions, empty if `gaps` is None
+
+    Raises
+    ------
+    ValueError
+        If a position is not between 0 and `num`(exclusive), will raise ValueError
+    """
+    if gaps is None:
+        return np.empty(0, dtype=np.intp)
+    gaps = np.unique(np.asarray(gaps, dtype=np.intp))
+    if gaps.size > 0 and (gaps[0] <= 0 or gaps[-1] >= num):
+        raise ValueError(f"The gaps_{axis} have to be between 0 and {num}, exclusive!")
+    return gaps
+
+
+def cluster_gaps(clusters: ndarray, order: ndarray) -> ndarray:
+    """Get the gaps between clusters, where the clusters of rows shown in `order` change"""
+    return np.flatnonzero(np.diff(np.asarray(clusters)[order]) != 0) + 1
+
+
+def group_bounds(gaps: ndarray, num: int) -> ndarray:
+    """Get the bounds of the groups split by gaps, group i is `[bounds[i], bounds[i + 1])`"""
+    return np.concatenate([[0], gaps, [num]]).astype(np.intp)
+
+
+def gap_width(ax: Axes, axis: str, gaps: ndarray, num: int, gap_size: float) -> float:
+    """Get the width of a gap in data units, so a gap is `gap_size` points in `ax` and `num`
+    cells share the rest of its height("row") or width("col"). It's 0 if the gaps don't fit."""
+    if len(gaps) == 0:
+        return 0.
+    bbox = ax.get_window_extent()
+    length = (bbox.height if axis == "row" else bbox.width) * 72 / ax.figure.dpi
+    cells = length - len(gaps) * gap_size
+    return gap_size * num / cells if cells > 0 else 0.
+
+
+def split_positions(positions: ndarray, gaps: ndarray, width: float) -> ndarray:
+    """Get the data coordinates of cells at `positions` after gaps of `width` are inserted"""
+    return positions + width * np.searchsorted(gaps, positions, side="right")
+
+
+def group_extents(gaps: ndarray, num: int, width: float) -> Tuple[ndarray, ndarray]:
+    """Get the data coordinates of the first and the last edges of every group"""
+    bounds = group_bounds(gaps, num)
+    offsets = width * np.arange(len(bounds) - 1)
+    return bounds[:-1] - 0.5 + offsets, bounds[1:] - 0.5 + offsets
+
+
+def _group_images(image: ndarray, row_bounds: ndarray, col_bounds: ndarray) -> List[ndarray]:
+    """Get the views of `image` for all groups, row by row"""
+    return [
+        image[top:bottom, left:right]
+        for top, bottom in zip(row_bounds[:-1], row_bounds[1:])
+        for left, right in zip(col_bounds[:-1], col_bounds[1:])
+    ]
+
+
+def imshow_groups(
+    ax: Axes, image: ndarray, row_bounds: ndarray, col_bounds: ndarray,
+    row_extents: Tuple[ndarray, ndarray], col_extents: Tuple[ndarray, ndarray], **kwargs
+) -> List[AxesImage]:
+    """Show an image split by gaps, every group is an AxesImage of a view of `image` placed at its
+    extent, so the image is colored once and the gaps are empty
+
+    Parameters
+    ----------
+    ax : Axes
+        the Axes to show the image
+    image : ndarray
+        the RGBA image of all groups without gaps
+    row_bounds : ndarray
+        the bounds of the groups in the rows of `image`, see `group_bounds`
+    col_bounds : ndarray
+        the bounds of the groups in the columns of `image`
+    row_extents : Tuple[ndarray, ndarray]
+        the data coordinates of the top and bottom edges of the groups, see `group_extents`
+    col_extents : Tuple[ndarray, ndarray]
+        the data coordinates of the left and right edges of the groups
+    kwargs : optional
+        other keyword arguments of `imshow`
+
+    Returns
+    -------
+    List[AxesImage]
+        the images of groups, row by row
+    """
+    extents = [
+        (left, right, bottom, top)
+        for top, bottom in zip(*row_extents) for left, right in zip(*col_extents)
+    ]
+    images = [
+        ax.imshow(part, aspect="auto", extent=extent, **kwargs)
+        for part, extent in zip(_group_images(image, row_bounds, col_bounds), extents)
+    ]
+    # Every image sets the limits to its extent
+    ax.set_xlim(col_extents[0][0], col_extents[1][-1])
+    ax.set_ylim(row_extents[1][-1], row_extents[0][0])
+    return images
+
+
+def set_groups_data(
+    images: List[AxesImage], image: ndarray, row_bounds: ndarray, col_bounds: ndarray
+) -> None:
+    """Replace the data of the images shown by `imshow_groups` in place"""
+    for ax_image, part in zip(images, _group_images(image, row_bounds, col_bounds)):
+        ax_image.set_data(part)
@@ -0,0 +1,131 @@
+from __future__ import annotations
+import numpy as np
+from typing import Any, Dict, List, Union, TYPE_CHECKING
+from matplotlib.figure import Figure
+from ._heatmap import Heatmap
+from ._annotation import ListAnnotationBar
+from ._legend import Legend
+from ._chunked import load_matrix
+from ._scale import scale_matrix
+from ._profile import stage
+from ._utils import CONTINUOUS
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+# The arguments of `pheatmap` used to create legends
+_LEGEND_ARGUMENTS = [
+    "legend_tick_locs", "legend_tick_labels", "legend_tick_labels_styles", "legend_titles",
+    "legend_title_styles"
+]
+
+
+class PheatmapHandle:
+    def __init__(
+        self, fig: Figure, heatmap: Heatmap,
+        row_annotationbars: Union[ListAnnotationBar, None],
+        col_annotationbars: Union[ListAnnotationBar, None],
+        legends: List[Legend], arguments: Dict[str, Any]
+    ) -> None:
+        """The handle of a drawn heatmap returned by `pheatmap(..., return_handle=True)`, which
+        updates the matrix and annotations in place
+
+        Parameters
+        ----------
+        fig : Figure
+            the figure drawn
+        heatmap : Heatmap
+            the heatmap drawn
+        row_annotationbars : Union[ListAnnotationBar, None]
+            the row AnnotationBars drawn, None if there are no row annotations
+        col_annotationbars : Union[ListAnnotationBar, None]
+            the column AnnotationBars drawn, None if there are no column annotations
+        legends : List[Legend]
+            the legends drawn, the heatmap's legend is the first one
+        arguments : Dict[str, Any]
+            the arguments of `pheatmap`, used to lay out again when the shapes change
+        """
+        self.fig = fig
+        self.heatmap = heatmap
+        self.row_annotationbars = row_annotationbars
+        self.col_annotationbars = col_annotationbars
+        self.legends = legends
+        self.arguments = arguments
+
+    def update(
+        self, mat=None, annotation_row: DataFrame = None, annotation_col: DataFrame = None
+    ) -> None:
+        """Replace the matrix and/or annotations of the drawn heatmap, such as the next frame of an
+        animation or a dashboard. Redraw the canvas after it, such as `fig.canvas.draw_idle()`.
+
+        The images are updated by `set_data`, and the legends whose limits changed by
+        `Legend.set_norm`, so the layout, Axes and names are kept. The norms are computed again
+        from `vmin`/`vmax` of `pheatmap`, fixed limits keep the colors comparable between frames.
+        The orders from clustering are kept as well, so rows don't move between frames.
+
+        Only if the shape of the matrix, or the columns, types or categories of an annotation
+        change, the figure is cleared and drawn again by `pheatmap`, clustering included.
+
+        Parameters
+        ----------
+        mat : optional
+            the new matrix, the same types as `mat` of `pheatmap`. by default None, keep it
+        annotation_row : DataFrame, optional
+            the new row annotations, by default None, keep them
+        annotation_col : DataFrame, optional
+            the new column annotations, by default None, keep them
+        """
+        inputs = dict(mat=mat, annotation_row=annotation_row, annotation_col=annotation_col)
+        arguments = dict(self.arguments)
+        arguments.update({key: value for key, value in inputs.items() if value is not None})
+        with stage("update"):
+            if self._update_in_place(arguments, mat, annotation_row, annotation_col):
+                self.arguments = arguments
+                return
+        # `_pheatmap` imports this module
+        from ._pheatmap import pheatmap
+        handle = pheatmap(**dict(arguments, fig=self.fig, return_handle=True))
+        self.__dict__.update(vars(handle))
+
+    def _update_in_place(
+        self, arguments: Dict[str, Any], mat, annotation_row: Union[DataFrame, None],
+        annotation_col: Union[DataFrame, None]
+    ) -> bool:
+        """Update the drawn images and legends, return False if a new layout is needed"""
+        if mat is not None:
+            mat = scale_matrix(
+                load_matrix(mat), arguments["scale"], dtype=arguments["scale_dtype"],
+                inplace=arguments["scale_inplace"]
+            )
+            if tuple(mat.shape) != (self.heatmap.nrows, self.heatmap.ncols):
+                return False
+        for anno, annotationbars in [
+            (annotation_row, self.row_annotationbars), (annotation_col, self.col_annotationbars)
+        ]:
+            if anno is None:
+                continue
+            if annotationbars is None or not annotationbars.set_anno(anno):
+                return False
+            annotationbars.update_images()
+        if mat is not None:
+            self.heatmap.set_data(mat)
+            self.heatmap.update_image()
+        self._update_legends(arguments)
+        return True
+
+    def _update_legends(self, arguments: Dict[str, Any]) -> None:
+        """Update the legends of CONTINUOUS values whose limits or ticks changed"""
+        # `_pheatmap` imports this module
+        from ._pheatmap import create_legends
+        new_legends = create_legends(
+            self.heatmap, self.row_annotationbars, self.col_annotationbars,
+            **{key: arguments[key] for key in _LEGEND_ARGUMENTS}
+        )
+        for legend, new_legend in zip(self.legends, new_legends):
+            if legend.bartype != CONTINUOUS:
+                continue
+            changed = (legend.norm.vmin, legend.norm.vmax) != \
+                (new_legend.norm.vmin, new_legend.norm.vmax) or \
+                not np.array_equal(legend.ticks, new_legend.ticks)
+            if changed:
+                legend.set_norm(new_legend.norm, new_legend.ticks, new_legend.labels)
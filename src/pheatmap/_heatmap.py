@@ -1,33 +1,59 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from typing import Union
+from typing import Union, Sequence
 from numpy import ndarray
-from matplotlib.colors import Colormap
+from matplotlib.colors import Colormap, to_rgba
 from matplotlib.axes import Axes
-from ._utils import get_norm, get_cmap
+from matplotlib.collections import LineCollection
+from matplotlib import rcParams
+from matplotlib.font_manager import FontProperties
+from ._utils import get_norm, get_cmap, resample_cmap, map_colors, needs_sketch
+from ._numbers import NumberCollection, format_numbers, text_paths, number_colors
+from ._sketch import QuantileSketch
+from ._downsample import (
+    MEAN, check_downsample_method, downsample, binned_gaps, axes_pixel_size
+)
+from ._chunked import MAX_RESOLUTION, load_matrix, is_out_of_core, reduce_chunks
+from ._gaps import (
+    GAP_SIZE, check_gaps, gap_width, group_bounds, group_extents, split_positions,
+    imshow_groups, set_groups_data
+)
 
 
 class Heatmap:
     def __init__(
-        self, mat: ndarray,
-        cmap: Union[str, Colormap, list], vmin: float = None, vmax: float = None,
+        self, mat: Union[ndarray, str],
+        cmap: Union[str, Colormap, list],
+        vmin: Union[float, str] = None, vmax: Union[float, str] = None,
         name: str = None, rownames: ndarray = None, colnames: ndarray = None,
         rownames_side: str = "left", colnames_side: str = "top",
         rownames_style: dict = dict(rotation=0), colnames_style: dict = dict(rotation=0),
-        edgecolor: str = "none", edgewidth: float = 1
+        edgecolor: str = "none", edgewidth: float = 1, downsample: str = None,
+        row_order: ndarray = None, col_order: ndarray = None, lut_size: int = None,
+        rownames_thinning: bool = False, colnames_thinning: bool = False,
+        rownames_highlight: Sequence = None, colnames_highlight: Sequence = None,
+        display_numbers: Union[bool, ndarray] = False, number_format: str = "%.2f",
+        number_color: str = None, fontsize_number: float = 6,
+        gaps_row: Sequence = None, gaps_col: Sequence = None, gap_size: float = GAP_SIZE
     ) -> None:
         """Heatmap
 
         Parameters
         ----------
-        mat : ndarray
-            the matrix used to plot heatmap
+        mat : Union[ndarray, str]
+            the matrix used to plot heatmap. It can be a `numpy.memmap`, the path of a `.npy` file
+            or an object of the chunked-array protocol(a 2D `shape` and `mat[start:stop]` returns
+            rows as an array-like, such as `h5py.Dataset`). They are read by row chunks only once,
+            which finds the bounds and reduces the matrix to at most 4096 x 4096 cells by
+            `downsample`("mean" if it's None), so the memory is bounded for any matrix size.
         cmap : Union[str, Colormap, list]
             colormap for the matrix
-        vmin : float, optional
-            the minemum value scaled. by default None, use the minemum value of matrix. 
-        vmax : float, optional
-            the maximum value scaled. by default None, use the maximum value of matrix.
+        vmin : Union[float, str], optional
+            the minemum value scaled. It can be a percentile of the matrix such as "p1", which is
+            computed by a streaming quantile sketch, or "symmetric", the negative of `vmax`. by
+            default None, use the minemum value of matrix. NaN are ignored.
+        vmax : Union[float, str], optional
+            the maximum value scaled, see `vmin`. by default None, use the maximum value of
+            matrix. If `vmin` and `vmax` are both "symmetric", they cover all values around 0.
         name : str, optional
             heatmap name, show it on its legend. by default None, don't show the name
         rownames : ndarray, optional
@@ -50,25 +76,131 @@ class Heatmap:
             it default as "black". 
         edgewidth : float, optional
             the width of heatmap's cell edge, by default 1
+        downsample : str, optional
+            aggregate the matrix to the pixel grid of its Axes before rendering, by "mean", "max",
+            "min" or "first" of the cells in a pixel. The pixels are counted at the dpi of the
+            figure, so draw in a figure of the dpi it's saved at. by default None, render the
+            whole matrix
+        row_order : ndarray, optional
+            the indices of rows in the order to show, such as the order from clustering. The matrix
+            is not reordered until it is rendered. by default None, keep the original order
+        col_order : ndarray, optional
+            See `row_order`, by default None
+        lut_size : int, optional
+            the number of colors in the lookup table used to color the matrix, such as 256 or 4096.
+            by default None, use the number of colors of `cmap`
+        rownames_thinning : bool, optional
+            only show every k-th row name, k is computed from the Axes height and the font size so
+            that the names don't overlap. by default False, show all row names
+        colnames_thinning : bool, optional
+            See `rownames_thinning`, by default False
+        rownames_highlight : Sequence, optional
+            only show these row names, by default None
+        colnames_highlight : Sequence, optional
+            only show these column names, by default None
+        display_numbers : Union[bool, ndarray], optional
+            show the values of cells by `number_format` if True, or the labels of a matrix of the
+            same shape. All numbers are drawn as one collection of glyph outlines, and skipped if
+            the matrix is downsampled or the cells are smaller than the numbers. by default False
+        number_format : str, optional
+            the printf-style format of values, by default "%.2f"
+        number_color : str, optional
+            the color of numbers, by default None, white on dark cells and black on light cells
+        fontsize_number : float, optional
+            the font size of numbers, by default 6
+        gaps_row : Sequence, optional
+            split the rows shown at these positions as R's pheatmap, a gap at `p` is between the
+            `p`-th and `p + 1`-th rows shown. All groups share the norm and the colored image,
+            every group is a view of it placed between gaps. by default None, no gaps
+        gaps_col : Sequence, optional
+            See `gaps_row`, by default None
+        gap_size : float, optional
+            the size of gaps in points, by default 4
         """
-        self.mat = mat
+        self.mat = load_matrix(mat)
         self.name = name
-
-        self.cmap = get_cmap(cmap)
-        self.norm = get_norm(self.mat, vmin, vmax)
+        self.downsample = check_downsample_method(downsample)
 
         self.nrows, self.ncols = self._get_nrows_ncols()
         self.rownames = self._check_names(axis="row", names=rownames)
         self.colnames = self._check_names(axis="col", names=colnames)
         self.sides = self._parse_name_side(rownames_side, colnames_side)
+        self.row_order = self._check_order(axis="row", order=row_order)
+        self.col_order = self._check_order(axis="col", order=col_order)
+        self.gaps_row = check_gaps(gaps_row, self.nrows, axis="row")
+        self.gaps_col = check_gaps(gaps_col, self.ncols, axis="col")
+        self.gap_size = gap_size
+
+        self.cmap = resample_cmap(get_cmap(cmap), lut_size)
+        self.vmin, self.vmax = vmin, vmax
+        self.reduced_mat, self.norm = self._prepare_values()
 
         self.rownames_style, self.colnames_style = rownames_style, colnames_style
+        self.rownames_thinning, self.colnames_thinning = rownames_thinning, colnames_thinning
+        self.rownames_highlight, self.colnames_highlight = rownames_highlight, colnames_highlight
         self.edgecolor = edgecolor
         self.edgewidth = edgewidth
+        self.display_numbers = self._check_numbers(display_numbers)
+        self.number_format, self.number_color = number_format, number_color
+        self.fontsize_number = fontsize_number
+        # The images of the groups split by gaps, and the widths of gaps in data units when drawn
+        self.images = []
+        self.gap_widths = (0., 0.)
+        self.numbers = None
+
+    @property
+    def image(self):
+        """The image drawn, the first group's if it's split by gaps"""
+        return self.images[0] if len(self.images) > 0 else None
 
     def _get_nrows_ncols(self):
         return self.mat.shape
 
+    def _prepare_values(self) -> tuple:
+        """Reduce the matrix if it's out-of-core and compute the norm from `vmin` and `vmax`
+
+        Returns
+        -------
+        tuple
+            the reduced matrix(None if the matrix is in memory) and the norm
+        """
+        sketch = QuantileSketch() if needs_sketch(self.vmin, self.vmax) else None
+        reduced = self._reduce_out_of_core(sketch)
+        if reduced is None:
+            return None, get_norm(self.mat, self.vmin, self.vmax)
+        reduced_mat, data_vmin, data_vmax = reduced
+        norm = get_norm(
+            reduced_mat, self.vmin, self.vmax, bounds=(data_vmin, data_vmax), sketch=sketch)
+        return reduced_mat, norm
+
+    def set_data(self, mat: Union[ndarray, str]) -> None:
+        """Replace the matrix by one of the same shape, such as the next frame of an animation.
+        The names, orders and colormap are kept, the norm is computed again from `vmin` and
+        `vmax`. Update the drawn image by `get_image`.
+
+        Raises
+        ------
+        ValueError
+            If the shape of `mat` is not the shape of the matrix, will raise ValueError
+        """
+        mat = load_matrix(mat)
+        if tuple(mat.shape) != (self.nrows, self.ncols):
+            raise ValueError(
+                f"The shape of the new matrix {tuple(mat.shape)} is not "
+                f"{(self.nrows, self.ncols)}!")
+        self.mat = mat
+        self.reduced_mat, self.norm = self._prepare_values()
+
+    def _check_numbers(self, display_numbers: Union[bool, ndarray]) -> Union[bool, ndarray]:
+        """Check the labels of cells have the shape of the matrix"""
+        if isinstance(display_numbers, (bool, np.bool_)):
+            return bool(display_numbers)
+        labels = np.asarray(display_numbers)
+        if labels.shape != (self.nrows, self.ncols):
+            raise ValueError(
+                f"The shape of display_numbers {labels.shape} is not {(self.nrows, self.ncols)}!")
+        return labels
+
     def _parse_name_side(self, rownames_side: str, colnames_side: str) -> dict:
         """Parse the row/column names' side
 
@@ -134,14 +266,187 @@ class Heatmap:
         else:
             return names
 
+    def _check_order(self, axis: str, order: ndarray) -> ndarray:
+        """Check the row/column order provided is a permutation of rows/columns"""
+        num = self.nrows if axis == "row" else self.ncols
+        if order is None:
+            return order
+        order = np.asarray(order, dtype=np.intp)
+        if len(order) != num or not np.array_equal(np.sort(order), np.arange(num)):
+            raise ValueError(f"The {axis}_order is not a permutation of the {axis}s of matrix!")
+        return order
+
+    def _reduce_out_of_core(self, sketch: QuantileSketch = None) -> Union[tuple, None]:
+        """Reduce an out-of-core matrix and find its bounds in one pass over its row chunks, the
+        values are also added to `sketch` if provided
+
+        Returns
+        -------
+        Union[tuple, None]
+            the reduced matrix in the order to show, the minimum and maximum values. None if the
+            matrix is in memory.
+        """
+        if not is_out_of_core(self.mat):
+            return None
+        method = self.downsample if self.downsample is not None else MEAN
+        return reduce_chunks(
+            self.mat, MAX_RESOLUTION, MAX_RESOLUTION, method,
+            row_order=self.row_order, col_order=self.col_order, sketch=sketch,
+            row_gaps=self.gaps_row, col_gaps=self.gaps_col
+        )
+
+    def _get_reduced_gaps(self) -> tuple:
+        """Get the positions of gaps in the reduced matrix, they are bounds of its bins"""
+        return (binned_gaps(self.nrows, MAX_RESOLUTION, self.gaps_row),
+                binned_gaps(self.ncols, MAX_RESOLUTION, self.gaps_col))
+
+    def _get_render_mat(self, ax: Axes) -> ndarray:
+        """Get the matrix rendered in `ax`, reordered and downsampled to the pixel grid of `ax` if
+        required"""
+        if self.reduced_mat is not None:
+            # Already reordered, an out-of-core matrix is always downsampled
+            height, width = axes_pixel_size(ax)
+            method = self.downsample if self.downsample is not None else MEAN
+            row_gaps, col_gaps = self._get_reduced_gaps()
+            return downsample(self.reduced_mat, height, width, method, row_gaps, col_gaps)
+        mat = self.mat
+        if self.row_order is not None:
+            mat = np.take(mat, self.row_order, axis=0)
+        if self.col_order is not None:
+            mat = np.take(mat, self.col_order, axis=1)
+        if self.downsample is None:
+            return mat
+        height, width = axes_pixel_size(ax)
+        return downsample(mat, height, width, self.downsample, self.gaps_row, self.gaps_col)
+
+    def _get_render_gaps(self, ax: Axes) -> tuple:
+        """Get the positions of gaps in the matrix rendered in `ax`, see `_get_render_mat`"""
+        if self.reduced_mat is not None:
+            nrows, ncols = self.reduced_mat.shape
+            row_gaps, col_gaps = self._get_reduced_gaps()
+        elif self.downsample is not None:
+            nrows, ncols, row_gaps, col_gaps = self.nrows, self.ncols, self.gaps_row, self.gaps_col
+        else:
+            return self.gaps_row, self.gaps_col
+        height, width = axes_pixel_size(ax)
+        return binned_gaps(nrows, height, row_gaps), binned_gaps(ncols, width, col_gaps)
+
+    def _get_bounds(self, ax: Axes, image: ndarray) -> tuple:
+        """Get the (row, column) bounds of the groups split by gaps in `image` rendered in `ax`,
+        see `group_bounds`"""
+        row_gaps, col_gaps = self._get_render_gaps(ax)
+        return group_bounds(row_gaps, image.shape[0]), group_bounds(col_gaps, image.shape[1])
+
+    def _split_positions(self, positions: ndarray, axis: str) -> ndarray:
+        """Get the data coordinates of rows/columns shown at `positions`, shifted by the gaps"""
+        if axis == "row":
+            return split_positions(positions, self.gaps_row, self.gap_widths[0])
+        return split_positions(positions, self.gaps_col, self.gap_widths[1])
+
+    def _get_extents(self, axis: str) -> tuple:
+        """Get the data coordinates of the first and the last edges of the row/column groups"""
+        if axis == "row":
+            return group_extents(self.gaps_row, self.nrows, self.gap_widths[0])
+        return group_extents(self.gaps_col, self.ncols, self.gap_widths[1])
+
+    def _get_cell_size(self, ax: Axes, axis: str) -> float:
+        """Get the height("row") or width("col") of cells in points"""
+        bbox = ax.get_window_extent()
+        if axis == "row":
+            length, units = bbox.height, self.nrows + len(self.gaps_row) * self.gap_widths[0]
+        else:
+            length, units = bbox.width, self.ncols + len(self.gaps_col) * self.gap_widths[1]
+        return length * 72 / ax.figure.dpi / units
+
+    def _get_names_positions(self, ax: Axes, axis: str) -> ndarray:
+        """Get the positions of the row/column names shown, only these names create Text
+
+        Parameters
+        ----------
+        ax : Axes
+            the Axes of heatmap
+        axis : str
+            "row" or "col"?
+
+        Returns
+        -------
+        ndarray
+            the positions of names in the reordered heatmap
+        """
+        if axis == "row":
+            names, order, num = self.rownames, self.row_order, self.nrows
+            thinning, highlight, style = \
+                self.rownames_thinning, self.rownames_highlight, self.rownames_style
+        else:
+            names, order, num = self.colnames, self.col_order, self.ncols
+            thinning, highlight, style = \
+                self.colnames_thinning, self.colnames_highlight, self.colnames_style
+
+        if highlight is not None:
+            indices = np.flatnonzero(np.isin(np.asarray(names), list(highlight)))
+            if order is None:
+                return indices
+            positions = np.empty(num, dtype=np.intp)
+            positions[order] = np.arange(num)
+            return np.sort(positions[indices])
+        elif thinning:
+            # How many names can be placed along the Axes without overlap
+            default_size = rcParams["ytick.labelsize" if axis == "row" else "xtick.labelsize"]
+            size = style.get("size", style.get("fontsize", default_size))
+            size = FontProperties(size=size).get_size_in_points()
+            bbox = ax.get_window_extent()
+            length = (bbox.height if axis == "row" else bbox.width) * 72 / ax.figure.dpi
+            rotation = style.get("rotation", 0)
+            if axis == "col" and rotation in [0, 180, "horizontal"]:
+                # Horizontal column names are as wide as their text
+                sample = [names[i] for i in range(0, num, max(1, num // 100))]
+                spacing = size * 0.6 * max(len(str(name)) for name in sample) + size
+            else:
+                spacing = size * 1.2
+            step = int(np.ceil(num / max(1, length // spacing)))
+            return np.arange(0, num, step)
+        else:
+            return np.arange(num)
+
+    def _set_names(self, ax: Axes, axis: str) -> None:
+        """Set row/column names as tick labels, names are read only for the positions shown"""
+        if axis == "row":
+            names, order, style, set_ticks = \
+                self.rownames, self.row_order, self.rownames_style, ax.set_yticks
+        else:
+            names, order, style, set_ticks = \
+                self.colnames, self.col_order, self.colnames_style, ax.set_xticks
+        # Text style only takes effect with labels
+        if names is None:
+            set_ticks([], minor=False)
+            return
+        positions = self._get_names_positions(ax, axis)
+        indices = positions if order is None else order[positions]
+        set_ticks(self._split_positions(positions, axis), labels=[names[i] for i in indices],
+                  minor=False, **style)
+
+    def get_image(self, ax: Axes) -> ndarray:
+        """Get the uint8 RGBA image of the matrix rendered in `ax`, colored by the lookup table"""
+        return map_colors(self._get_render_mat(ax), self.cmap, self.norm)
+
     def draw(self, ax: Axes) -> None:
-        ax.imshow(self.mat, norm=self.norm, cmap=self.cmap, aspect="auto")
+        # Keep the data coordinates of cells even if the matrix is downsampled, gaps are inserted
+        # between groups in data units
+        self.gap_widths = (
+            gap_width(ax, "row", self.gaps_row, self.nrows, self.gap_size),
+            gap_width(ax, "col", self.gaps_col, self.ncols, self.gap_size)
+        )
+        # imshow displays the uint8 RGBA image directly, it's kept to update the data in place
+        image = self.get_image(ax)
+        self.images = imshow_groups(
+            ax, image, *self._get_bounds(ax, image), self._get_extents("row"),
+            self._get_extents("col")
+        )
+        self.draw_numbers(ax)
 
         # Set row/colnames and their font style(rotation, family, size, etc)
-        ax.set_xticks(np.arange(self.ncols), labels=self.colnames,
-                      minor=False, **self.colnames_style)
-        ax.set_yticks(np.arange(self.nrows), labels=self.rownames,
-                      minor=False, **self.rownames_style)
+        self._set_names(ax, axis="col")
+        self._set_names(ax, axis="row")
 
         # Set ticks and ticklabels location and if show them
         ax.tick_params(
@@ -150,17 +455,98 @@ class Heatmap:
         )
 
         # Configure edges color and width
-        if self.edgecolor:
-            ax.set_xticks(np.arange(-0.5, self.ncols), minor=True)
-            ax.set_yticks(np.arange(-0.5, self.nrows), minor=True)
-            ax.tick_params(axis="both", which="minor", pad=0,
-                           top=False, bottom=False, left=False, right=False)
+        ax.grid(False, axis="both", which="both")
+        edgecolor = rcParams["patch.edgecolor"] if self.edgecolor is None else self.edgecolor
+        if to_rgba(edgecolor)[3] > 0 and len(self.gaps_row) + len(self.gaps_col) > 0:
+            # Every group is outlined by the edges, the Axes spans the gaps
+            ax.spines[:].set_visible(False)
+            ax.add_collection(LineCollection(
+                self._get_edges(ax), colors=edgecolor, linewidths=self.edgewidth), autolim=False)
+        elif to_rgba(edgecolor)[3] > 0:
             # For whole Axes
-            ax.spines[:].set_color(self.edgecolor)
+            ax.spines[:].set_color(edgecolor)
             ax.spines[:].set_linewidth(self.edgewidth)
             # For every cells
-            ax.grid(True, axis="both", which="minor",
-                    color=self.edgecolor, linewidth=self.edgewidth)
+            edges = self._get_edges(ax)
+            if edges is not None:
+                ax.add_collection(LineCollection(
+                    edges, colors=edgecolor, linewidths=self.edgewidth), autolim=False)
         else:
             ax.spines[:].set_visible(False)
-            ax.grid(False, axis="both", which="both")
+
+    def update_image(self) -> None:
+        """Update the drawn images and numbers by the matrix set by `set_data`"""
+        ax = self.image.axes
+        image = self.get_image(ax)
+        set_groups_data(self.images, image, *self._get_bounds(ax, image))
+        self.draw_numbers(ax)
+
+    def draw_numbers(self, ax: Axes) -> None:
+        """Draw the numbers of cells as a `NumberCollection`, which replaces the drawn one. They
+        are skipped if the matrix is downsampled or the cells are smaller than the numbers."""
+        if self.numbers is not None:
+            self.numbers.remove()
+            self.numbers = None
+        if self.display_numbers is False:
+            return
+        mat = np.asarray(self._get_render_mat(ax))
+        if mat.shape != (self.nrows, self.ncols):
+            return
+        prop = FontProperties(size=self.fontsize_number)
+        if self._get_cell_size(ax, "row") < prop.get_size_in_points():
+            return
+
+        if self.display_numbers is True:
+            strings = format_numbers(mat, self.number_format)
+        else:
+            strings = self.display_numbers.astype(str)
+            if self.row_order is not None:
+                strings = np.take(strings, self.row_order, axis=0)
+            if self.col_order is not None:
+                strings = np.take(strings, self.col_order, axis=1)
+        paths, max_width = text_paths(strings, prop)
+        if self._get_cell_size(ax, "col") < max_width:
+            return
+        rows, cols = np.nonzero(np.isin(strings, list(paths)))
+        self.numbers = ax.add_collection(NumberCollection(
+            [paths[string] for string in strings[rows, cols]],
+            offsets=np.column_stack([
+                self._split_positions(cols, "col"), self._split_positions(rows, "row")
+            ]), offset_transform=ax.transData,
+            colors=number_colors(mat[rows, cols], self.cmap, self.norm, self.number_color)
+        ), autolim=False)
+
+    def _get_edge_positions(self, ax: Axes, axis: str) -> ndarray:
+        """Get the data coordinates of the edges between rows/columns. They are suppressed if the
+        cells are not larger than the edge width, which would cover the cells totally. If the
+        heatmap is split by gaps, the edges around every group are included."""
+        gaps, num = (self.gaps_row, self.nrows) if axis == "row" else (self.gaps_col, self.ncols)
+        positions = []
+        if self._get_cell_size(ax, axis) > self.edgewidth:
+            inner = np.setdiff1d(np.arange(1, num), gaps)
+            positions.append(self._split_positions(inner, axis) - 0.5)
+        if len(self.gaps_row) + len(self.gaps_col) > 0:
+            positions.extend(self._get_extents(axis))
+        return np.concatenate(positions) if positions else np.empty(0)
+
+    def _get_edges(self, ax: Axes) -> Union[ndarray, None]:
+        """Get the line segments of edges, an edge crosses every group along it
+
+        Returns
+        -------
+        Union[ndarray, None]
+            the segments for `LineCollection`, the shape is (n, 2, 2)
+        """
+        segments = []
+        for axis, (starts, stops) in [("row", self._get_extents("col")),
+                                      ("col", self._get_extents("row"))]:
+            positions = self._get_edge_positions(ax, axis)
+            if len(positions) == 0:
+                continue
+            positions, starts = np.meshgrid(positions, starts, indexing="ij")
+            _, stops = np.meshgrid(positions[:, 0], stops, indexing="ij")
+            # Rows are (y, x) points, reversed to (x, y) for horizontal edges
+            lines = np.stack([np.stack([positions, starts], axis=-1),
+                              np.stack([positions, stops], axis=-1)], axis=-2).reshape(-1, 2, 2)
+            segments.append(lines[..., ::-1] if axis == "row" else lines)
+        return np.concatenate(segments) if segments else None
@@ -0,0 +1,383 @@
+from __future__ import annotations
+import numpy as np
+from numpy import ndarray
+from typing import Any, Dict, List, Sequence, Union, TYPE_CHECKING
+from matplotlib.axes import Axes
+from matplotlib.colors import Colormap
+from matplotlib.figure import Figure
+from ._heatmap import Heatmap
+from ._legend import Legend
+from ._layout import Layout
+from ._pheatmap import (
+    check_margin_names, create_annotation, create_legends, cut_cluster_order, margin_names
+)
+from ._chunked import load_matrix
+from ._scale import scale_matrix
+from ._gaps import GAP_SIZE
+from ._profile import stage, count_artists
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+# Concatenate the heatmaps side by side, sharing rows, or from top to bottom, sharing columns
+DIRECTIONS = ["horizontal", "vertical"]
+# The options which every panel can set, the arguments of `HeatmapList` are their defaults
+_PANEL_OPTIONS = [
+    "name", "cmap", "vmin", "vmax", "lut_size", "scale", "scale_dtype", "edgecolor", "edgewidth",
+    "display_numbers", "number_format", "number_color", "fontsize_number"
+]
+# The options of the axis which is not shared, "{axis}" is "col" for "horizontal"
+_PANEL_AXIS_OPTIONS = [
+    "{axis}names", "show_{axis}names", "{axis}names_style", "{axis}names_thinning",
+    "cluster_{axis}s", "clustering_distance_{axis}s", "cutree_{axis}s", "gaps_{axis}",
+    "annotation_{axis}", "annotation_{axis}_cmaps", "annotation_{axis}_limits"
+]
+
+
+def _hide_labels(ax: Axes) -> None:
+    """Hide the tick labels of an Axes"""
+    ax.tick_params(labeltop=False, labelbottom=False, labelleft=False, labelright=False)
+
+
+def _legend_key(legend: Legend) -> tuple:
+    """Legends of the same key show the same colors and labels, only one of them is drawn"""
+    return (legend.name, legend.bartype, legend.cmap.name, legend.cmap.N, legend.norm.vmin,
+            legend.norm.vmax, tuple(str(label) for label in legend.labels))
+
+
+class HeatmapList:
+    def __init__(
+        self, mats: Sequence[Union[DataFrame, ndarray, str]],
+        panels: Sequence[Dict[str, Any]] = None, direction: str = "horizontal", main: int = 0,
+        cmap: Union[str, Colormap, list] = "bwr",
+        vmin: Union[float, str] = None, vmax: Union[float, str] = None, name: str = None,
+        rownames: ndarray = None, colnames: ndarray = None,
+        rownames_side: str = "right", colnames_side: str = "bottom",
+        show_rownames: bool = True, show_colnames: bool = True,
+        rownames_style: dict = dict(rotation=0, size=6),
+        colnames_style: dict = dict(rotation=0, size=6),
+        rownames_thinning: bool = False, colnames_thinning: bool = False,
+        edgecolor: str = "none", edgewidth: float = 1, downsample: str = None,
+        lut_size: int = None, display_numbers: Union[bool, ndarray] = False,
+        number_format: str = "%.2f", number_color: str = None, fontsize_number: float = 6,
+        scale: str = "none", scale_dtype=np.float64,
+        cluster_rows: bool = False, cluster_cols: bool = False,
+        clustering_distance_rows: str = "euclidean", clustering_distance_cols: str = "euclidean",
+        clustering_method: str = "complete", clustering_memory_limit: float = None,
+        cutree_rows: int = None, cutree_cols: int = None,
+        gaps_row: Sequence = None, gaps_col: Sequence = None, gap_size: float = GAP_SIZE,
+        annotation_row: DataFrame = None, annotation_col: DataFrame = None,
+        annotation_row_cmaps: Dict[str, Union[str, Colormap, list]] = None,
+        annotation_col_cmaps: Dict[str, Union[str, Colormap, list]] = None,
+        annotation_row_limits: Dict[str, tuple] = None,
+        annotation_col_limits: Dict[str, tuple] = None,
+        annotation_row_names_style: Dict = dict(size=6),
+        annotation_col_names_style: Dict = dict(size=6),
+        show_annotation_row_names: bool = True, show_annotation_col_names: bool = True
+    ) -> None:
+        """Several heatmaps concatenated in one figure, such as RNA, ATAC and protein matrices of
+        the same genes side by side
+
+        Heatmaps concatenated "horizontally" share their rows: the order, gaps and names of rows
+        and the row annotations are computed once, from the `main` matrix, and the row names and
+        annotations are drawn once. "vertically" concatenated heatmaps share their columns in the
+        same way. Every heatmap keeps its own colors, clustering and annotations of the other axis.
+
+        Parameters
+        ----------
+        mats : Sequence[Union[DataFrame, ndarray, str]]
+            the matrices, see `pheatmap`. They have the same number of rows("horizontal") or
+            columns("vertical")
+        panels : Sequence[Dict[str, Any]], optional
+            the options of every heatmap, such as `dict(name="RNA", cmap="Reds", vmax="p99")`.
+            The keys are "name", "cmap", "vmin", "vmax", "lut_size", "scale", "scale_dtype",
+            "edgecolor", "edgewidth", "display_numbers", "number_format", "number_color",
+            "fontsize_number", and the options of the axis not shared, such as "colnames",
+            "show_colnames", "colnames_style", "colnames_thinning", "cluster_cols",
+            "clustering_distance_cols", "cutree_cols", "gaps_col", "annotation_col",
+            "annotation_col_cmaps" and "annotation_col_limits" for "horizontal". The arguments of
+            the same names are the defaults. by default None, all heatmaps use the defaults
+        direction : str, optional
+            "horizontal" or "vertical", by default "horizontal"
+        main : int, optional
+            the index of the matrix which orders the shared axis by clustering, by default 0
+        cmap, vmin, vmax, name, rownames, colnames, show_rownames, show_colnames, \\
+        rownames_style, colnames_style, rownames_thinning, colnames_thinning, edgecolor, \\
+        edgewidth, downsample, lut_size, display_numbers, number_format, number_color, \\
+        fontsize_number, scale, scale_dtype, cluster_rows, cluster_cols, \\
+        clustering_distance_rows, clustering_distance_cols, clustering_method, \\
+        clustering_memory_limit, cutree_rows, cutree_cols, gaps_row, gaps_col, gap_size, \\
+        annotation_row, annotation_col, annotation_row_cmaps, annotation_col_cmaps, \\
+        annotation_row_limits, annotation_col_limits, annotation_row_names_style, \\
+        annotation_col_names_style, show_annotation_row_names, show_annotation_col_names : optional
+            see `pheatmap`
+        rownames_side : str, optional
+            the shared row names of "horizontal" heatmaps are drawn once, on the "left" of the
+            first heatmap or the "right" of the last one. by default "right"
+        colnames_side : str, optional
+            the shared column names of "vertical" heatmaps are drawn once, on the "top" of the
+            first heatmap or the "bottom" of the last one. by default "bottom"
+
+        Raises
+        ------
+        KeyError
+            If `direction` is not correct, will raise KeyError
+        ValueError
+            If the matrices don't share the axis, `panels` are not one for every matrix, or
+            their options can't be set for a heatmap, will raise ValueError
+        """
+        arguments = dict(locals())
+        if direction not in DIRECTIONS:
+            raise KeyError(f"The direction, '{direction}' is not one of {DIRECTIONS}")
+        # The shared axis and the axis of every heatmap
+        shared, axis = ("row", "col") if direction == "horizontal" else ("col", "row")
+        panels = [dict() for _ in mats] if panels is None else list(panels)
+        if len(panels) != len(mats) or len(mats) == 0:
+            raise ValueError("`panels` have to be one for every matrix!")
+        keys = _PANEL_OPTIONS + [option.format(axis=axis) for option in _PANEL_AXIS_OPTIONS]
+        for panel in panels:
+            unknown = [key for key in panel if key not in keys]
+            if len(unknown) > 0:
+                raise ValueError(f"{unknown} can't be set for a heatmap of `HeatmapList`!")
+        options = [dict({key: arguments[key] for key in keys}, **panel) for panel in panels]
+        self.direction, self.shared, self.axis = direction, shared, axis
+
+        with stage("prepare_matrix"):
+            shared_names = check_margin_names(
+                margin_names(mats[main], shared), arguments[f"{shared}names"],
+                arguments[f"show_{shared}names"], axis=shared
+            )
+            names = [
+                check_margin_names(
+                    margin_names(mat, axis), option[f"{axis}names"], option[f"show_{axis}names"],
+                    axis=axis)
+                for mat, option in zip(mats, options)
+            ]
+            mats = [
+                scale_matrix(load_matrix(mat), option["scale"], dtype=option["scale_dtype"])
+                for mat, option in zip(mats, options)
+            ]
+            shared_index = 0 if shared == "row" else 1
+            if len({mat.shape[shared_index] for mat in mats}) > 1:
+                raise ValueError(f"The matrices don't have the same number of {shared}s!")
+
+        # The shared axis is clustered once, by the main matrix
+        with stage("cluster"):
+            shared_order, shared_gaps = None, arguments[f"gaps_{shared}"]
+            if arguments[f"cluster_{shared}s"]:
+                shared_order, shared_gaps = cut_cluster_order(
+                    mats[main] if shared == "row" else mats[main].T,
+                    arguments[f"clustering_distance_{shared}s"], clustering_method,
+                    clustering_memory_limit, arguments[f"cutree_{shared}s"]
+                )
+            orders, gaps = [], []
+            for mat, option in zip(mats, options):
+                order, panel_gaps = None, option[f"gaps_{axis}"]
+                if option[f"cluster_{axis}s"]:
+                    order, panel_gaps = cut_cluster_order(
+                        mat if axis == "row" else mat.T, option[f"clustering_distance_{axis}s"],
+                        clustering_method, clustering_memory_limit, option[f"cutree_{axis}s"]
+                    )
+                orders.append(order)
+                gaps.append(panel_gaps)
+
+        # The shared names are shown by the first or the last heatmap
+        labelled = 0 if arguments[f"{shared}names_side"] in ["left", "top"] else len(mats) - 1
+        with stage("prepare_matrix"):
+            self.heatmaps = [
+                Heatmap(
+                    mat=mat, cmap=option["cmap"], vmin=option["vmin"], vmax=option["vmax"],
+                    name=option["name"] if option["name"] is not None else "heatmap",
+                    rownames_side=rownames_side, colnames_side=colnames_side,
+                    edgecolor=option["edgecolor"], edgewidth=option["edgewidth"],
+                    downsample=downsample, lut_size=option["lut_size"],
+                    display_numbers=option["display_numbers"],
+                    number_format=option["number_format"], number_color=option["number_color"],
+                    fontsize_number=option["fontsize_number"], gap_size=gap_size,
+                    **{
+                        f"{shared}names": shared_names if i == labelled else None,
+                        f"{shared}names_style": arguments[f"{shared}names_style"],
+                        f"{shared}names_thinning": arguments[f"{shared}names_thinning"],
+                        f"{shared}_order": shared_order, f"gaps_{shared}": shared_gaps,
+                        f"{axis}names": names[i],
+                        f"{axis}names_style": option[f"{axis}names_style"],
+                        f"{axis}names_thinning": option[f"{axis}names_thinning"],
+                        f"{axis}_order": orders[i], f"gaps_{axis}": gaps[i]
+                    }
+                )
+                for i, (mat, option) in enumerate(zip(mats, options))
+            ]
+
+        with stage("annotations"):
+            first = self.heatmaps[0]
+            self.shared_annotationbars = create_annotation(
+                anno=arguments[f"annotation_{shared}"],
+                cmaps=arguments[f"annotation_{shared}_cmaps"],
+                names_style=arguments[f"annotation_{shared}_names_style"],
+                show_names=arguments[f"show_annotation_{shared}_names"],
+                expected_nrows=mats[0].shape[shared_index], axis=shared, downsample=downsample,
+                order=shared_order, limits=arguments[f"annotation_{shared}_limits"],
+                gaps=getattr(first, f"gaps_{shared}"), gap_size=gap_size
+            )
+            self.annotationbars = [
+                create_annotation(
+                    anno=option[f"annotation_{axis}"], cmaps=option[f"annotation_{axis}_cmaps"],
+                    names_style=arguments[f"annotation_{axis}_names_style"],
+                    show_names=arguments[f"show_annotation_{axis}_names"],
+                    expected_nrows=mat.shape[1 - shared_index], axis=axis, downsample=downsample,
+                    order=orders[i], limits=option[f"annotation_{axis}_limits"],
+                    gaps=getattr(heatmap, f"gaps_{axis}"), gap_size=gap_size
+                )
+                for i, (mat, option, heatmap) in enumerate(zip(mats, options, self.heatmaps))
+            ]
+
+    def create_legends(
+        self, legend_tick_locs: Dict[str, Sequence] = None,
+        legend_tick_labels: Dict[str, Sequence] = None, legend_tick_labels_styles: Dict = None,
+        legend_titles: Dict[str, bool] = None, legend_title_styles: Dict = None
+    ) -> List[Legend]:
+        """Create the legends of all heatmaps and annotations, legends with the same name, colors
+        and labels are merged, such as heatmaps of the same `cmap`, `vmin` and `vmax`. See
+        `pheatmap` for the arguments."""
+        legends, keys = [], set()
+        for i, (heatmap, annotationbars) in enumerate(zip(self.heatmaps, self.annotationbars)):
+            bars = {self.shared: self.shared_annotationbars if i == 0 else None,
+                    self.axis: annotationbars}
+            for legend in create_legends(
+                heatmap, bars["row"], bars["col"], legend_tick_locs=legend_tick_locs,
+                legend_tick_labels=legend_tick_labels,
+                legend_tick_labels_styles=legend_tick_labels_styles,
+                legend_titles=legend_titles, legend_title_styles=legend_title_styles
+            ):
+                if _legend_key(legend) not in keys:
+                    keys.add(_legend_key(legend))
+                    legends.append(legend)
+        return legends
+
+    def plot(
+        self, width: float = 10, height: float = 6, wspace: float = 0.1, hspace: float = 0.1,
+        panel_space: float = 0.05, panel_ratios: Sequence[float] = None,
+        annotation_bar_width: float = 0.03, legend_bar_width: float = 1.5 * 0.03,
+        annotation_bar_space: float = 0.2, legend_bar_space: float = 1,
+        legend_tick_locs: Dict[str, Sequence] = None,
+        legend_tick_labels: Dict[str, Sequence] = None,
+        legend_tick_labels_styles: Dict = dict(size=6), legend_titles: Dict[str, bool] = None,
+        legend_title_styles: Dict = dict(size=6), show_legends: bool = True, fig: Figure = None,
+        dpi: float = None
+    ) -> Figure:
+        """Draw all heatmaps in one figure
+
+        Parameters
+        ----------
+        panel_space : float, optional
+            the space between heatmaps, the fraction of their average width("horizontal") or
+            height("vertical"), by default 0.05
+        panel_ratios : Sequence[float], optional
+            the relative widths("horizontal") or heights("vertical") of heatmaps, by default
+            None, the same size
+        width, height, wspace, hspace, annotation_bar_width, legend_bar_width, \\
+        annotation_bar_space, legend_bar_space, legend_tick_locs, legend_tick_labels, \\
+        legend_tick_labels_styles, legend_titles, legend_title_styles, show_legends, fig, dpi : \\
+        optional
+            see `pheatmap`
+
+        Returns
+        -------
+        Figure
+        """
+        with stage("legends"):
+            legends = self.create_legends(
+                legend_tick_locs=legend_tick_locs, legend_tick_labels=legend_tick_labels,
+                legend_tick_labels_styles=legend_tick_labels_styles,
+                legend_titles=legend_titles, legend_title_styles=legend_title_styles
+            )
+
+        num = len(self.heatmaps)
+        panel_ratios = [1] * num if panel_ratios is None else list(panel_ratios)
+        if len(panel_ratios) != num:
+            raise ValueError("`panel_ratios` have to be one for every heatmap!")
+        n_shared_bars = len(self.shared_annotationbars.annotationbars) \
+            if self.shared_annotationbars is not None else 1
+        n_bars = max([1] + [len(bars.annotationbars) for bars in self.annotationbars
+                            if bars is not None])
+        with stage("layout"):
+            n_leftbars, n_topbars = (n_shared_bars, n_bars) if self.direction == "horizontal" \
+                else (n_bars, n_shared_bars)
+            n_rightbars = len(legends) if len(legends) > 0 else 1
+            bar_width = annotation_bar_width * width
+
+            def bars_size(n: int, size: float, space: float) -> float:
+                return size * n + space * size * (n - 1)
+
+            left_width = bars_size(n_leftbars, bar_width, annotation_bar_space)
+            right_width = bars_size(n_rightbars, legend_bar_width * width, legend_bar_space)
+            top_height = bars_size(n_topbars, bar_width, annotation_bar_space)
+            bottom_height = bar_width
+            layout = Layout(
+                center_width=width - left_width - right_width,
+                center_height=height - top_height - bottom_height,
+                left_width=left_width, top_height=top_height,
+                right_width=right_width, bottom_height=bottom_height,
+                sub_left_width=[1] * n_leftbars, sub_top_height=[1] * n_topbars,
+                sub_right_width=[1] * n_rightbars, sub_bottom_height=[1],
+                wspace=wspace, hspace=hspace,
+                sub_left_wspace=annotation_bar_space, sub_top_hspace=annotation_bar_space,
+                sub_right_wspace=legend_bar_space, sub_bottom_hspace=annotation_bar_space,
+                width=width, height=height, fig=fig, dpi=dpi
+            )
+            if self.direction == "horizontal":
+                panels_gs = layout.gs[1, 1].subgridspec(
+                    1, num, wspace=panel_space, width_ratios=panel_ratios)
+                bars_gs = layout.gs[0, 1].subgridspec(
+                    1, num, wspace=panel_space, width_ratios=panel_ratios)
+                panel_specs = [panels_gs[0, i] for i in range(num)]
+                bar_specs = [
+                    bars_gs[0, i].subgridspec(n_bars, 1, hspace=annotation_bar_space)
+                    for i in range(num)
+                ]
+            else:
+                panels_gs = layout.gs[1, 1].subgridspec(
+                    num, 1, hspace=panel_space, height_ratios=panel_ratios)
+                bars_gs = layout.gs[1, 0].subgridspec(
+                    num, 1, hspace=panel_space, height_ratios=panel_ratios)
+                panel_specs = [panels_gs[i, 0] for i in range(num)]
+                bar_specs = [
+                    bars_gs[i, 0].subgridspec(1, n_bars, wspace=annotation_bar_space)
+                    for i in range(num)
+                ]
+
+        with stage("draw_heatmap"):
+            for heatmap, spec in zip(self.heatmaps, panel_specs):
+                heatmap.draw(layout.create_axes(spec))
+
+        with stage("draw_annotations"):
+            if self.shared_annotationbars is not None:
+                axes = layout.create_axes(layout.left_gs, axis=1) \
+                    if self.direction == "horizontal" else layout.create_axes(layout.top_gs, axis=0)
+                self.shared_annotationbars.draw(axes)
+            # The bars of every heatmap are next to it, the nearest in the last cell
+            cells = [
+                dict() if bars is None else {
+                    n_bars - len(bars.annotationbars) + j: annobar
+                    for j, annobar in enumerate(bars.annotationbars)
+                }
+                for bars in self.annotationbars
+            ]
+            for i, spec in enumerate(bar_specs):
+                for cell, annobar in cells[i].items():
+                    ax = layout.fig.add_subplot(
+                        spec[cell, 0] if self.direction == "horizontal" else spec[0, cell])
+                    annobar.draw(ax)
+                    # The names are drawn between this and the next heatmap, a name is shown once
+                    # if the next heatmap has a bar of the same name in the same cell
+                    following = cells[i + 1].get(cell) if i < num - 1 else None
+                    if following is not None and following.name == annobar.name:
+                        _hide_labels(ax)
+
+        with stage("draw_legends"):
+            if len(legends) > 0 and show_legends:
+                for ax, legend in zip(layout.create_axes(layout.right_gs, axis=1), legends):
+                    legend.draw(ax)
+
+        count_artists(layout.fig)
+        return layout.fig
@@ -1,6 +1,7 @@
-import matplotlib.pyplot as plt
 from typing import List, Sequence, Union
 from matplotlib.axes import Axes
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from matplotlib.gridspec import GridSpecFromSubplotSpec, SubplotSpec, GridSpecBase
 
 
@@ -15,7 +16,7 @@ class Layout:
         wspace: float, hspace: float,
         sub_left_wspace: float, sub_top_hspace: float,
         sub_right_wspace: float, sub_bottom_hspace: float,
-        width: float = None, height: float = None
+        width: float = None, height: float = None, fig: Figure = None, dpi: float = None
     ) -> None:
         """_summary_
 
@@ -57,6 +58,12 @@ class Layout:
             the real width of whole figure, by default None, use the sum of regions' relative width
         height : float, optional
             the real height of whole figure, by default None, use the sum of regions' relative height
+        fig : Figure, optional
+            lay out in this figure, which is cleared and resized first, by default None, create a
+            new figure
+        dpi : float, optional
+            the dots per inch of the figure, by default None, keep the dpi of `fig` or use
+            `rcParams["figure.dpi"]` for a new figure
         """
         self.width = center_width + left_width + right_width if width is None else width
         self.height = center_height + top_height + bottom_height if height is None else height
@@ -72,7 +79,7 @@ class Layout:
         self.sub_left_wspace, self.sub_top_hspace = sub_left_wspace, sub_top_hspace
         self.sub_right_wspace, self.sub_bottom_hspace = sub_right_wspace, sub_bottom_hspace
 
-        self.fig, self.gs = self._create_gridspec()
+        self.fig, self.gs = self._create_gridspec(fig, dpi)
         self.left_gs = self._create_subgridspec(
             self.gs[1, 0], None, self.sub_left_wspace, [1], self.sub_left_w)
         self.right_gs = self._create_subgridspec(
@@ -82,8 +89,18 @@ class Layout:
         self.bottom_gs = self._create_subgridspec(
             self.gs[2, 1], self.sub_bottom_hspace, None, self.sub_bottom_h, [1])
 
-    def _create_gridspec(self):
-        fig = plt.figure(figsize=(self.width, self.height))
+    def _create_gridspec(self, fig: Figure = None, dpi: float = None):
+        if fig is None:
+            # Not registered in pyplot, so the figure is freed with its last reference and it's
+            # safe to create figures in threads
+            fig = Figure(figsize=(self.width, self.height), dpi=dpi)
+            FigureCanvasAgg(fig)
+        else:
+            # Keep the canvas of the figure, such as the one embedded in a GUI
+            fig.clear()
+            if dpi is not None:
+                fig.set_dpi(dpi)
+            fig.set_size_inches(self.width, self.height, forward=False)
         gs = fig.add_gridspec(
             nrows=3, ncols=3,
             hspace=self.hspace, wspace=self.wspace,
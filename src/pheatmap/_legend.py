@@ -1,7 +1,7 @@
 import numpy as np
-import matplotlib as mpl
-import matplotlib.pyplot as plt
 from typing import Sequence, Dict
+from matplotlib.cm import ScalarMappable
+from matplotlib.colorbar import Colorbar
 from matplotlib.colors import Colormap, Normalize, BoundaryNorm
 from matplotlib.axes import Axes
 from ._utils import CONTINUOUS, DISCRETE
@@ -62,8 +62,8 @@ class Legend:
             return Normalize(vmin, vmax)
 
     def draw(self, ax: Axes) -> None:
-        self.cbar = mpl.colorbar.Colorbar(
-            ax, mpl.cm.ScalarMappable(norm=self.norm, cmap=self.cmap),
+        self.cbar = Colorbar(
+            ax, ScalarMappable(norm=self.norm, cmap=self.cmap),
             orientation="vertical", drawedges=False, filled=True
         )
         ax.set_yticks(self.ticks, self.labels, **self.tick_labels_params)
@@ -80,3 +80,23 @@ class Legend:
             pass
         else:
             raise KeyError(f"'bartype' must be {[CONTINUOUS, DISCRETE]}!")
+
+    def set_norm(self, norm: Normalize, tick_locs: Sequence, tick_labels: Sequence) -> None:
+        """Update the norm and ticks of the drawn legend in place, such as after the values of its
+        owner are updated
+
+        Parameters
+        ----------
+        norm : Normalize
+            the new Normalize of its owner
+        tick_locs : Sequence
+            the new tick locations
+        tick_labels : Sequence
+            the new tick labels, which must be match with tick locations
+        """
+        self.ticks = np.array(tick_locs)
+        self.labels = np.array(tick_labels)
+        self.norm = self._scale_norm(norm)
+        # The colorbar resets its locator with a new norm, so set the ticks again
+        self.cbar.mappable.set_norm(self.norm)
+        self.cbar.ax.set_yticks(self.ticks, self.labels, **self.tick_labels_params)
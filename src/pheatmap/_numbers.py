@@ -0,0 +1,99 @@
+import numpy as np
+from numpy import ndarray
+from typing import Dict, Tuple
+from matplotlib.collections import PathCollection
+from matplotlib.colors import Colormap, Normalize, to_rgba
+from matplotlib.font_manager import FontProperties
+from matplotlib.path import Path
+from matplotlib.textpath import TextPath
+from matplotlib.transforms import Affine2D
+from ._utils import get_lut, _lut_indices
+
+# The colors of numbers on dark and light cells
+LIGHT_COLOR = "white"
+DARK_COLOR = "black"
+# Cells whose relative luminance is below it are dark, black and white have the same contrast
+LUMINANCE_THRESHOLD = 0.179
+
+
+def format_numbers(values: ndarray, fmt: str) -> ndarray:
+    """Format the values by a printf-style format such as "%.2f", vectorized by `numpy.char.mod`.
+    NaN are empty strings."""
+    values = np.asarray(values)
+    strings = np.char.mod(fmt, values)
+    if np.issubdtype(values.dtype, np.floating):
+        strings[np.isnan(values)] = ""
+    return strings
+
+
+def lut_luminance(lut: ndarray) -> ndarray:
+    """Get the relative luminance of every color of a uint8 RGBA lookup table, transparent colors
+    are blended with the white background"""
+    rgba = lut / 255
+    rgb = rgba[:, :3] * rgba[:, 3:] + (1 - rgba[:, 3:])
+    linear = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    return linear @ np.array([0.2126, 0.7152, 0.0722])
+
+
+def dark_cells(values: ndarray, cmap: Colormap, norm: Normalize) -> ndarray:
+    """Whether the colors of cells are dark, by the luminance of the lookup table of `cmap`
+    indexed as `map_colors`, so the luminance is only computed for N colors"""
+    luminance = lut_luminance(get_lut(cmap))
+    return luminance[_lut_indices(np.asarray(values), norm, cmap.N)] < LUMINANCE_THRESHOLD
+
+
+def _bounds(path: Path) -> Tuple[float, float, float, float]:
+    """Get the bounds of the control points of a path, which are close to the bounds of glyphs
+    and much faster than `Path.get_extents`"""
+    vertices = path.vertices[path.codes != Path.CLOSEPOLY]
+    (x0, y0), (x1, y1) = vertices.min(axis=0), vertices.max(axis=0)
+    return x0, y0, x1, y1
+
+
+def text_paths(strings: ndarray, prop: FontProperties) -> Tuple[Dict[str, Path], float]:
+    """Get the outline of every unique string centered at (0, 0) in points, and the maximum width
+
+    The strings are centered vertically by the height of digits, so numbers are aligned.
+    """
+    size = prop.get_size_in_points()
+    _, y0, _, y1 = _bounds(TextPath((0, 0), "0", size=size, prop=prop))
+    y_center = (y0 + y1) / 2
+    paths, max_width = dict(), 0.
+    for string in np.unique(strings):
+        path = TextPath((0, 0), string, size=size, prop=prop)
+        if len(path.vertices) == 0:
+            continue
+        x0, _, x1, _ = _bounds(path)
+        shift = np.array([-(x0 + x1) / 2, -y_center])
+        paths[string] = Path(path.vertices + shift, path.codes)
+        max_width = max(max_width, x1 - x0)
+    return paths, max_width
+
+
+def number_colors(
+    values: ndarray, cmap: Colormap, norm: Normalize, color: str = None
+) -> ndarray:
+    """Get the RGBA color of every number, `color` or the light/dark color by the cell's color"""
+    if color is not None:
+        return np.array([to_rgba(color)])
+    dark = dark_cells(values, cmap, norm).ravel()
+    return np.where(dark[:, None], to_rgba(LIGHT_COLOR), to_rgba(DARK_COLOR))
+
+
+class NumberCollection(PathCollection):
+    def __init__(
+        self, paths, offsets: ndarray, offset_transform, colors, **kwargs
+    ) -> None:
+        """The numbers of cells drawn as one collection of glyph outlines instead of a `Text` for
+        every cell. Paths are in points, and scaled to pixels when drawn as `scatter`. Offsets are
+        the centers of cells in data coordinates."""
+        super().__init__(
+            paths, offsets=offsets, facecolors=colors, edgecolors="none", linewidths=0, **kwargs
+        )
+        # The keyword of the offset transform is `transOffset` before matplotlib 3.6, the setter
+        # is the same for all versions
+        self.set_offset_transform(offset_transform)
+
+    def draw(self, renderer) -> None:
+        self.set_transform(Affine2D().scale(self.figure.dpi / 72))
+        super().draw(renderer)
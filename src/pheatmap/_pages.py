@@ -0,0 +1,183 @@
+from __future__ import annotations
+import numpy as np
+from numpy import ndarray
+from typing import Any, Dict, Union, TYPE_CHECKING
+from matplotlib.colors import Colormap
+from matplotlib.backends.backend_pdf import PdfPages
+from ._pheatmap import (
+    pheatmap, check_margin_names, create_annotation, margin_names, savefig_dpi
+)
+from ._heatmap import Heatmap
+from ._annotation import _object2categrey
+from ._cluster import cluster_order
+from ._chunked import load_matrix, read_rows
+from ._scale import scale_matrix
+from ._profile import stage
+from ._utils import CONTINUOUS
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+# Which pages draw the legends
+PAGE_LEGENDS = ["first", "all"]
+# The arguments of `pheatmap` which are decided by `pheatmap_pages`
+_PAGE_ARGUMENTS = ["fig", "return_handle", "show_legends"]
+
+
+def _limits(annotationbars) -> Dict[str, tuple]:
+    """Get the (vmin, vmax) of the CONTINUOUS bars, computed from all rows"""
+    if annotationbars is None:
+        return None
+    return {
+        bar.name: (bar.norm.vmin, bar.norm.vmax)
+        for bar in annotationbars.annotationbars if bar.bartype == CONTINUOUS
+    }
+
+
+def pheatmap_pages(
+    mat: Union[DataFrame, ndarray, str], path: str, rows_per_page: int = 50,
+    page_legends: str = "first",
+    cmap: Union[str, Colormap, list] = "bwr",
+    vmin: Union[float, str] = None, vmax: Union[float, str] = None,
+    rownames: ndarray = None, colnames: ndarray = None,
+    show_rownames: bool = True, show_colnames: bool = True,
+    downsample: str = None, lut_size: int = None,
+    scale: str = "none", scale_dtype=np.float64,
+    cluster_rows: bool = False, cluster_cols: bool = False,
+    clustering_distance_rows: str = "euclidean", clustering_distance_cols: str = "euclidean",
+    clustering_method: str = "complete", clustering_memory_limit: float = None,
+    annotation_row: DataFrame = None, annotation_col: DataFrame = None,
+    annotation_row_limits: Dict[str, tuple] = None, annotation_col_limits: Dict[str, tuple] = None,
+    savefig_kwargs: Dict[str, Any] = None, metadata: Dict[str, Any] = None, **kwargs
+) -> int:
+    """Plot a tall heatmap as a multi-page PDF, `rows_per_page` rows on every page
+
+    The scaling, clustering, color limits of the heatmap and its continuous annotations, and the
+    categories of discrete annotations are computed once from all rows, so all pages have the same
+    colors. Every page is drawn in the same figure and written to the PDF before the next one is
+    drawn, so the memory doesn't grow with the number of pages. The last page is stretched to the
+    same size.
+
+    Parameters
+    ----------
+    mat : Union[DataFrame, ndarray, str]
+        the matrix, see `pheatmap`. Clustering an out-of-core matrix needs a `numpy.memmap` or
+        `.npy` file, whose rows can be read in any order.
+    path : str
+        the path of the PDF
+    rows_per_page : int, optional
+        the number of rows on a page, by default 50
+    page_legends : str, optional
+        draw the legends on the "first" page or on "all" pages. The space of legends is kept on
+        every page, so the heatmaps of all pages have the same size. by default "first"
+    cmap, vmin, vmax, rownames, colnames, show_rownames, show_colnames, downsample, lut_size, \\
+    scale, scale_dtype, cluster_rows, cluster_cols, clustering_distance_rows, \\
+    clustering_distance_cols, clustering_method, clustering_memory_limit, annotation_row, \\
+    annotation_col, annotation_row_limits, annotation_col_limits : optional
+        see `pheatmap`
+    savefig_kwargs : Dict[str, Any], optional
+        the keyword arguments of `PdfPages.savefig`, such as `dict(dpi=300)` for the images, its
+        dpi is also the dpi of `pheatmap`. by default None
+    metadata : Dict[str, Any], optional
+        the metadata of the PDF, such as `dict(Title="Expression")`, see `PdfPages`, by default
+        None
+    kwargs : optional
+        other keyword arguments of `pheatmap`, such as `width`, `height` and `rownames_style`
+
+    Returns
+    -------
+    int
+        the number of pages
+
+    Raises
+    ------
+    KeyError
+        If `page_legends` is not correct, will raise KeyError
+    ValueError
+        If `rows_per_page` is not positive, or `fig`, `return_handle` or `show_legends` are
+        provided, will raise ValueError
+    """
+    if page_legends not in PAGE_LEGENDS:
+        raise KeyError(f"The page_legends, '{page_legends}' is not one of {PAGE_LEGENDS}")
+    if rows_per_page <= 0:
+        raise ValueError("`rows_per_page` must be positive!")
+    decided = [key for key in _PAGE_ARGUMENTS if key in kwargs]
+    if len(decided) > 0:
+        raise ValueError(f"{decided} can't be used with `pheatmap_pages`!")
+
+    with stage("prepare_matrix"):
+        rownames = check_margin_names(
+            margin_names(mat, axis="row"), rownames, show_rownames, axis="row")
+        colnames = check_margin_names(
+            margin_names(mat, axis="col"), colnames, show_colnames, axis="col")
+        mat = scale_matrix(load_matrix(mat), scale, dtype=scale_dtype)
+    with stage("cluster"):
+        row_order = cluster_order(
+            mat, clustering_distance_rows, clustering_method, memory_limit=clustering_memory_limit
+        ) if cluster_rows else None
+        col_order = cluster_order(
+            mat.T, clustering_distance_cols, clustering_method, memory_limit=clustering_memory_limit
+        ) if cluster_cols else None
+
+    # The limits of all rows, an out-of-core matrix is read once by row chunks
+    with stage("prepare_matrix"):
+        heatmap = Heatmap(mat=mat, cmap=cmap, vmin=vmin, vmax=vmax, downsample=downsample,
+                          lut_size=lut_size)
+        vmin, vmax = heatmap.norm.vmin, heatmap.norm.vmax
+    with stage("annotations"):
+        # The categories of all rows, so the pages have the same colors and legends
+        annotation_row = _object2categrey(annotation_row) if annotation_row is not None else None
+        annotation_col = _object2categrey(annotation_col) if annotation_col is not None else None
+        annotation_row_limits = _limits(create_annotation(
+            anno=annotation_row, cmaps=None, names_style=dict(), show_names=False,
+            expected_nrows=heatmap.nrows, axis="row", limits=annotation_row_limits
+        ))
+        annotation_col_limits = _limits(create_annotation(
+            anno=annotation_col, cmaps=None, names_style=dict(), show_names=False,
+            expected_nrows=heatmap.ncols, axis="col", limits=annotation_col_limits
+        ))
+        rownames = np.asarray(rownames) if rownames is not None else None
+        # The labels of cells are sliced as the matrix
+        numbers = kwargs.pop("display_numbers", False)
+        if isinstance(numbers, (bool, np.bool_)):
+            numbers = bool(numbers)
+        else:
+            numbers = np.asarray(numbers)
+            numbers = np.take(numbers, col_order, axis=1) if col_order is not None else numbers
+        if col_order is not None:
+            colnames = np.asarray(colnames)[col_order] if colnames is not None else None
+            annotation_col = annotation_col.iloc[col_order] if annotation_col is not None else None
+    nrows = heatmap.nrows
+    del heatmap
+
+    savefig_kwargs = savefig_kwargs if savefig_kwargs is not None else dict()
+    kwargs = savefig_dpi(kwargs, savefig_kwargs)
+    fig, num_pages = None, 0
+    with PdfPages(path, metadata=metadata) as pdf:
+        for start in range(0, nrows, rows_per_page):
+            stop = min(start + rows_per_page, nrows)
+            rows = np.arange(start, stop) if row_order is None else row_order[start:stop]
+            page = read_rows(mat, slice(start, stop) if row_order is None else rows)
+            if col_order is not None:
+                page = np.take(page, col_order, axis=1)
+            fig = pheatmap(
+                page, cmap=cmap, vmin=vmin, vmax=vmax,
+                rownames=rownames[rows] if rownames is not None else None,
+                colnames=colnames, show_rownames=show_rownames, show_colnames=show_colnames,
+                downsample=downsample, lut_size=lut_size,
+                annotation_row=annotation_row.iloc[rows] if annotation_row is not None else None,
+                annotation_col=annotation_col,
+                display_numbers=numbers if isinstance(numbers, bool) else numbers[rows],
+                annotation_row_limits=annotation_row_limits,
+                annotation_col_limits=annotation_col_limits,
+                show_legends=page_legends == "all" or num_pages == 0, fig=fig, **kwargs
+            )
+            # The PDF keeps the images of all pages until it's closed. Unsampled images are the
+            # cells of a page, much smaller than the images resampled to the page
+            for ax in fig.axes:
+                for image in ax.get_images():
+                    image.set_interpolation("none")
+            with stage("savefig"):
+                pdf.savefig(fig, **savefig_kwargs)
+            num_pages += 1
+    return num_pages
@@ -1,16 +1,26 @@
+from __future__ import annotations
+import sys
 import numpy as np
-import pandas as pd
-from pandas import DataFrame
 from numpy import ndarray
-from typing import Union, Sequence, Dict
+from typing import Union, Sequence, Dict, List, Tuple, TYPE_CHECKING
 from matplotlib.colors import Colormap
 from matplotlib.figure import Figure
 from ._heatmap import Heatmap
 from ._annotation import ListAnnotationBar
 from ._legend import Legend
 from ._layout import Layout
+from ._cluster import cluster_order
+from ._gaps import GAP_SIZE, cluster_gaps
+from ._chunked import load_matrix
+from ._scale import scale_matrix
+from ._profile import stage, count_artists
+from ._handle import PheatmapHandle
 from ._utils import HORIZONTAL, VERTICAL, CONTINUOUS
 
+if TYPE_CHECKING:
+    # pandas is only used by type hints, DataFrames are passed in by users
+    from pandas import DataFrame
+
 
 def none2dict(x: Dict = None) -> Dict:
     """Transform `None` to null `Dict`"""
@@ -20,14 +30,25 @@ def none2dict(x: Dict = None) -> Dict:
         return x
 
 
-def check_margin_names(df_margin_names: ndarray, margin_names: Sequence = None,
-                       show_margin_names: bool = True, axis: str = "row") -> Union[ndarray, None]:
+def margin_names(mat, axis: str = "row") -> Union[Sequence, None]:
+    """Get the row/column names of `mat` if it's a DataFrame, None for other matrices, such as the
+    path of a `.npy` file, whose `index` is not names"""
+    # pandas is not imported here, `mat` can't be a DataFrame if pandas is not imported yet
+    pandas = sys.modules.get("pandas")
+    if pandas is None or not isinstance(mat, pandas.DataFrame):
+        return None
+    return mat.index if axis == "row" else mat.columns
+
+
+def check_margin_names(df_margin_names: Sequence, margin_names: Sequence = None,
+                       show_margin_names: bool = True, axis: str = "row") -> Union[Sequence, None]:
     """Check row/column names are correct
 
     Parameters
     ----------
-    df_margin_names : ndarray
-        the main DataFrame's row/column names
+    df_margin_names : Sequence
+        the main DataFrame's row/column names, such as its `Index`. None if `mat` is not a
+        DataFrame
     margin_names : Sequence, optional
         the row/column names provided, by default None
     show_margin_names : bool, optional
@@ -37,7 +58,7 @@ def check_margin_names(df_margin_names: ndarray, margin_names: Sequence = None,
 
     Returns
     -------
-    Union[ndarray, None]
+    Union[Sequence, None]
 
     Raises
     ------
@@ -49,15 +70,18 @@ def check_margin_names(df_margin_names: ndarray, margin_names: Sequence = None,
         return None
     elif margin_names is None:
         return df_margin_names
-    elif len(df_margin_names) == len(margin_names):
-        return np.array(margin_names)
+    elif df_margin_names is None or len(df_margin_names) == len(margin_names):
+        # Names are only read for the labels shown, don't copy them
+        return margin_names
     else:
         raise ValueError(f"The length of {axis}names is not match `mat`!")
 
 
 def create_annotation(
         anno: Union[DataFrame, None], cmaps: Dict[str, Union[str, Colormap, list]],
-        names_style: Dict, show_names: bool, expected_nrows: int, axis="row"
+        names_style: Dict, show_names: bool, expected_nrows: int, axis="row",
+        downsample: str = None, order: ndarray = None, limits: Dict[str, tuple] = None,
+        gaps: ndarray = None, gap_size: float = GAP_SIZE
 ) -> Union[ListAnnotationBar, None]:
     """Instance row/column `ListAnnotationBar`
 
@@ -75,7 +99,16 @@ def create_annotation(
         "row" or "col" annotation?, by default "row"
     names_style: Dict[str, Dict], optional
         modify the style of row AnnotationBars' label.
-
+    downsample : str, optional
+        aggregate the annotation values to the pixel grid before rendering, by default None
+    order : ndarray, optional
+        the indices of annotation values in the order to show, by default None
+    limits : Dict[str, tuple], optional
+        the (vmin, vmax) of continuous AnnotationBars, by default None
+    gaps : ndarray, optional
+        the gaps between the values shown, the same as the heatmap's, by default None
+    gap_size : float, optional
+        the size of gaps in points, by default 4
 
     Returns
     -------
@@ -91,50 +124,160 @@ def create_annotation(
         return None
     elif anno.shape[0] == expected_nrows:
         axis = VERTICAL if axis == "row" else HORIZONTAL
-        cmaps = none2dict(cmaps)
+        # ListAnnotationBar pops the cmaps used, don't modify the argument
+        cmaps = dict(none2dict(cmaps))
         return ListAnnotationBar(
             anno=anno, cmaps=cmaps, direction=axis, show_names=show_names,
-            tick_labels_params=names_style
+            tick_labels_params=names_style, downsample=downsample, order=order, limits=limits,
+            gaps=gaps, gap_size=gap_size
         )
     else:
         raise ValueError(f"The number of annotation_{axis}'s rows is not match `mat`!")
 
 
+def cut_cluster_order(
+    X: ndarray, metric: str, method: str, memory_limit: float = None, n_clusters: int = None
+) -> Tuple[ndarray, Union[ndarray, None]]:
+    """Order the rows of `X` by clustering, see `cluster_order`, and get the gaps between
+    `n_clusters` clusters of the dendrogram
+
+    Returns
+    -------
+    Tuple[ndarray, Union[ndarray, None]]
+        the order and the gaps, None if `n_clusters` is None
+    """
+    if n_clusters is None:
+        return cluster_order(X, metric, method, memory_limit=memory_limit), None
+    order, clusters = cluster_order(
+        X, metric, method, memory_limit=memory_limit, n_clusters=n_clusters)
+    return order, cluster_gaps(clusters, order)
+
+
+def savefig_dpi(kwargs: Dict, savefig_kwargs: Dict = None) -> Dict:
+    """Get the keyword arguments of `pheatmap` drawing at the dpi of `savefig_kwargs`, so the
+    matrix is downsampled to the pixels saved, unless they set their own `dpi`"""
+    dpi = none2dict(savefig_kwargs).get("dpi")
+    if kwargs.get("dpi") is None and isinstance(dpi, (int, float, np.number)):
+        return dict(kwargs, dpi=dpi)
+    return kwargs
+
+
+def _legend_ticks(owner, tick_locs: Dict, tick_labels: Dict) -> tuple:
+    """Get the tick locations and labels of a legend, the provided ones or the defaults: 5 ticks
+    of CONTINUOUS values or all categories of DISCRETE values"""
+    if getattr(owner, "bartype", CONTINUOUS) == CONTINUOUS:
+        default_locs = default_labels = np.linspace(owner.norm.vmin, owner.norm.vmax, 5)
+    else:
+        default_locs = list(owner.values_mapper.values())
+        default_labels = list(owner.values_mapper.keys())
+    return tick_locs.get(owner.name, default_locs), tick_labels.get(owner.name, default_labels)
+
+
+def create_legends(
+        heatmap: Heatmap, row_annotationbars: Union[ListAnnotationBar, None],
+        col_annotationbars: Union[ListAnnotationBar, None],
+        legend_tick_locs: Dict[str, Sequence] = None, legend_tick_labels: Dict[str, Sequence] = None,
+        legend_tick_labels_styles: Dict = None, legend_titles: Dict[str, bool] = None,
+        legend_title_styles: Dict = None
+) -> List[Legend]:
+    """Instance the legends of heatmap and its AnnotationBars
+
+    Parameters
+    ----------
+    heatmap : Heatmap
+        the heatmap, its legend is the first one
+    row_annotationbars : Union[ListAnnotationBar, None]
+        the row AnnotationBars, one legend for every bar
+    col_annotationbars : Union[ListAnnotationBar, None]
+        the column AnnotationBars, one legend for every bar
+    legend_tick_locs, legend_tick_labels, legend_tick_labels_styles, legend_titles, \
+    legend_title_styles : optional
+        see `pheatmap`, they are not modified
+
+    Returns
+    -------
+    List[Legend]
+    """
+    legend_tick_locs = none2dict(legend_tick_locs)
+    legend_tick_labels = none2dict(legend_tick_labels)
+    legend_tick_labels_styles = none2dict(legend_tick_labels_styles)
+    legend_titles = none2dict(legend_titles)
+    legend_title_styles = none2dict(legend_title_styles)
+
+    owners = [heatmap]
+    for annotationbars in [row_annotationbars, col_annotationbars]:
+        if annotationbars is not None:
+            owners.extend(annotationbars.annotationbars)
+    legends = []
+    for owner in owners:
+        tick_locs, tick_labels = _legend_ticks(owner, legend_tick_locs, legend_tick_labels)
+        # Only the title of heatmap's legend can be modified
+        name = legend_titles.get(owner.name, owner.name) if owner is heatmap else owner.name
+        legends.append(Legend(
+            cmap=owner.cmap, norm=owner.norm, name=name,
+            tick_locs=tick_locs, tick_labels=tick_labels,
+            tick_labels_params=legend_tick_labels_styles,
+            title_params=legend_title_styles,
+            bartype=getattr(owner, "bartype", CONTINUOUS)
+        ))
+    return legends
+
+
 def pheatmap(
-    mat: DataFrame,
+    mat: Union[DataFrame, ndarray, str],
     cmap: Union[str, Colormap, list] = "bwr",
-    vmin: float = None, vmax: float = None,
+    vmin: Union[float, str] = None, vmax: Union[float, str] = None,
     name: str = None, rownames: ndarray = None, colnames: ndarray = None,
     rownames_side: str = "left", colnames_side: str = "bottom",
     show_rownames: bool = True, show_colnames: bool = True,
     rownames_style: dict = dict(rotation=0, size=6),
     colnames_style: dict = dict(rotation=0, size=6),
-    edgecolor: str = "none", edgewidth: float = 1,
+    rownames_thinning: bool = False, colnames_thinning: bool = False,
+    rownames_highlight: Sequence = None, colnames_highlight: Sequence = None,
+    edgecolor: str = "none", edgewidth: float = 1, downsample: str = None, lut_size: int = None,
+    display_numbers: Union[bool, ndarray, DataFrame] = False, number_format: str = "%.2f",
+    number_color: str = None, fontsize_number: float = 6,
+    scale: str = "none", scale_dtype=np.float64, scale_inplace: bool = False,
+    cluster_rows: bool = False, cluster_cols: bool = False,
+    clustering_distance_rows: str = "euclidean", clustering_distance_cols: str = "euclidean",
+    clustering_method: str = "complete", clustering_memory_limit: float = None,
+    cutree_rows: int = None, cutree_cols: int = None,
+    gaps_row: Sequence = None, gaps_col: Sequence = None, gap_size: float = GAP_SIZE,
     annotation_row: DataFrame = None, annotation_col: DataFrame = None,
     annotation_row_cmaps: Dict[str, Union[str, Colormap, list]] = None,
     annotation_col_cmaps: Dict[str, Union[str, Colormap, list]] = None,
+    annotation_row_limits: Dict[str, tuple] = None, annotation_col_limits: Dict[str, tuple] = None,
     annotation_row_names_style: Dict = dict(size=6),
     annotation_col_names_style: Dict = dict(size=6),
     show_annotation_row_names: bool = True, show_annotation_col_names: bool = True,
+    annotation_composite: bool = False,
     legend_tick_locs: Dict[str, Sequence] = None, legend_tick_labels: Dict[str, Sequence] = None,
     legend_tick_labels_styles: Dict = dict(size=6),
     legend_titles: Dict[str, bool] = None, legend_title_styles: Dict = dict(size=6),
+    show_legends: bool = True,
     width: float = 8, height: float = 6, wspace: float = 0.1, hspace: float = 0.1,
     annotation_bar_width: float = 0.03, legend_bar_width: float = 1.5 * 0.03,
-    annotation_bar_space: float = 0.2, legend_bar_space: float = 1
-) -> Figure:
+    annotation_bar_space: float = 0.2, legend_bar_space: float = 1,
+    fig: Figure = None, return_handle: bool = False, dpi: float = None
+) -> Union[Figure, PheatmapHandle]:
     """Plot heatmap with annotation bars
 
     Parameters
     ----------
-    mat : DataFrame
-        the main heatmap DataFrame
+    mat : Union[DataFrame, ndarray, str]
+        the main heatmap DataFrame. Matrices larger than memory can be a `numpy.memmap`, the path
+        of a `.npy` file or an object of the chunked-array protocol, such as `h5py.Dataset`. They
+        are read by row chunks and always downsampled, see `Heatmap`. Clustering their columns
+        needs a `numpy.memmap` or `.npy` file.
     cmap : Union[str, Colormap, list], optional
         the colormap of heatmap, by default "bwr"
-    vmin : float, optional
-        the minemum value scaled. by default None, use the minemum value of `mat`
-    vmax : float, optional
-        the maximum value scaled. by default None, use the maximum value of `mat`
+    vmin : Union[float, str], optional
+        the minemum value scaled. It can be a percentile of `mat` such as "p1", so outliers don't
+        wash out the colors, or "symmetric", the negative of `vmax`. by default None, use the
+        minemum value of `mat`
+    vmax : Union[float, str], optional
+        the maximum value scaled, such as "p99", see `vmin`. by default None, use the maximum value
+        of `mat`. If both are "symmetric", the colors are centered at 0 and cover all values.
     name : str, optional
         the name of heatmap, by default None, use "heatmap" as the name of heatmap
     rownames : ndarray, optional
@@ -155,11 +298,81 @@ def pheatmap(
         by default dict(rotation=0, size=6)
     colnames_style : dict, optional
         see `rownames_style`, by default dict(rotation=0, size=6)
+    rownames_thinning : bool, optional
+        only show every k-th row name, k is computed from the heatmap height and the font size so
+        that the names don't overlap. Useful for thousands of rows. by default False
+    colnames_thinning : bool, optional
+        see `rownames_thinning`, by default False
+    rownames_highlight : Sequence, optional
+        only show these row names, by default None, show all row names
+    colnames_highlight : Sequence, optional
+        only show these column names, by default None, show all column names
     edgecolor : str, optional
         the color of heatmap's cell edge, by default "none", no edge. 
         !Note: If provide `None`, will use the `rcParams["patch.edgecolor"]`, it default as "black".
     edgewidth : float, optional
         the width of heatmap's cell edge, by default 1
+    display_numbers : Union[bool, ndarray, DataFrame], optional
+        show the values of cells by `number_format` if True, or the labels of a matrix of the same
+        shape as `mat`, as R's pheatmap. All numbers are drawn as one collection, so a few hundred
+        thousand cells are fast. They are skipped if the matrix is downsampled or the cells are
+        smaller than the numbers. by default False
+    number_format : str, optional
+        the printf-style format of values, such as "%.1f" or "%.1e", by default "%.2f"
+    number_color : str, optional
+        the color of numbers, by default None, white on dark cells and black on light cells by the
+        luminance of their colors
+    fontsize_number : float, optional
+        the font size of numbers, by default 6
+    downsample : str, optional
+        aggregate the matrix and annotation bars to the pixel grid of their Axes before rendering,
+        by "mean", "max", "min" or "first" of the cells in a pixel. It makes large matrices (many
+        more rows/columns than pixels) much faster to render. The pixels are counted at `dpi`. by
+        default None, render all cells
+    lut_size : int, optional
+        the number of colors in the lookup table used to color the heatmap, such as 256 or 4096.
+        by default None, use the number of colors of `cmap`
+    scale : str, optional
+        scale the values of `mat` to z-scores in the "row" or "column" direction, or "none". The
+        mean and standard deviation ignore NaN. Rows/columns are scaled by chunks, so there are no
+        full-size temporaries. by default "none"
+    scale_dtype : optional
+        the dtype of the scaled matrix, np.float32 halves its memory, by default np.float64
+    scale_inplace : bool, optional
+        write the scaled values into `mat` instead of a new matrix, which modifies `mat`. `mat`
+        has to be a writable ndarray or `numpy.memmap` of `scale_dtype`, DataFrames with
+        copy-on-write don't expose writable values. by default False
+    cluster_rows : bool, optional
+        whether order rows by hierarchical clustering, by default False. The clustered matrix
+        can't have NaN or infinite values, after scaling as well.
+    cluster_cols : bool, optional
+        whether order columns by hierarchical clustering, by default False
+    clustering_distance_rows : str, optional
+        the distance used in clustering rows, "euclidean" or "correlation", by default "euclidean"
+    clustering_distance_cols : str, optional
+        the distance used in clustering columns, see `clustering_distance_rows`, by default
+        "euclidean"
+    clustering_method : str, optional
+        the linkage method used in clustering, "single", "complete", "average" or "ward", by
+        default "complete"
+    clustering_memory_limit : float, optional
+        the maximum bytes of working memory used in clustering. If the distance matrix doesn't fit
+        in it, rows/columns are ordered approximately by clustering their k-means centroids, which
+        keeps the memory under the limit. by default None, no limit
+    cutree_rows : int, optional
+        split the clustered rows into `cutree_rows` clusters of the dendrogram by gaps, as R's
+        pheatmap. Approximate clustering cuts the dendrogram of centroids. It's ignored if the
+        rows are not clustered. by default None
+    cutree_cols : int, optional
+        see `cutree_rows`, by default None
+    gaps_row : Sequence, optional
+        split the rows at these positions by gaps if they are not clustered, a gap at `p` is
+        between the `p`-th and `p + 1`-th rows, as R's pheatmap. The groups share the colors and
+        legends, and the matrix is colored once, so splitting costs about nothing. by default None
+    gaps_col : Sequence, optional
+        see `gaps_row`, by default None
+    gap_size : float, optional
+        the size of gaps in points, by default 4
     annotation_row : DataFrame, optional
         DataFrame used to create row Annotationbar, by default None
     annotation_col : DataFrame, optional
@@ -169,6 +382,11 @@ def pheatmap(
         "viridis" for continuous and "tab20" for discrete
     annotation_col_cmaps : Dict[str, Union[str, Colormap, list]], optional
         see `annotation_row_cmaps`, by default None
+    annotation_row_limits : Dict[str, tuple], optional
+        the (vmin, vmax) of continuous row Annotationbars, keys are the DataFrame's columns. The
+        limits are the same as `vmin` and `vmax`, such as ("p1", "p99"). by default None
+    annotation_col_limits : Dict[str, tuple], optional
+        see `annotation_row_limits`, by default None
     annotation_row_names_style: Dict[str, Dict], optional
         modify the style of row AnnotationBar's name. Keys are the DataFrame's columns, by default
         None
@@ -179,6 +397,10 @@ def pheatmap(
         whether show row Annotationbar's name, by default True
     show_annotation_col_names : bool, optional
         whether show column Annotationbar's name, by default True
+    annotation_composite : bool, optional
+        draw all row(column) Annotationbars as one image in one Axes instead of an Axes for each
+        Annotationbar. Their colormaps and legends are kept. It's much faster for dozens of
+        Annotationbars. by default False
     legend_tick_locs : Dict[str, Sequence], optional
         modify the tick locations of legend, keys are the name of heatmap or the column names of
         annotation DataFrame, by default None
@@ -195,6 +417,9 @@ def pheatmap(
     legend_title_styles : Dict, optional
         modify the each legend title's style. Others are the same as `legend_tick_labels_styles`.
         by default dict(size=6)
+    show_legends : bool, optional
+        whether draw the legends. Their space is kept, so figures with and without legends have
+        the same layout, such as the pages of `pheatmap_pages`. by default True
     width : float, optional
         the whole figure width, by default 8
     height : float, optional
@@ -214,144 +439,151 @@ def pheatmap(
         Annotationbar width.
     legend_bar_space : float, optional
         the space between legend bars, by default 1. It's the fraction of the real legend bar width
+    fig : Figure, optional
+        draw in this figure, such as one embedded in a GUI. It's cleared and resized to `width` x
+        `height` first. by default None, create a new figure
+    return_handle : bool, optional
+        return a `PheatmapHandle` instead of the figure, whose `update` replaces the matrix and
+        annotations of the drawn heatmap in place, such as for the frames of an animation or a
+        dashboard. by default False
+    dpi : float, optional
+        the dots per inch of the figure. The matrix and annotations are downsampled to the pixels
+        of their Axes at it, so set it to the dpi the figure is saved at, `savefig` uses it by
+        default. by default None, `rcParams["figure.dpi"]`, or the dpi of `fig`
 
     Returns
     -------
-    Figure
+    Union[Figure, PheatmapHandle]
+        the figure, or its handle if `return_handle`
     """
+    # The arguments are kept by the handle to lay out again when the shapes change
+    arguments = dict(locals()) if return_handle else None
     # Heatmap
     # Check arguments
-    rownames = check_margin_names(mat.index.to_numpy(), rownames, show_rownames, axis="row")
-    colnames = check_margin_names(mat.columns.to_numpy(), colnames, show_colnames, axis="col")
-    mat = mat.to_numpy()
-    name = name if name is not None else "heatmap"
+    with stage("prepare_matrix"):
+        rownames = check_margin_names(
+            margin_names(mat, axis="row"), rownames, show_rownames, axis="row")
+        colnames = check_margin_names(
+            margin_names(mat, axis="col"), colnames, show_colnames, axis="col")
+        mat = scale_matrix(load_matrix(mat), scale, dtype=scale_dtype, inplace=scale_inplace)
+        name = name if name is not None else "heatmap"
+
+    # Clustering only gives the orders, `mat` and annotations are reordered when they are rendered
+    # As R's pheatmap, clustered rows/columns are split by `cutree_*` instead of `gaps_*`
+    with stage("cluster"):
+        row_order = None
+        if cluster_rows:
+            row_order, gaps_row = cut_cluster_order(
+                mat, clustering_distance_rows, clustering_method, clustering_memory_limit,
+                cutree_rows
+            )
+        col_order = None
+        if cluster_cols:
+            col_order, gaps_col = cut_cluster_order(
+                mat.T, clustering_distance_cols, clustering_method, clustering_memory_limit,
+                cutree_cols
+            )
 
     # Instance class
-    heatmap = Heatmap(
-        mat=mat, cmap=cmap, vmin=vmin, vmax=vmax, name=name,
-        rownames=rownames, colnames=colnames,
-        rownames_side=rownames_side, colnames_side=colnames_side,
-        rownames_style=rownames_style, colnames_style=colnames_style,
-        edgecolor=edgecolor, edgewidth=edgewidth
-    )
+    with stage("prepare_matrix"):
+        heatmap = Heatmap(
+            mat=mat, cmap=cmap, vmin=vmin, vmax=vmax, name=name,
+            rownames=rownames, colnames=colnames,
+            rownames_side=rownames_side, colnames_side=colnames_side,
+            rownames_style=rownames_style, colnames_style=colnames_style,
+            rownames_thinning=rownames_thinning, colnames_thinning=colnames_thinning,
+            rownames_highlight=rownames_highlight, colnames_highlight=colnames_highlight,
+            edgecolor=edgecolor, edgewidth=edgewidth, downsample=downsample,
+            row_order=row_order, col_order=col_order, lut_size=lut_size,
+            display_numbers=display_numbers, number_format=number_format,
+            number_color=number_color, fontsize_number=fontsize_number,
+            gaps_row=gaps_row, gaps_col=gaps_col, gap_size=gap_size
+        )
 
     # Row/Column Annotations
-    row_annotationbars = create_annotation(
-        anno=annotation_row, cmaps=annotation_row_cmaps, show_names=show_annotation_row_names,
-        expected_nrows=heatmap.nrows, axis="row", names_style = annotation_row_names_style
-    )
-    col_annotationbars = create_annotation(
-        anno=annotation_col, cmaps=annotation_col_cmaps, show_names=show_annotation_col_names,
-        expected_nrows=heatmap.ncols, axis="col", names_style = annotation_col_names_style
-    )
+    with stage("annotations"):
+        row_annotationbars = create_annotation(
+            anno=annotation_row, cmaps=annotation_row_cmaps, show_names=show_annotation_row_names,
+            expected_nrows=heatmap.nrows, axis="row", names_style = annotation_row_names_style,
+            downsample=downsample, order=row_order, limits=annotation_row_limits,
+            gaps=heatmap.gaps_row, gap_size=gap_size
+        )
+        col_annotationbars = create_annotation(
+            anno=annotation_col, cmaps=annotation_col_cmaps, show_names=show_annotation_col_names,
+            expected_nrows=heatmap.ncols, axis="col", names_style = annotation_col_names_style,
+            downsample=downsample, order=col_order, limits=annotation_col_limits,
+            gaps=heatmap.gaps_col, gap_size=gap_size
+        )
 
     # Legends
-    legends = []
-    legend_tick_locs = none2dict(legend_tick_locs)
-    legend_tick_labels = none2dict(legend_tick_labels)
-    legend_tick_labels_styles = none2dict(legend_tick_labels_styles)
-    legend_titles = none2dict(legend_titles)
-    legend_title_styles = none2dict(legend_title_styles)
+    with stage("legends"):
+        legends = create_legends(
+            heatmap, row_annotationbars, col_annotationbars,
+            legend_tick_locs=legend_tick_locs, legend_tick_labels=legend_tick_labels,
+            legend_tick_labels_styles=legend_tick_labels_styles,
+            legend_titles=legend_titles, legend_title_styles=legend_title_styles
+        )
+
+    with stage("layout"):
+        n_leftbars = len(row_annotationbars.annotationbars) if row_annotationbars is not None else 1
+        n_rightbars = len(legends) if len(legends) > 0 else 1
+        n_topbars = len(col_annotationbars.annotationbars) if col_annotationbars is not None else 1
+        n_bottombars = 1
 
-    # Heatmap's legend
-    legends.append(Legend(
-        cmap=heatmap.cmap, norm=heatmap.norm, name=legend_titles.pop(heatmap.name, heatmap.name),
-        tick_locs=legend_tick_locs.pop(
-            heatmap.name, np.linspace(heatmap.norm.vmin, heatmap.norm.vmax, 5)),
-        tick_labels=legend_tick_labels.pop(
-            heatmap.name, np.linspace(heatmap.norm.vmin, heatmap.norm.vmax, 5)),
-        tick_labels_params=legend_tick_labels_styles,
-        title_params=legend_title_styles,
-        bartype=CONTINUOUS
-    ))
-
-    # AnnotationBars legends
-    if row_annotationbars is not None:
-        for anno_bar in row_annotationbars.annotationbars:
-            if anno_bar.bartype == CONTINUOUS:
-                tick_locs = legend_tick_locs.pop(
-                    anno_bar.name, np.linspace(anno_bar.norm.vmin, anno_bar.norm.vmax, 5))
-                tick_labels = legend_tick_labels.pop(
-                    anno_bar.name, np.linspace(anno_bar.norm.vmin, anno_bar.norm.vmax, 5))
-            else:
-                tick_locs = legend_tick_locs.pop(
-                    anno_bar.name, list(anno_bar.values_mapper.values()))
-                tick_labels = legend_tick_labels.pop(
-                    anno_bar.name, list(anno_bar.values_mapper.keys()))
-
-            legends.append(Legend(
-                cmap=anno_bar.cmap, norm=anno_bar.norm, name=anno_bar.name,
-                tick_locs=tick_locs, tick_labels=tick_labels,
-                tick_labels_params=legend_tick_labels_styles,
-                title_params=legend_title_styles,
-                bartype=anno_bar.bartype
-            ))
-    if col_annotationbars is not None:
-        for anno_bar in col_annotationbars.annotationbars:
-            if anno_bar.bartype == CONTINUOUS:
-                tick_locs = legend_tick_locs.pop(
-                    anno_bar.name, np.linspace(anno_bar.norm.vmin, anno_bar.norm.vmax, 5))
-                tick_labels = legend_tick_labels.pop(
-                    anno_bar.name, np.linspace(anno_bar.norm.vmin, anno_bar.norm.vmax, 5))
-            else:
-                tick_locs = legend_tick_locs.pop(
-                    anno_bar.name, list(anno_bar.values_mapper.values()))
-                tick_labels = legend_tick_labels.pop(
-                    anno_bar.name, list(anno_bar.values_mapper.keys()))
-
-            legends.append(Legend(
-                cmap=anno_bar.cmap, norm=anno_bar.norm, name=anno_bar.name,
-                tick_locs=tick_locs, tick_labels=tick_labels,
-                tick_labels_params=legend_tick_labels_styles,
-                title_params=legend_title_styles,
-                bartype=anno_bar.bartype
-            ))
-
-    n_leftbars = len(row_annotationbars.annotationbars) if row_annotationbars is not None else 1
-    n_rightbars = len(legends) if len(legends) > 0 else 1
-    n_topbars = len(col_annotationbars.annotationbars) if col_annotationbars is not None else 1
-    n_bottombars = 1
-
-    left_width = annotation_bar_width * width * n_leftbars + \
-        annotation_bar_space * (annotation_bar_width * width) * (n_leftbars - 1)
-    right_width = legend_bar_width * width * n_rightbars + \
-        legend_bar_space * (legend_bar_width * width) * (n_rightbars - 1)
-    top_height = (annotation_bar_width * width) * n_topbars + annotation_bar_space * \
-        (annotation_bar_width * width) * (n_topbars - 1)
-    bottom_height = (annotation_bar_width * width) * n_bottombars + annotation_bar_space * \
-        (annotation_bar_width * width) * (n_bottombars - 1)
-
-    center_width = width - left_width - right_width
-    center_height = height - top_height - bottom_height
-    layout = Layout(
-        center_width=center_width, center_height=center_height,
-        left_width=left_width, top_height=top_height,
-        right_width=right_width, bottom_height=bottom_height,
-        sub_left_width=[1] * n_leftbars, sub_top_height=[1] * n_topbars,
-        sub_right_width=[1] * n_rightbars, sub_bottom_height=[1] * n_bottombars,
-        wspace=wspace, hspace=hspace,
-        sub_left_wspace=annotation_bar_space, sub_top_hspace=annotation_bar_space,
-        sub_right_wspace=legend_bar_space, sub_bottom_hspace=annotation_bar_space,
-        width=width, height=height
-    )
+        left_width = annotation_bar_width * width * n_leftbars + \
+            annotation_bar_space * (annotation_bar_width * width) * (n_leftbars - 1)
+        right_width = legend_bar_width * width * n_rightbars + \
+            legend_bar_space * (legend_bar_width * width) * (n_rightbars - 1)
+        top_height = (annotation_bar_width * width) * n_topbars + annotation_bar_space * \
+            (annotation_bar_width * width) * (n_topbars - 1)
+        bottom_height = (annotation_bar_width * width) * n_bottombars + annotation_bar_space * \
+            (annotation_bar_width * width) * (n_bottombars - 1)
+
+        center_width = width - left_width - right_width
+        center_height = height - top_height - bottom_height
+        layout = Layout(
+            center_width=center_width, center_height=center_height,
+            left_width=left_width, top_height=top_height,
+            right_width=right_width, bottom_height=bottom_height,
+            sub_left_width=[1] * n_leftbars, sub_top_height=[1] * n_topbars,
+            sub_right_width=[1] * n_rightbars, sub_bottom_height=[1] * n_bottombars,
+            wspace=wspace, hspace=hspace,
+            sub_left_wspace=annotation_bar_space, sub_top_hspace=annotation_bar_space,
+            sub_right_wspace=legend_bar_space, sub_bottom_hspace=annotation_bar_space,
+            width=width, height=height, fig=fig, dpi=dpi
+        )
 
     # Draw plots
     # Heatmap
-    ht_ax = layout.create_axes(layout.gs[1, 1])
-    heatmap.draw(ht_ax)
+    with stage("draw_heatmap"):
+        ht_ax = layout.create_axes(layout.gs[1, 1])
+        heatmap.draw(ht_ax)
 
     # Annotation Bars
-    if row_annotationbars is not None:
-        row_annobars_axes = layout.create_axes(layout.left_gs, axis=1)
-        for ax, annobar in zip(row_annobars_axes, row_annotationbars.annotationbars):
-            annobar.draw(ax)
-    if col_annotationbars is not None:
-        col_annobars_axes = layout.create_axes(layout.top_gs, axis=0)
-        for ax, annobar in zip(col_annobars_axes, col_annotationbars.annotationbars):
-            annobar.draw(ax)
-    if len(legends) > 0:
-        legend_bars_axes = layout.create_axes(layout.right_gs, axis=1)
-        for ax, legend in zip(legend_bars_axes, legends):
-            legend.draw(ax)
+    with stage("draw_annotations"):
+        if row_annotationbars is not None and annotation_composite:
+            row_annotationbars.draw_composite(
+                layout.create_axes(layout.gs[1, 0]), space=annotation_bar_space)
+        elif row_annotationbars is not None:
+            row_annobars_axes = layout.create_axes(layout.left_gs, axis=1)
+            for ax, annobar in zip(row_annobars_axes, row_annotationbars.annotationbars):
+                annobar.draw(ax)
+        if col_annotationbars is not None and annotation_composite:
+            col_annotationbars.draw_composite(
+                layout.create_axes(layout.gs[0, 1]), space=annotation_bar_space)
+        elif col_annotationbars is not None:
+            col_annobars_axes = layout.create_axes(layout.top_gs, axis=0)
+            for ax, annobar in zip(col_annobars_axes, col_annotationbars.annotationbars):
+                annobar.draw(ax)
+    with stage("draw_legends"):
+        if len(legends) > 0 and show_legends:
+            legend_bars_axes = layout.create_axes(layout.right_gs, axis=1)
+            for ax, legend in zip(legend_bars_axes, legends):
+                legend.draw(ax)
 
+    count_artists(layout.fig)
+    if return_handle:
+        return PheatmapHandle(
+            layout.fig, heatmap, row_annotationbars, col_annotationbars,
+            legends if show_legends else [], arguments)
     return layout.fig
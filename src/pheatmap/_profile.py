@@ -0,0 +1,114 @@
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator
+
+# The Profile of the current context, None if profiling is disabled
+_PROFILE: ContextVar = ContextVar("pheatmap_profile", default=None)
+# Returned by `stage` when profiling is disabled, so disabled stages cost one lookup
+_DISABLED = nullcontext()
+
+
+class Profile:
+    def __init__(self, callback: Callable[[str, float], None] = None) -> None:
+        """The stage timings and artist counts of the renders in a `profile` context
+
+        Parameters
+        ----------
+        callback : Callable[[str, float], None], optional
+            called with the name and the seconds of every stage when it ends, by default None
+
+        Attributes
+        ----------
+        stages : Dict[str, float]
+            the seconds of every stage, in the order they first run. A stage run more than once,
+            such as by several renders, is accumulated.
+        artists : Dict[str, int]
+            the number of artists of the last figure, such as "axes", "images", "texts"
+        """
+        self.callback = callback
+        self.stages: Dict[str, float] = dict()
+        self.artists: Dict[str, int] = dict()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the code in the context as the stage `name`, such as `fig.savefig`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.stages[name] = self.stages.get(name, 0) + seconds
+            if self.callback is not None:
+                self.callback(name, seconds)
+
+    def count_artists(self, fig) -> None:
+        """Count the artists of a figure"""
+        axes = fig.get_axes()
+        ticks = [tick for ax in axes for axis in [ax.xaxis, ax.yaxis]
+                 for tick in axis.get_major_ticks()]
+        self.artists = dict(
+            axes=len(axes),
+            images=sum(len(ax.get_images()) for ax in axes),
+            collections=sum(len(ax.collections) for ax in axes),
+            texts=sum(len(ax.texts) for ax in axes) + len(fig.texts),
+            ticks=len(ticks),
+            artists=len(fig.findobj())
+        )
+
+    @property
+    def total(self) -> float:
+        """The seconds of all stages"""
+        return sum(self.stages.values())
+
+    def __repr__(self) -> str:
+        stages = ", ".join(f"{name}={seconds:.4f}s" for name, seconds in self.stages.items())
+        return f"Profile({stages}, artists={self.artists})"
+
+
+@contextmanager
+def profile(callback: Callable[[str, float], None] = None) -> Iterator[Profile]:
+    """Profile the renders of `pheatmap` in the context
+
+    The stages of `pheatmap` are "prepare_matrix", "cluster", "annotations", "legends", "layout",
+    "draw_heatmap", "draw_annotations" and "draw_legends", "update" of `PheatmapHandle` and
+    "cache_key" of `RenderCache.render`. Time your own stages by `Profile.stage`, such as "savefig".
+    Profiling is per thread/context, and costs nothing outside the context.
+
+    Parameters
+    ----------
+    callback : Callable[[str, float], None], optional
+        called with the name and the seconds of every stage when it ends, by default None
+
+    Yields
+    ------
+    Iterator[Profile]
+        the stage timings and artist counts
+
+    Examples
+    --------
+    >>> with profile() as prof:
+    ...     fig = pheatmap(mat)
+    ...     with prof.stage("savefig"):
+    ...         fig.savefig("heatmap.png")
+    >>> prof.stages
+    """
+    prof = Profile(callback)
+    token = _PROFILE.set(prof)
+    try:
+        yield prof
+    finally:
+        _PROFILE.reset(token)
+
+
+def stage(name: str):
+    """Time a stage if profiling is enabled, otherwise a no-op context"""
+    prof = _PROFILE.get()
+    return _DISABLED if prof is None else prof.stage(name)
+
+
+def count_artists(fig) -> None:
+    """Count the artists of a figure if profiling is enabled"""
+    prof = _PROFILE.get()
+    if prof is not None:
+        prof.count_artists(fig)
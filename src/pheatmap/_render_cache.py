@@ -0,0 +1,281 @@
+import io
+import os
+import inspect
+import hashlib
+import pickle
+import tempfile
+import numpy as np
+from typing import Any, Dict
+from matplotlib import __version__ as matplotlib_version
+from matplotlib.colors import Colormap
+from ._pheatmap import pheatmap, savefig_dpi
+from ._chunked import load_matrix, is_out_of_core, iter_row_chunks
+from ._profile import stage
+from ._utils import get_lut
+
+# Changed when the rendering changes, so the entries of older versions are missed
+CACHE_VERSION = 2
+# The bytes hashed at once for matrices which are not contiguous in memory
+HASH_CHUNK_BYTES = 2**24
+
+
+def _hash_matrix(h, mat: Any) -> None:
+    """Feed the dtype, shape and values of a matrix to `h`, by row chunks if it's not contiguous,
+    so no full-size copy is made"""
+    mat = load_matrix(mat)
+    dtype = np.dtype(getattr(mat, "dtype", np.float64))
+    h.update(f"matrix:{dtype.str}:{tuple(mat.shape)}:".encode())
+    if isinstance(mat, np.ndarray) and dtype != object and mat.flags.c_contiguous:
+        # hashlib releases the GIL and reads the buffer in place, even a memmap
+        h.update(mat.reshape(-1).view(np.uint8))
+        return
+    if isinstance(mat, np.ndarray) and dtype == object:
+        h.update(pickle.dumps(mat.tolist(), protocol=4))
+        return
+    rows = max(1, HASH_CHUNK_BYTES // max(1, dtype.itemsize * mat.shape[1]))
+    if not is_out_of_core(mat):
+        mat = np.asarray(mat)
+    for _, chunk in iter_row_chunks(mat, rows):
+        h.update(np.ascontiguousarray(chunk, dtype=dtype).reshape(-1).view(np.uint8))
+
+
+def _hash_value(h, value: Any) -> None:
+    """Feed a normalized representation of an argument of `pheatmap` to `h`, the type of every
+    value is fed as well, so 1 and "1" are different"""
+    from pandas import DataFrame, Series, Index
+    from pandas.util import hash_pandas_object
+
+    if value is None or isinstance(value, (bool, int, float, complex, str, bytes, np.generic)):
+        h.update(f"{type(value).__name__}:{value!r};".encode())
+    elif isinstance(value, (list, tuple)):
+        h.update(f"{type(value).__name__}:{len(value)}[".encode())
+        for item in value:
+            _hash_value(h, item)
+        h.update(b"]")
+    elif isinstance(value, dict):
+        h.update(f"dict:{len(value)}{{".encode())
+        for key in sorted(value, key=repr):
+            _hash_value(h, key)
+            _hash_value(h, value[key])
+        h.update(b"}")
+    elif isinstance(value, (DataFrame, Series, Index)):
+        h.update(f"{type(value).__name__}:{value.shape}:".encode())
+        if isinstance(value, DataFrame):
+            # The categories and their order determine the colors
+            _hash_value(h, [(column, repr(dtype)) for column, dtype in value.dtypes.items()])
+            _hash_value(h, value.index)
+        else:
+            _hash_value(h, (value.name, repr(value.dtype)))
+        h.update(hash_pandas_object(value, index=False).to_numpy())
+    elif isinstance(value, np.ndarray) and value.ndim == 2:
+        _hash_matrix(h, value)
+    elif isinstance(value, np.ndarray):
+        _hash_matrix(h, value.reshape(1, -1))
+    elif isinstance(value, np.dtype) or (isinstance(value, type) and issubclass(value, np.generic)):
+        h.update(f"dtype:{np.dtype(value).str};".encode())
+    elif isinstance(value, Colormap):
+        # The lookup table holds all colors used, including the under, over and bad colors
+        h.update(f"cmap:{type(value).__name__}:{value.name}:".encode())
+        h.update(get_lut(value))
+    elif is_out_of_core(value):
+        _hash_matrix(h, value)
+    else:
+        try:
+            data = pickle.dumps(value, protocol=4)
+        except Exception as error:
+            raise TypeError(
+                f"The argument of type {type(value).__name__} can't be hashed!") from error
+        h.update(f"pickle:{type(value).__name__}:".encode())
+        h.update(data)
+
+
+class RenderCache:
+    def __init__(self, directory: str, max_bytes: int = 2**30) -> None:
+        """An on-disk cache of rendered heatmaps, keyed by the hash of the inputs
+
+        The key is a BLAKE2b hash of the matrix, the annotations, all arguments of `pheatmap`
+        with their defaults, the output format and the arguments of `savefig`, so arguments equal
+        to their defaults hit the same entry. Entries are evicted by the least recently used
+        when the cache is larger than `max_bytes`, hits update the modification time. The
+        directory can be shared by processes.
+
+        Parameters
+        ----------
+        directory : str
+            the directory of the cache, created if it doesn't exist
+        max_bytes : int, optional
+            the maximum bytes of all entries, by default 2**30
+
+        Examples
+        --------
+        >>> cache = RenderCache("~/.cache/pheatmap")
+        >>> png = cache.render(mat, format="png", annotation_col=anno_col, cmap="Reds")
+        >>> cache.savefig("heatmap.pdf", mat, format="pdf", annotation_col=anno_col)
+        """
+        self.directory = os.path.expanduser(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self.entries, self.bytes = self._scan()
+
+    def _scan(self) -> tuple:
+        """Count the entries and bytes on disk, which may be written by other processes"""
+        entries, total = 0, 0
+        for _, _, files in self._walk():
+            entries += len(files)
+            total += sum(stat.st_size for _, stat in files)
+        return entries, total
+
+    def _walk(self):
+        """Yield the subdirectory, its path and its entries as (path, stat)"""
+        for entry in os.scandir(self.directory):
+            if not entry.is_dir():
+                continue
+            files = [(file.path, file.stat()) for file in os.scandir(entry.path)
+                     if file.is_file() and not file.name.startswith(".")]
+            yield entry.name, entry.path, files
+
+    def key(
+        self, mat: Any, format: str = "png", savefig_kwargs: Dict[str, Any] = None, **kwargs
+    ) -> str:
+        """Get the key of a render, the arguments are the same as `render`
+
+        Returns
+        -------
+        str
+            the hex digest of BLAKE2b
+        """
+        bound = inspect.signature(pheatmap).bind(mat, **savefig_dpi(kwargs, savefig_kwargs))
+        bound.apply_defaults()
+        arguments = dict(bound.arguments)
+        h = hashlib.blake2b(digest_size=20)
+        _hash_value(h, (CACHE_VERSION, matplotlib_version, format))
+        _hash_value(h, savefig_kwargs if savefig_kwargs is not None else dict())
+        mat = arguments.pop("mat")
+        if hasattr(mat, "index") and hasattr(mat, "columns"):
+            # The names of a DataFrame are the default row/column names
+            _hash_value(h, (mat.index, mat.columns))
+        _hash_matrix(h, mat)
+        _hash_value(h, arguments)
+        return h.hexdigest()
+
+    def _path(self, key: str, format: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.{format}")
+
+    def render(
+        self, mat: Any, format: str = "png", savefig_kwargs: Dict[str, Any] = None, **kwargs
+    ) -> bytes:
+        """Get the bytes of a rendered heatmap from the cache, or render it by `pheatmap` and store
+        it
+
+        Parameters
+        ----------
+        mat : Any
+            the matrix, see `pheatmap`. A path of a `.npy` file is hashed by its content.
+        format : str, optional
+            the format of `Figure.savefig`, such as "png", "pdf" or "svg", by default "png"
+        savefig_kwargs : Dict[str, Any], optional
+            other keyword arguments of `Figure.savefig`, such as `dict(dpi=300)`, its dpi is also
+            the dpi of `pheatmap` if that isn't set. by default None
+        kwargs : optional
+            the keyword arguments of `pheatmap`
+
+        Returns
+        -------
+        bytes
+            the content of the file
+
+        Raises
+        ------
+        ValueError
+            If `fig` or `return_handle` are provided, which can't be cached, will raise ValueError
+        TypeError
+            If an argument can't be hashed, will raise TypeError
+        """
+        if kwargs.get("fig") is not None or kwargs.get("return_handle"):
+            raise ValueError("`fig` and `return_handle` can't be used with the render cache!")
+        with stage("cache_key"):
+            path = self._path(self.key(mat, format, savefig_kwargs, **kwargs), format)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = None
+        if data is not None:
+            self.hits += 1
+            # Hits are the recently used
+            os.utime(path)
+            return data
+
+        self.misses += 1
+        fig = pheatmap(mat, **savefig_dpi(kwargs, savefig_kwargs))
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=format, **(savefig_kwargs if savefig_kwargs else dict()))
+        data = buffer.getvalue()
+        self._store(path, data)
+        return data
+
+    def savefig(self, path: str, mat: Any, format: str = "png", **kwargs) -> None:
+        """Write a rendered heatmap to `path`, see `render`"""
+        data = self.render(mat, format=format, **kwargs)
+        with open(path, "wb") as f:
+            f.write(data)
+
+    def _store(self, path: str, data: bytes) -> None:
+        """Write an entry atomically, then evict the least recently used entries if required"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self.entries += 1
+        self.bytes += len(data)
+        if self.bytes > self.max_bytes:
+            self._evict()
+
+    def _evict(self) -> None:
+        """Remove the least recently used entries until the cache is not larger than `max_bytes`"""
+        files = sorted(
+            (stat.st_mtime, path, stat.st_size)
+            for _, _, entries in self._walk() for path, stat in entries
+        )
+        self.entries, self.bytes = len(files), sum(size for _, _, size in files)
+        for _, path, size in files:
+            if self.bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Removed by another process
+                pass
+            self.entries -= 1
+            self.bytes -= size
+            self.evictions += 1
+
+    def cache_info(self) -> Dict[str, int]:
+        """Get the hits, misses and evictions of this object, and the entries and bytes on disk
+
+        Returns
+        -------
+        Dict[str, int]
+            such as `{"hits": 10, "misses": 2, "evictions": 0, "entries": 2, "bytes": 81920,
+            "max_bytes": 1073741824}`
+        """
+        return dict(
+            hits=self.hits, misses=self.misses, evictions=self.evictions,
+            entries=self.entries, bytes=self.bytes, max_bytes=self.max_bytes
+        )
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters"""
+        for _, _, entries in self._walk():
+            for path, _ in entries:
+                os.remove(path)
+        self.hits = self.misses = self.evictions = 0
+        self.entries, self.bytes = self._scan()
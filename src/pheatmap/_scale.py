@@ -0,0 +1,216 @@
+import warnings
+import numpy as np
+from numpy import ndarray
+from typing import Any, Tuple
+from ._chunked import is_out_of_core, chunk_rows, iter_row_chunks
+
+NONE = "none"
+ROW = "row"
+COLUMN = "column"
+SCALE_METHODS = [NONE, ROW, COLUMN]
+# The bytes of a row chunk scaled at once, its temporaries stay in the CPU cache
+SCALE_CHUNK_BYTES = 2**22
+
+
+def check_scale(scale: str) -> str:
+    """Validate the `scale` option"""
+    if scale in SCALE_METHODS:
+        return scale
+    else:
+        raise KeyError(f"`scale` have to be chose from {SCALE_METHODS}!")
+
+
+def _scale_chunk(
+    chunk: ndarray, scale: str, col_mean: ndarray = None, col_std: ndarray = None
+) -> ndarray:
+    """Scale a writable row chunk to z-scores in place, rows with zero deviation become NaN"""
+    with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+        warnings.simplefilter("ignore", RuntimeWarning)
+        if scale == ROW:
+            mean = np.nanmean(chunk, axis=1, keepdims=True)
+            std = np.nanstd(chunk, axis=1, ddof=1, keepdims=True)
+        else:
+            mean, std = col_mean, col_std
+        np.subtract(chunk, mean, out=chunk, casting="unsafe")
+        np.divide(chunk, std, out=chunk, casting="unsafe")
+    return chunk
+
+
+def column_stats(mat: Any, dtype=np.float64) -> Tuple[ndarray, ndarray]:
+    """Get the mean and the standard deviation(ddof=1) of every column in one pass over row chunks
+
+    The statistics of chunks are merged by Chan's parallel algorithm, which is as stable as
+    computing them on the whole columns. NaN are ignored.
+
+    Returns
+    -------
+    Tuple[ndarray, ndarray]
+        the mean and the standard deviation, both are `dtype`
+    """
+    ncols = mat.shape[1]
+    count, mean, m2 = np.zeros(ncols), np.zeros(ncols), np.zeros(ncols)
+    with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+        warnings.simplefilter("ignore", RuntimeWarning)
+        for _, chunk in iter_row_chunks(mat, chunk_rows(mat, SCALE_CHUNK_BYTES)):
+            chunk = chunk.astype(np.float64, copy=False)
+            chunk_count = np.count_nonzero(~np.isnan(chunk), axis=0)
+            chunk_mean = np.nan_to_num(np.nanmean(chunk, axis=0))
+            chunk_m2 = np.nansum((chunk - chunk_mean) ** 2, axis=0)
+            total = count + chunk_count
+            delta = chunk_mean - mean
+            ratio = np.divide(chunk_count, total, out=np.zeros(ncols), where=total > 0)
+            mean += delta * ratio
+            m2 += chunk_m2 + delta ** 2 * count * ratio
+            count = total
+        std = np.sqrt(m2 / (count - 1))
+        mean[count == 0] = np.nan
+    return mean.astype(dtype), std.astype(dtype)
+
+
+def row_stats(mat: Any, dtype=np.float64) -> Tuple[ndarray, ndarray]:
+    """Get the mean and the standard deviation(ddof=1) of every row in one pass over row chunks.
+    NaN are ignored."""
+    nrows = mat.shape[0]
+    mean, std = np.empty(nrows, dtype=dtype), np.empty(nrows, dtype=dtype)
+    with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+        warnings.simplefilter("ignore", RuntimeWarning)
+        for start, chunk in iter_row_chunks(mat, chunk_rows(mat, SCALE_CHUNK_BYTES)):
+            chunk = chunk.astype(np.float64, copy=False)
+            mean[start:start + len(chunk)] = np.nanmean(chunk, axis=1)
+            std[start:start + len(chunk)] = np.nanstd(chunk, axis=1, ddof=1)
+    return mean, std
+
+
+class ScaledMatrix:
+    def __init__(self, mat: Any, scale: str, dtype=np.float64) -> None:
+        """Scale the rows read from an out-of-core matrix on the fly
+
+        It's an object of the chunked-array protocol, so an out-of-core matrix is scaled in the
+        same pass of reading it. The column statistics of "column" scaling take one pass more.
+
+        Parameters
+        ----------
+        mat : Any
+            a `numpy.memmap` or an object of the chunked-array protocol
+        scale : str
+            "row" or "column"
+        dtype : optional
+            the dtype of the scaled rows, by default np.float64
+        """
+        self.mat = mat
+        self.scale = check_scale(scale)
+        self.dtype = np.dtype(dtype)
+        self.shape = tuple(mat.shape)
+        self.chunks = getattr(mat, "chunks", None)
+        self.col_mean, self.col_std = \
+            column_stats(mat, self.dtype) if scale == COLUMN else (None, None)
+
+    def __array__(self, dtype=None) -> ndarray:
+        return self[:] if dtype is None else self[:].astype(dtype, copy=False)
+
+    def __getitem__(self, key) -> ndarray:
+        rows = np.array(self.mat[key], dtype=self.dtype)
+        if self.scale == NONE:
+            return rows
+        return _scale_chunk(rows.reshape(-1, self.shape[1]), self.scale, self.col_mean,
+                            self.col_std).reshape(rows.shape)
+
+    @property
+    def T(self) -> "ScaledColumns":
+        """The scaled columns as rows, such as for clustering columns"""
+        return ScaledColumns(self)
+
+
+class ScaledColumns:
+    def __init__(self, scaled: ScaledMatrix) -> None:
+        """The transpose of a `ScaledMatrix`, its rows are the scaled columns read from the
+        transpose of the matrix, so columns are clustered without scaling the matrix in memory.
+        The matrix has to be transposable, such as a `numpy.memmap`.
+
+        Parameters
+        ----------
+        scaled : ScaledMatrix
+            the scaled matrix. The row statistics of "row" scaling take one pass over it
+        """
+        self.scaled = scaled
+        self.dtype = scaled.dtype
+        self.shape = scaled.shape[::-1]
+        self.chunks = None
+        self.row_mean, self.row_std = \
+            row_stats(scaled.mat, self.dtype) if scaled.scale == ROW else (None, None)
+
+    @property
+    def T(self) -> ScaledMatrix:
+        return self.scaled
+
+    def __array__(self, dtype=None) -> ndarray:
+        return self[:] if dtype is None else self[:].astype(dtype, copy=False)
+
+    def __getitem__(self, key) -> ndarray:
+        cols = np.array(self.scaled.mat.T[key], dtype=self.dtype)
+        if self.scaled.scale == NONE:
+            return cols
+        chunk = cols.reshape(-1, self.shape[1])
+        if self.scaled.scale == ROW:
+            # The rows of the matrix are the columns here
+            mean, std = self.row_mean, self.row_std
+        else:
+            mean = np.reshape(self.scaled.col_mean[key], (-1, 1))
+            std = np.reshape(self.scaled.col_std[key], (-1, 1))
+        with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+            warnings.simplefilter("ignore", RuntimeWarning)
+            np.subtract(chunk, mean, out=chunk, casting="unsafe")
+            np.divide(chunk, std, out=chunk, casting="unsafe")
+        return chunk.reshape(cols.shape)
+
+
+def scale_matrix(mat: Any, scale: str = NONE, dtype=np.float64, inplace: bool = False) -> Any:
+    """Scale the rows or columns of a matrix to z-scores, the same as `scale` of R's pheatmap
+
+    The mean and the standard deviation(ddof=1) are computed ignoring NaN. The matrix is scaled by
+    row chunks, so the temporaries are chunk-sized instead of full-size.
+
+    Parameters
+    ----------
+    mat : Any
+        the matrix, an out-of-core matrix is wrapped by `ScaledMatrix`
+    scale : str, optional
+        "none", "row" or "column", by default "none"
+    dtype : optional
+        the dtype of the scaled matrix, such as np.float32 to halve the memory, by default
+        np.float64
+    inplace : bool, optional
+        write the scaled values into `mat` instead of a new matrix, `mat` has to be a writable
+        ndarray of `dtype`. by default False
+
+    Returns
+    -------
+    Any
+        the scaled matrix, `mat` itself if `scale` is "none"
+
+    Raises
+    ------
+    ValueError
+        If `inplace` but `mat` is not a writable ndarray of `dtype`, will raise ValueError
+    """
+    scale = check_scale(scale)
+    if scale == NONE:
+        return mat
+    if is_out_of_core(mat) and not inplace:
+        return ScaledMatrix(mat, scale, dtype)
+
+    dtype = np.dtype(dtype)
+    if inplace:
+        if not isinstance(mat, np.ndarray) or not mat.flags.writeable or mat.dtype != dtype:
+            raise ValueError(f"Scaling in place needs a writable ndarray of {dtype}!")
+        out = mat
+    else:
+        out = np.empty(mat.shape, dtype=dtype)
+    col_mean, col_std = column_stats(mat, dtype) if scale == COLUMN else (None, None)
+    rows = chunk_rows(mat, SCALE_CHUNK_BYTES)
+    for start in range(0, mat.shape[0], rows):
+        chunk = out[start:start + rows]
+        if not inplace:
+            chunk[...] = mat[start:start + rows]
+        _scale_chunk(chunk, scale, col_mean, col_std)
+    return out
@@ -0,0 +1,108 @@
+import numpy as np
+from numpy import ndarray
+from typing import List, Union
+
+# Inputs larger than it are sorted by pieces of this size when they are added
+SORT_LIMIT = 2**20
+
+
+class QuantileSketch:
+    def __init__(self, k: int = 4096, random_state: int = 0) -> None:
+        """A mergeable streaming quantile sketch, a KLL sketch with compactors of the same capacity
+
+        Values are added to level 0. When a level holds more than `k` values, they are sorted and
+        every other value is promoted to the next level with twice the weight, so the memory is
+        O(k log(n / k)) for n values. An input with more than `k` values is added to the level
+        holding at most `k` of them: it's sorted and every 2^level-th value is kept. An input with
+        more than `SORT_LIMIT` values, such as a large chunk of a matrix, is added by pieces of
+        `SORT_LIMIT` values, so no more than them are sorted at once. The rank error of a quantile
+        is about log2(n / k) / k.
+
+        Parameters
+        ----------
+        k : int, optional
+            the capacity of every level, by default 4096
+        random_state : int, optional
+            the seed of the random offset used by compaction, by default 0
+        """
+        self.k = int(k)
+        self.levels: List[ndarray] = [np.empty(0)]
+        self.count = 0
+        self.min, self.max = np.inf, -np.inf
+        self._rng = np.random.default_rng(random_state)
+
+    def update(self, values: ndarray) -> "QuantileSketch":
+        """Add values to the sketch, NaN is ignored"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return self
+        self.count += values.size
+        self.min, self.max = min(self.min, values.min()), max(self.max, values.max())
+        # A large input is added by pieces, so the sort of every piece is bounded
+        for start in range(0, values.size, SORT_LIMIT):
+            piece = values[start:start + SORT_LIMIT]
+            # Every value kept at level j stands for 2 ** j values
+            level = max(0, int(np.ceil(np.log2(piece.size / self.k))))
+            if level > 0:
+                piece = np.sort(piece)[self._rng.integers(0, 2 ** level)::2 ** level]
+            while len(self.levels) <= level:
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], piece])
+            self._compact()
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """Merge another sketch into this one, which is the same as updating all its values"""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, values in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], values])
+        self.count += other.count
+        self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        self._compact()
+        return self
+
+    def _compact(self) -> None:
+        """Promote every other value of the levels over capacity to the next level"""
+        level = 0
+        while level < len(self.levels):
+            values = self.levels[level]
+            if values.size > self.k:
+                values = np.sort(values)
+                # Keep one value if the number is odd
+                keep, values = values[:values.size % 2], values[values.size % 2:]
+                promoted = values[self._rng.integers(0, 2)::2]
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def quantile(self, q: Union[float, ndarray]) -> Union[float, ndarray]:
+        """Get the approximate quantiles of the values added
+
+        Parameters
+        ----------
+        q : Union[float, ndarray]
+            the quantiles between 0 and 1
+
+        Returns
+        -------
+        Union[float, ndarray]
+            NaN if no values are added. The quantile 0 and 1 are the exact minimum and maximum.
+        """
+        q = np.asarray(q, dtype=np.float64)
+        if self.count == 0:
+            return np.full(q.shape, np.nan)[()]
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([
+            np.full(level_values.size, 2.0 ** level)
+            for level, level_values in enumerate(self.levels)
+        ])
+        index = np.argsort(values, kind="stable")
+        values, cum_weights = values[index], np.cumsum(weights[index])
+        ranks = q * cum_weights[-1]
+        result = values[np.minimum(np.searchsorted(cum_weights, ranks), values.size - 1)]
+        result = np.where(q <= 0, self.min, np.where(q >= 1, self.max, result))
+        return result[()]
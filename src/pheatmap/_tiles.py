@@ -0,0 +1,384 @@
+from __future__ import annotations
+import json
+import os
+import numpy as np
+from numpy import ndarray
+from typing import Any, Callable, Dict, Union, TYPE_CHECKING
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from matplotlib.colors import Colormap, to_hex
+from ._heatmap import Heatmap
+from ._chunked import load_matrix, chunk_rows, read_rows
+from ._scale import scale_matrix
+from ._cluster import cluster_order
+from ._downsample import MEAN, FIRST, check_downsample_method, reduce_axis
+from ._pheatmap import create_annotation
+from ._utils import map_colors, CONTINUOUS
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+DZI = "dzi"
+XYZ = "xyz"
+TILE_LAYOUTS = [DZI, XYZ]
+# The tile formats and their file extensions
+TILE_FORMATS = {"png": "png", "jpeg": "jpg", "webp": "webp"}
+# Heatmap tiles hardly compress better at higher levels, which are several times slower
+PNG_COMPRESS_LEVEL = 1
+
+
+def _check_option(value: str, options, name: str) -> str:
+    if value not in options:
+        raise KeyError(f"`{name}` have to be chose from {list(options)}!")
+    return value
+
+
+class _TileWriter:
+    def __init__(
+        self, path: str, layout: str, tile_format: str, tile_size: int, n_workers: int
+    ) -> None:
+        """Encode and write tiles in threads, at most 2 * n_workers tiles are pending
+
+        Pillow releases the GIL while encoding, so threads write tiles in parallel.
+        """
+        self.path = path
+        self.layout = layout
+        self.tile_format = tile_format
+        self.tile_size = tile_size
+        self.max_pending = 2 * n_workers
+        self.executor = ThreadPoolExecutor(n_workers)
+        self.pending = set()
+        self.num_tiles = 0
+
+    def tile_path(self, name: str, level: int, col: int, row: int) -> str:
+        ext = TILE_FORMATS[self.tile_format]
+        if self.layout == DZI:
+            return os.path.join(self.path, f"{name}_files", str(level), f"{col}_{row}.{ext}")
+        return os.path.join(self.path, name, str(level), str(col), f"{row}.{ext}")
+
+    def write(self, image: ndarray, path: str) -> None:
+        """Write a uint8 RGBA tile, XYZ tiles at the edges are padded to the tile size"""
+        if self.layout == XYZ and image.shape[:2] != (self.tile_size, self.tile_size):
+            padded = np.zeros((self.tile_size, self.tile_size, 4), dtype=np.uint8)
+            padded[:image.shape[0], :image.shape[1]] = image
+            image = padded
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        while len(self.pending) >= self.max_pending:
+            done, self.pending = wait(self.pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                future.result()
+        self.pending.add(self.executor.submit(self._save, image, path))
+        self.num_tiles += 1
+
+    def _save(self, image: ndarray, path: str) -> None:
+        from PIL import Image
+        tile = Image.fromarray(image, "RGBA")
+        if self.tile_format == "jpeg":
+            tile = tile.convert("RGB")
+            tile.save(path, format=self.tile_format)
+        elif self.tile_format == "png":
+            tile.save(path, format=self.tile_format, compress_level=PNG_COMPRESS_LEVEL)
+        else:
+            tile.save(path, format=self.tile_format)
+
+    def close(self) -> None:
+        """Wait for all tiles, raise the exception of a failed tile"""
+        try:
+            for future in self.pending:
+                future.result()
+        finally:
+            self.executor.shutdown()
+            self.pending = set()
+
+
+class TilePyramid:
+    def __init__(
+        self, name: str, height: int, width: int, method: str,
+        colorize: Callable[[ndarray], ndarray], writer: _TileWriter
+    ) -> None:
+        """The levels of one tiled image, built from its full-resolution rows in one pass
+
+        Rows of the values are added from the top to the bottom. Every band of `tile_size` rows of
+        a level is colored and written as a row of tiles, then every 2 x 2 block of it is aggregated
+        by `method` into the level below. So only less than a band of every level is held, and the
+        values, not the colors, are aggregated as `Heatmap` downsamples.
+
+        Parameters
+        ----------
+        name : str
+            the name of the image, its tiles are in the directory of the name
+        height : int
+            the height of the full-resolution image in pixels
+        width : int
+            the width of the full-resolution image in pixels
+        method : str
+            how to aggregate the values of 2 x 2 pixels, "mean", "max", "min" or "first"
+        colorize : Callable[[ndarray], ndarray]
+            map a 2D array of values to an uint8 RGBA image
+        writer : _TileWriter
+            writes the tiles
+        """
+        self.name = name
+        self.height, self.width = height, width
+        self.method = method
+        self.colorize = colorize
+        self.writer = writer
+        self.tile_size = writer.tile_size
+        # DZI levels, the level 0 is 1 x 1 and `max_level` is the full resolution
+        self.max_level = int(np.ceil(np.log2(max(height, width, 1))))
+        # XYZ zoom 0 is the level which fits in one tile, smaller levels are not written
+        num_tiles = max(height, width) / self.tile_size
+        self.zoom_offset = self.max_level - int(np.ceil(np.log2(max(num_tiles, 1))))
+        self.min_level = 0 if writer.layout == DZI else self.zoom_offset
+        self.buffers = {level: [] for level in range(self.min_level, self.max_level + 1)}
+        self.rows_buffered = {level: 0 for level in self.buffers}
+        self.rows_written = {level: 0 for level in self.buffers}
+
+    def add_rows(self, values: ndarray, level: int = None) -> None:
+        """Add the next rows of the values of a level, by default the full resolution"""
+        level = self.max_level if level is None else level
+        self.buffers[level].append(values)
+        self.rows_buffered[level] += len(values)
+        while self.rows_buffered[level] >= self.tile_size:
+            self._write_band(level, self._take_rows(level, self.tile_size))
+
+    def _take_rows(self, level: int, num: int = None) -> ndarray:
+        """Take the first `num` rows buffered of a level, by default all rows. Only the rows taken
+        are copied, the rest are kept as views."""
+        buffer = self.buffers[level]
+        num = self.rows_buffered[level] if num is None else num
+        parts, taken = [], 0
+        while taken < num:
+            part = buffer[0][:num - taken]
+            if len(part) == len(buffer[0]):
+                buffer.pop(0)
+            else:
+                buffer[0] = buffer[0][len(part):]
+            parts.append(part)
+            taken += len(part)
+        self.rows_buffered[level] -= num
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def _write_band(self, level: int, band: ndarray) -> None:
+        image = self.colorize(band)
+        row = self.rows_written[level] // self.tile_size
+        self.rows_written[level] += len(band)
+        name_level = level if self.writer.layout == DZI else level - self.zoom_offset
+        for col, start in enumerate(range(0, band.shape[1], self.tile_size)):
+            self.writer.write(
+                image[:, start:start + self.tile_size],
+                self.writer.tile_path(self.name, name_level, col, row)
+            )
+        if level > self.min_level:
+            # Bands have even rows except the last one, so the 2 x 2 blocks are aligned
+            half = reduce_axis(band, np.arange(0, band.shape[0], 2), self.method, axis=0)
+            half = reduce_axis(half, np.arange(0, band.shape[1], 2), self.method, axis=1)
+            self.add_rows(half, level - 1)
+
+    def close(self) -> None:
+        """Write the rows left of every level, from the full resolution to the smallest level"""
+        for level in range(self.max_level, self.min_level - 1, -1):
+            if self.rows_buffered[level] > 0:
+                self._write_band(level, self._take_rows(level))
+
+    def describe(self) -> Dict[str, Any]:
+        """The description of the image in the manifest, also writes the `.dzi` file of DZI"""
+        ext = TILE_FORMATS[self.writer.tile_format]
+        if self.writer.layout == DZI:
+            with open(os.path.join(self.writer.path, f"{self.name}.dzi"), "w") as f:
+                f.write(
+                    '<?xml version="1.0" encoding="UTF-8"?>\n'
+                    '<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" '
+                    f'TileSize="{self.tile_size}" Overlap="0" Format="{ext}">\n'
+                    f'  <Size Width="{self.width}" Height="{self.height}"/>\n'
+                    '</Image>\n'
+                )
+            source, levels = f"{self.name}.dzi", self.max_level + 1
+        else:
+            source = f"{self.name}/{{z}}/{{x}}/{{y}}.{ext}"
+            levels = self.max_level - self.min_level + 1
+        return dict(
+            name=self.name, width=self.width, height=self.height, levels=levels, source=source
+        )
+
+
+def _continuous_legend(name: str, cmap: Colormap, norm) -> Dict[str, Any]:
+    colors = [to_hex(color, keep_alpha=True) for color in cmap(np.linspace(0, 1, 11))]
+    return dict(name=name, type="continuous", vmin=float(norm.vmin), vmax=float(norm.vmax),
+                colors=colors)
+
+
+def export_tiles(
+    mat: Union[DataFrame, ndarray, str], path: str,
+    cmap: Union[str, Colormap, list] = "bwr",
+    vmin: Union[float, str] = None, vmax: Union[float, str] = None,
+    downsample: str = MEAN, lut_size: int = None,
+    scale: str = "none", scale_dtype=np.float64,
+    cluster_rows: bool = False, cluster_cols: bool = False,
+    clustering_distance_rows: str = "euclidean", clustering_distance_cols: str = "euclidean",
+    clustering_method: str = "complete", clustering_memory_limit: float = None,
+    annotation_row: DataFrame = None, annotation_col: DataFrame = None,
+    annotation_row_cmaps: Dict[str, Union[str, Colormap, list]] = None,
+    annotation_col_cmaps: Dict[str, Union[str, Colormap, list]] = None,
+    annotation_row_limits: Dict[str, tuple] = None, annotation_col_limits: Dict[str, tuple] = None,
+    cell_width: int = 1, cell_height: int = 1, bar_size: int = 32, bar_space: float = 0.2,
+    tile_size: int = 256, layout: str = DZI, tile_format: str = "png", n_workers: int = None
+) -> Dict[str, Any]:
+    """Export a heatmap and its annotation bars as multi-resolution tile pyramids, for deep-zoom
+    viewers such as OpenSeadragon or Leaflet
+
+    Every cell is `cell_height` x `cell_width` pixels at the full resolution. The heatmap and every
+    annotation bar are separate images, so values with different colormaps are never mixed. Their
+    positions and legends are written to `manifest.json`. The matrix is read by row chunks once
+    more after the bounds are found(see `Heatmap`), and the memory is bounded by a band of tiles
+    of every level, so matrices larger than memory can be exported.
+
+    Parameters
+    ----------
+    mat : Union[DataFrame, ndarray, str]
+        the matrix, see `pheatmap`. Clustering an out-of-core matrix needs a `numpy.memmap` or
+        `.npy` file, whose rows can be read in any order.
+    path : str
+        the output directory, created if it doesn't exist
+    cmap, vmin, vmax, lut_size, scale, scale_dtype, cluster_rows, cluster_cols, \\
+    clustering_distance_rows, clustering_distance_cols, clustering_method, \\
+    clustering_memory_limit, annotation_row, annotation_col, annotation_row_cmaps, \\
+    annotation_col_cmaps, annotation_row_limits, annotation_col_limits : optional
+        see `pheatmap`
+    downsample : str, optional
+        how to aggregate the heatmap's values of 2 x 2 pixels of a level into a pixel of the
+        level below, "mean", "max", "min" or "first". DISCRETE annotations always use "first". by
+        default "mean"
+    cell_width : int, optional
+        the pixels of a cell along the width at the full resolution, by default 1
+    cell_height : int, optional
+        the pixels of a cell along the height at the full resolution, by default 1
+    bar_size : int, optional
+        the pixels across an annotation bar at the full resolution, by default 32
+    bar_space : float, optional
+        the space between annotation bars and the heatmap, the fraction of `bar_size`, by default
+        0.2
+    tile_size : int, optional
+        the pixels of the sides of tiles, an even number, by default 256
+    layout : str, optional
+        "dzi", `{name}.dzi` and `{name}_files/{level}/{col}_{row}.png`, the level 0 is 1 x 1 pixel.
+        Or "xyz", `{name}/{z}/{x}/{y}.png`, the zoom 0 fits in one tile and tiles at the edges are
+        padded with transparent pixels. by default "dzi"
+    tile_format : str, optional
+        "png", "jpeg" or "webp", by default "png"
+    n_workers : int, optional
+        the number of threads which encode and write tiles, by default None, the number of CPUs
+
+    Returns
+    -------
+    Dict[str, Any]
+        the manifest also written to `manifest.json`: the layout, the size of the whole picture,
+        every image with its position(`x`, `y` of the top left pixel at the full resolution), and
+        the legends
+
+    Raises
+    ------
+    KeyError
+        If `layout` or `tile_format` is not correct, will raise KeyError
+    ValueError
+        If `tile_size` is not a positive even number, will raise ValueError
+    """
+    layout = _check_option(layout, TILE_LAYOUTS, "layout")
+    tile_format = _check_option(tile_format, TILE_FORMATS, "tile_format")
+    downsample = check_downsample_method(downsample)
+    if tile_size <= 0 or tile_size % 2 != 0:
+        raise ValueError("`tile_size` must be a positive even number!")
+    n_workers = n_workers if n_workers is not None else (os.cpu_count() or 1)
+
+    mat = scale_matrix(load_matrix(mat), scale, dtype=scale_dtype)
+    row_order = cluster_order(
+        mat, clustering_distance_rows, clustering_method, memory_limit=clustering_memory_limit
+    ) if cluster_rows else None
+    col_order = cluster_order(
+        mat.T, clustering_distance_cols, clustering_method, memory_limit=clustering_memory_limit
+    ) if cluster_cols else None
+    # The bounds and percentiles are found by the first pass of an out-of-core matrix
+    heatmap = Heatmap(
+        mat=mat, cmap=cmap, vmin=vmin, vmax=vmax, downsample=downsample,
+        row_order=row_order, col_order=col_order, lut_size=lut_size
+    )
+    row_annotationbars = create_annotation(
+        anno=annotation_row, cmaps=annotation_row_cmaps, names_style=dict(), show_names=True,
+        expected_nrows=heatmap.nrows, axis="row", order=row_order, limits=annotation_row_limits
+    )
+    col_annotationbars = create_annotation(
+        anno=annotation_col, cmaps=annotation_col_cmaps, names_style=dict(), show_names=True,
+        expected_nrows=heatmap.ncols, axis="col", order=col_order, limits=annotation_col_limits
+    )
+    row_bars = row_annotationbars.annotationbars if row_annotationbars is not None else []
+    col_bars = col_annotationbars.annotationbars if col_annotationbars is not None else []
+
+    os.makedirs(path, exist_ok=True)
+    writer = _TileWriter(path, layout, tile_format, tile_size, n_workers)
+    height, width = heatmap.nrows * cell_height, heatmap.ncols * cell_width
+    step = bar_size + int(round(bar_space * bar_size))
+    left, top = step * len(row_bars), step * len(col_bars)
+    images, legends = [], [_continuous_legend("heatmap", heatmap.cmap, heatmap.norm)]
+    try:
+        # Heatmap
+        pyramid = TilePyramid(
+            "heatmap", height, width, downsample,
+            lambda values: map_colors(values, heatmap.cmap, heatmap.norm), writer
+        )
+        chunk_size = max(1, chunk_rows(mat) // (cell_height * cell_width))
+        for start in range(0, heatmap.nrows, chunk_size):
+            stop = min(start + chunk_size, heatmap.nrows)
+            rows = slice(start, stop) if row_order is None else row_order[start:stop]
+            chunk = read_rows(mat, rows).astype(np.float64, copy=False)
+            if col_order is not None:
+                chunk = np.take(chunk, col_order, axis=1)
+            if cell_height > 1 or cell_width > 1:
+                chunk = np.repeat(np.repeat(chunk, cell_height, axis=0), cell_width, axis=1)
+            pyramid.add_rows(chunk)
+        pyramid.close()
+        images.append(dict(pyramid.describe(), x=left, y=top))
+
+        # Annotation bars, rows are the values repeated across the bar
+        for axis, bars in [("row", row_bars), ("col", col_bars)]:
+            for i, bar in enumerate(bars):
+                values = bar.values.ravel()
+                if bar.order is not None:
+                    values = np.take(values, bar.order)
+                norm = bar.norm if bar.bartype == CONTINUOUS else None
+                method = downsample if bar.bartype == CONTINUOUS else FIRST
+                if axis == "row":
+                    values = np.repeat(values, cell_height)[:, None]
+                    shape, position = (height, bar_size), dict(x=i * step, y=top)
+                else:
+                    values = np.repeat(values, cell_width)[None, :]
+                    shape, position = (bar_size, width), dict(x=left, y=i * step)
+                pyramid = TilePyramid(
+                    f"annotation_{axis}_{i}", *shape, method,
+                    lambda values, bar=bar, norm=norm: map_colors(values, bar.cmap, norm), writer
+                )
+                for start in range(0, shape[0], tile_size):
+                    if axis == "row":
+                        rows = np.repeat(values[start:start + tile_size], bar_size, axis=1)
+                    else:
+                        rows = np.repeat(values, min(tile_size, bar_size - start), axis=0)
+                    pyramid.add_rows(rows)
+                pyramid.close()
+                images.append(dict(pyramid.describe(), label=str(bar.name), **position))
+                if bar.bartype == CONTINUOUS:
+                    legends.append(_continuous_legend(str(bar.name), bar.cmap, bar.norm))
+                else:
+                    colors = bar.cmap(np.arange(len(bar.values_mapper)))
+                    legends.append(dict(name=str(bar.name), type="discrete", categories={
+                        str(category): to_hex(colors[code], keep_alpha=True)
+                        for category, code in bar.values_mapper.items()
+                    }))
+    finally:
+        writer.close()
+
+    manifest = dict(
+        layout=layout, tile_size=tile_size, format=TILE_FORMATS[tile_format],
+        width=left + width, height=top + height, num_tiles=writer.num_tiles,
+        images=images, legends=legends
+    )
+    with open(os.path.join(path, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
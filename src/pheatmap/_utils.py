@@ -1,33 +1,231 @@
-import matplotlib.pyplot as plt
+import os
+import warnings
+import functools
+import numpy as np
 from numpy import ndarray
-from typing import Union
-from matplotlib.colors import Normalize, Colormap, ListedColormap, LinearSegmentedColormap
+from typing import Union, Tuple, Dict, Hashable
+from concurrent.futures import ThreadPoolExecutor
+from matplotlib import colormaps
+from matplotlib.colors import (
+    Normalize, Colormap, ListedColormap, LinearSegmentedColormap, BoundaryNorm, to_rgba,
+    to_rgba_array
+)
+from ._chunked import iter_row_chunks
+from ._sketch import QuantileSketch
 
 CONTINUOUS = "continuous"
 DISCRETE = "discrete"
 HORIZONTAL = "horizontal"
 VERTICAL = "vertical "
 
-def get_norm(values: ndarray, vmin: float, vmax: float) -> Normalize:
+# The number of cells colored at once by a thread
+LUT_CHUNK_SIZE = 2 ** 16
+# The limit mirrors the other limit around zero
+SYMMETRIC = "symmetric"
+# The maximum number of colormaps and lookup tables cached
+CMAP_CACHE_SIZE = 256
+
+
+def _parse_limit(limit: Union[float, str]) -> Union[float, str, None]:
+    """Validate `vmin`/`vmax`, a percentile such as "p99" is parsed as the quantile 0.99"""
+    if limit is None or limit == SYMMETRIC or not isinstance(limit, str):
+        return limit
+    try:
+        percentile = float(limit[1:]) if limit.startswith("p") else np.nan
+    except ValueError:
+        percentile = np.nan
+    if not 0 <= percentile <= 100:
+        raise KeyError(
+            f"The limit '{limit}' is not a number, a percentile such as 'p99' or '{SYMMETRIC}'!")
+    return percentile / 100
+
+
+def needs_sketch(vmin: Union[float, str], vmax: Union[float, str]) -> bool:
+    """Whether `vmin` or `vmax` is a percentile, which is computed by `QuantileSketch`"""
+    return any(isinstance(limit, str) and _parse_limit(limit) != SYMMETRIC
+               for limit in [vmin, vmax])
+
+
+def sketch_values(values: ndarray) -> QuantileSketch:
+    """Add the values to a `QuantileSketch` by row chunks, which avoids a full-size copy"""
+    values = values.reshape(values.shape[0], -1)
+    sketch = QuantileSketch()
+    for _, chunk in iter_row_chunks(values):
+        sketch.update(chunk)
+    return sketch
+
+
+def resolve_limits(
+    vmin: Union[float, str], vmax: Union[float, str], bounds: Tuple[float, float],
+    sketch: QuantileSketch = None
+) -> Tuple[float, float]:
+    """Get the numeric `vmin` and `vmax`
+
+    Parameters
+    ----------
+    vmin : Union[float, str]
+        a number, a percentile such as "p1", "symmetric" or None, the minimum of values
+    vmax : Union[float, str]
+        see `vmin`, None is the maximum of values
+    bounds : Tuple[float, float]
+        the minimum and maximum of values
+    sketch : QuantileSketch, optional
+        the sketch of values, required by percentiles. by default None
+
+    Returns
+    -------
+    Tuple[float, float]
+        "symmetric" is the negative of the other limit. If both are "symmetric", the limits are
+        symmetric around zero and cover all values.
+    """
+    limits = []
+    for limit, bound in zip([vmin, vmax], bounds):
+        parsed = _parse_limit(limit)
+        if limit is None:
+            limits.append(bound)
+        elif isinstance(limit, str) and limit != SYMMETRIC:
+            limits.append(float(sketch.quantile(parsed)))
+        else:
+            limits.append(limit)
+    vmin, vmax = limits
+    if vmin == SYMMETRIC and vmax == SYMMETRIC:
+        vmax = np.nanmax(np.abs(bounds))
+        vmin = -vmax
+    elif vmin == SYMMETRIC:
+        vmin = -vmax
+    elif vmax == SYMMETRIC:
+        vmax = -vmin
+    return vmin, vmax
+
+
+def get_norm(
+    values: ndarray, vmin: Union[float, str], vmax: Union[float, str],
+    bounds: Tuple[float, float] = None, sketch: QuantileSketch = None
+) -> Normalize:
     """Get `Normalize` by the provided `vmin` and `vmax`
 
     Parameters
     ----------
     values : ndarray
         values are used to normalize
-    vmin : float
-        the minemum value visualized
-    vmax : float
-        the maximum value visualized
+    vmin : Union[float, str]
+        the minemum value visualized, None, a percentile such as "p1" or "symmetric", see
+        `resolve_limits`
+    vmax : Union[float, str]
+        the maximum value visualized, see `vmin`
+    bounds : Tuple[float, float], optional
+        the minimum and maximum of values if they are known, by default None, compute them
+    sketch : QuantileSketch, optional
+        the sketch of values if it's known, by default None, compute it if a limit is a percentile
     Returns
     -------
     Normalize
     """
-    vmin = vmin if vmin is not None else values.min()
-    vmax = vmax if vmax is not None else values.max()
+    if bounds is None:
+        if vmin is None or vmax is None or SYMMETRIC in [vmin, vmax]:
+            # NaN are ignored as they are colored by the "bad" color, all-NaN values give NaN
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                bounds = (np.nanmin(values), np.nanmax(values))
+        else:
+            bounds = (np.nan, np.nan)
+    if sketch is None and needs_sketch(vmin, vmax):
+        sketch = sketch_values(values)
+    vmin, vmax = resolve_limits(vmin, vmax, bounds, sketch)
     return Normalize(vmin=vmin, vmax=vmax)
 
 
+def _rgba_key(colors) -> tuple:
+    """A hashable key of colors"""
+    return tuple(map(tuple, to_rgba_array(colors).round(8)))
+
+
+def _cmap_key(cmap: Union[Colormap, str, list], cmap_type: str) -> Union[Hashable, None]:
+    """Normalize the color expression to a hashable key which determines the Colormap built by
+    `get_cmap`. None if it can't be cached, such as a `LinearSegmentedColormap` used as it is."""
+    if isinstance(cmap, str):
+        return ("name", cmap, cmap_type)
+    elif isinstance(cmap, list):
+        return ("colors", _rgba_key(cmap), cmap_type)
+    elif isinstance(cmap, ListedColormap):
+        extremes = _rgba_key([cmap.get_under(), cmap.get_over(), cmap.get_bad()])
+        return ("listed", _rgba_key(cmap.colors), extremes, cmap_type)
+    else:
+        return None
+
+
+class _ReadOnlyColormap:
+    """A Colormap shared by the cache, whose colors can't be changed, its copies can"""
+
+    def _read_only(self, *args, **kwargs):
+        raise ValueError(
+            "The Colormaps from `get_cmap` are shared by all renders and read-only, change a copy "
+            "by `Colormap.copy` or `Colormap.with_extremes` instead!"
+        )
+
+    set_bad = set_under = set_over = set_extremes = _read_only
+
+    def __copy__(self):
+        cmap = super().__copy__()
+        # The copy has its own colors, so it doesn't use the lookup table of the key
+        cmap.__class__ = type(self).__bases__[-1]
+        cmap.__dict__.pop("_pheatmap_cache_key", None)
+        return cmap
+
+
+class _ReadOnlyListedColormap(_ReadOnlyColormap, ListedColormap):
+    pass
+
+
+class _ReadOnlyLinearSegmentedColormap(_ReadOnlyColormap, LinearSegmentedColormap):
+    set_gamma = _ReadOnlyColormap._read_only
+
+
+_READ_ONLY_CMAPS = {
+    ListedColormap: _ReadOnlyListedColormap,
+    LinearSegmentedColormap: _ReadOnlyLinearSegmentedColormap
+}
+
+
+def _mark_cached(cmap: Colormap, key: Hashable) -> Colormap:
+    """Mark a cached Colormap by its key, which is also the key of its lookup table, and make it
+    read-only"""
+    cmap.__class__ = _READ_ONLY_CMAPS.get(type(cmap), type(cmap))
+    cmap._pheatmap_cache_key = key
+    return cmap
+
+
+@functools.lru_cache(maxsize=CMAP_CACHE_SIZE)
+def _cached_cmap(key: Hashable) -> Colormap:
+    """Build the Colormap of a key, see `_cmap_key`, `resample_cmap` and `cycle_cmap`"""
+    kind = key[0]
+    if kind == "resampled":
+        cmap = _cached_cmap(key[1])
+        resampled = getattr(cmap, "resampled", None) or cmap._resample
+        return _mark_cached(resampled(key[2]), key)
+    elif kind == "cycled":
+        colors = to_rgba_array(_cached_cmap(key[1]).colors)
+        colors = np.take(colors, np.arange(key[2]) % len(colors), axis=0)
+        return _mark_cached(ListedColormap(colors), key)
+
+    cmap_type = key[-1]
+    if kind == "name":
+        cmap = colormaps[key[1]]
+    elif kind == "colors" and cmap_type == CONTINUOUS:
+        cmap = LinearSegmentedColormap.from_list("from_list", colors=key[1])
+    else:
+        cmap = ListedColormap(colors=np.array(key[1]))
+        if kind == "listed":
+            under, over, bad = key[2]
+            cmap = cmap.with_extremes(under=under, over=over, bad=bad)
+
+    if (cmap_type == CONTINUOUS) and (not isinstance(cmap, LinearSegmentedColormap)):
+        cmap = LinearSegmentedColormap.from_list("from_list", cmap.colors)
+    elif (cmap_type == DISCRETE) and (not isinstance(cmap, ListedColormap)):
+        raise TypeError(f"'cmap' must be 'ListedColormap' for {DISCRETE}")
+    return _mark_cached(cmap, key)
+
+
 def cycle_cmap(cmap: Colormap, num: int) -> Colormap:
     """When the number of discrete colors are not enough for categories, cycle the colors of cmap 
     to meet the number of categories.
@@ -42,14 +240,23 @@ def cycle_cmap(cmap: Colormap, num: int) -> Colormap:
     Returns
     -------
     Colormap
+        shared by the same `cmap` and `num` if `cmap` is from `get_cmap`
     """
-    colors = cmap.colors * (num // cmap.N) + cmap.colors[:(num % cmap.N)]
+    key = getattr(cmap, "_pheatmap_cache_key", None)
+    if key is not None:
+        return _cached_cmap(("cycled", key, int(num)))
+    colors = np.take(to_rgba_array(cmap.colors), np.arange(num) % cmap.N, axis=0)
     return ListedColormap(colors)
 
 
 def get_cmap(cmap: Union[Colormap, str, list], cmap_type: str = CONTINUOUS) -> Colormap:
     """Transform different color expresion types to Colormap
 
+    Colormaps built from names, lists and `ListedColormap` are cached by their colors, so renders
+    with the same colors share one Colormap and its lookup table. The shared Colormaps are
+    read-only, their `set_bad`, `set_under`, `set_over` and `set_extremes` raise ValueError, use
+    `Colormap.copy` or `Colormap.with_extremes` to change them.
+
     Parameters
     ----------
     cmap : Union[Colormap, str, list]
@@ -61,22 +268,154 @@ def get_cmap(cmap: Union[Colormap, str, list], cmap_type: str = CONTINUOUS) -> C
     -------
     Colormap
     """
-    if isinstance(cmap, str):
-        cmap =  plt.colormaps[cmap]
-    elif isinstance(cmap, list):
-        if cmap_type == CONTINUOUS:
-            cmap = LinearSegmentedColormap.from_list("from_list", colors=cmap)
-        else:
-            cmap = ListedColormap(colors=cmap)
-    elif isinstance(cmap, Colormap):
-        pass
-    else:
+    if not isinstance(cmap, (str, list, Colormap)):
         raise TypeError("'cmap' must be `Colormap` type!")
-    
-    if (cmap_type == CONTINUOUS) and (not isinstance(cmap, LinearSegmentedColormap)):
-        cmap = LinearSegmentedColormap.from_list("from_list", cmap.colors)
-        return cmap
+    key = _cmap_key(cmap, cmap_type)
+    if key is not None:
+        return _cached_cmap(key)
     elif (cmap_type == DISCRETE) and (not isinstance(cmap, ListedColormap)):
         raise TypeError(f"'cmap' must be 'ListedColormap' for {DISCRETE}")
     else:
         return cmap
+
+
+def resample_cmap(cmap: Colormap, lut_size: int = None) -> Colormap:
+    """Resample `cmap` to `lut_size` colors, `None` means keep `cmap`"""
+    if lut_size is None or lut_size == cmap.N:
+        return cmap
+    key = getattr(cmap, "_pheatmap_cache_key", None)
+    if key is not None:
+        return _cached_cmap(("resampled", key, int(lut_size)))
+    resampled = getattr(cmap, "resampled", None) or cmap._resample
+    return resampled(lut_size)
+
+
+def _build_lut(cmap: Colormap) -> ndarray:
+    lut = np.empty((cmap.N + 3, 4), dtype=np.uint8)
+    lut[1:-2] = cmap(np.arange(cmap.N), bytes=True)
+    extremes = [cmap.get_under(), cmap.get_over(), cmap.get_bad()]
+    # Truncate as `Colormap.__call__(..., bytes=True)`
+    lut[[0, -2, -1]] = (np.array([to_rgba(c) for c in extremes]) * 255).astype(np.uint8)
+    return lut
+
+
+@functools.lru_cache(maxsize=CMAP_CACHE_SIZE)
+def _cached_lut(key: Hashable) -> ndarray:
+    lut = _build_lut(_cached_cmap(key))
+    lut.flags.writeable = False
+    return lut
+
+
+def get_lut(cmap: Colormap) -> ndarray:
+    """Get the RGBA lookup table of `cmap` as uint8
+
+    Returns
+    -------
+    ndarray
+        the shape is (N + 3, 4), rows are the under color, N colors of `cmap`, the over color and
+        the bad color. It's cached and read-only for the Colormaps from `get_cmap`.
+    """
+    key = getattr(cmap, "_pheatmap_cache_key", None)
+    if key is not None:
+        return _cached_lut(key)
+    return _build_lut(cmap)
+
+
+def cmap_cache_info() -> Dict[str, Dict[str, int]]:
+    """Get the hits, misses and sizes of the Colormap and lookup table caches
+
+    Returns
+    -------
+    Dict[str, Dict[str, int]]
+        such as `{"cmap": {"hits": 10, "misses": 2, "maxsize": 256, "currsize": 2}, "lut": ...}`
+    """
+    return {name: cache.cache_info()._asdict()
+            for name, cache in [("cmap", _cached_cmap), ("lut", _cached_lut)]}
+
+
+def clear_cmap_cache() -> None:
+    """Clear the Colormap and lookup table caches, and reset their counters"""
+    _cached_cmap.cache_clear()
+    _cached_lut.cache_clear()
+
+
+def _lut_indices(values: ndarray, norm: Normalize, N: int) -> ndarray:
+    """Quantize `values` to the row indices of the lookup table created by `get_lut`, which is the
+    same as `Colormap.__call__(norm(values))`. If `norm` is None, `values` are categorical codes."""
+    if norm is None:
+        # Codes are the indices of colors, -1 is a missing value
+        return np.where(values < 0, N + 2, np.minimum(values, N).astype(np.intp) + 1)
+    if isinstance(norm, BoundaryNorm) or type(norm) is not Normalize:
+        normed = norm(values)
+        if np.issubdtype(normed.dtype, np.integer):
+            # Indices of colors already, such as `BoundaryNorm`
+            idx = np.clip(np.ma.getdata(normed), -1, N) + 1
+            idx[np.ma.getmaskarray(normed)] = N + 2
+            return idx
+        xa = np.ma.filled(normed.astype(np.result_type(normed.dtype, np.float32)), np.nan) * N
+    else:
+        # Same as `Normalize.__call__` without masked arrays
+        dtype = np.result_type(values.dtype, np.float32)
+        xa = np.subtract(values, norm.vmin, dtype=dtype)
+        if norm.vmax == norm.vmin:
+            # Finite values are the first color as `Normalize`, but 0 * inf would be NaN, so
+            # infinities keep the under/over colors and NaN the bad color
+            np.copyto(xa, 0, where=np.isfinite(xa))
+        else:
+            xa /= norm.vmax - norm.vmin
+        xa *= N
+    # The maximum value is the last color instead of the over color
+    xa[xa == N] = N - 1
+    np.floor(xa, out=xa)
+    np.clip(xa, -1, N, out=xa)
+    np.nan_to_num(xa, copy=False, nan=N + 1)
+    xa += 1
+    return xa.astype(np.intp)
+
+
+def map_colors(
+    values: ndarray, cmap: Colormap, norm: Normalize, n_threads: int = None
+) -> ndarray:
+    """Map `values` to uint8 RGBA colors by the lookup table of `cmap`
+
+    Colors are computed by chunks of rows, so there is no float RGBA array of the whole matrix as
+    `Colormap.__call__`. Chunks are colored in threads, `numpy.take` releases the GIL.
+
+    Parameters
+    ----------
+    values : ndarray
+        a 2D matrix
+    cmap : Colormap
+        the colormap, its N is the size of the lookup table, see `resample_cmap`
+    norm : Normalize
+        the Normalize, linear `Normalize` is quantized directly, others are called by chunks. None
+        if `values` are categorical codes, which index the colors directly and -1 is the bad color
+    n_threads : int, optional
+        the number of threads, by default None, use all CPUs for large matrices
+
+    Returns
+    -------
+    ndarray
+        the uint8 RGBA image, its shape is (nrows, ncols, 4)
+    """
+    values = np.asarray(values)
+    nrows, ncols = values.shape
+    lut = get_lut(cmap)
+    image = np.empty((nrows, ncols, 4), dtype=np.uint8)
+    chunk_rows = max(1, LUT_CHUNK_SIZE // max(ncols, 1))
+    starts = range(0, nrows, chunk_rows)
+
+    def color_chunk(start):
+        stop = min(start + chunk_rows, nrows)
+        idx = _lut_indices(values[start:stop], norm, cmap.N)
+        np.take(lut, idx, axis=0, out=image[start:stop])
+
+    if n_threads is None:
+        n_threads = min(os.cpu_count() or 1, len(starts))
+    if n_threads > 1:
+        with ThreadPoolExecutor(n_threads) as executor:
+            list(executor.map(color_chunk, starts))
+    else:
+        for start in starts:
+            color_chunk(start)
+    return image
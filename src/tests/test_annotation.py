@@ -2,7 +2,10 @@ import unittest
 import numpy as np
 import pandas as pd
 from matplotlib.colors import Normalize, BoundaryNorm, LinearSegmentedColormap, ListedColormap
-from pheatmap._annotation import AnnotationBar, _object2categrey, _get_bartype, _transform_discrete_values
+from matplotlib.figure import Figure
+from pheatmap._annotation import (
+    AnnotationBar, ListAnnotationBar, _object2categrey, _get_bartype, _transform_discrete_values
+)
 from pheatmap._utils import HORIZONTAL, VERTICAL, CONTINUOUS, DISCRETE
 
 
@@ -64,6 +67,49 @@ class testAnnotationBar(unittest.TestCase):
                         AnnotationBar(values=values, cmap="bwr", values_mapper=None, direction=direction)
 
 
+class testListAnnotationBar(unittest.TestCase):
+    def setUp(self) -> None:
+        self.anno = pd.DataFrame(dict(
+            a=np.linspace(0, 1, 12), b=list("xyz" * 4), c=np.arange(12) % 5
+        ))
+
+    def test_draw_composite(self):
+        for direction in [HORIZONTAL, VERTICAL]:
+            with self.subTest(direction=direction):
+                fig = Figure()
+                ax = fig.add_subplot()
+                bars = ListAnnotationBar(self.anno.copy(), cmaps=dict(), direction=direction)
+                bars.draw_composite(ax, space=0.2, resolution=5)
+                self.assertEqual(len(ax.get_images()), 1)
+                image = ax.get_images()[0].get_array()
+                # Three bars of 5 pixels and two spaces of 1 pixel
+                if direction == HORIZONTAL:
+                    self.assertEqual(image.shape, (17, 12, 4))
+                    ticks = ax.get_yticklabels()
+                    strip, expected = image[0, :, :], bars.annotationbars[0].get_image(ax)[0]
+                else:
+                    self.assertEqual(image.shape, (12, 17, 4))
+                    ticks = ax.get_xticklabels()
+                    strip, expected = image[:, 0, :], bars.annotationbars[0].get_image(ax)[:, 0]
+                self.assertEqual([tick.get_text() for tick in ticks], ["a", "b", "c"])
+                np.testing.assert_array_equal(strip, expected)
+                self.assertTrue(np.all(image.take(5, axis=0 if direction == HORIZONTAL else 1) == 0))
+
+    def test_discrete_codes(self):
+        anno = pd.DataFrame(dict(d=pd.Categorical(["x", None, "y"] * 10)))
+        bars = ListAnnotationBar(anno, cmaps=dict(), direction=HORIZONTAL)
+        values = bars.annotationbars[0].values
+        self.assertEqual(values.dtype, np.int8)
+        image = bars.annotationbars[0].get_image(None)
+        np.testing.assert_array_equal(image[0, 1], [0, 0, 0, 0])
+        np.testing.assert_array_equal(image[0, 0], image[0, 3])
+        # Colors are cycled for more categories than colors
+        many = pd.DataFrame(dict(d=pd.Categorical(np.arange(25).astype(str))))
+        bar = ListAnnotationBar(many, cmaps=dict(), direction=HORIZONTAL).annotationbars[0]
+        self.assertEqual(bar.cmap.N, 25)
+        np.testing.assert_array_equal(bar.cmap.colors[20], bar.cmap.colors[0])
+
+
 class test_help_funcs(unittest.TestCase):
     def setUp(self) -> None:
         self.anno = pd.DataFrame(dict(anno1=np.arange(10), anno2=["abc"[i % 3] for i in np.arange(10)]))
@@ -82,7 +128,7 @@ class test_help_funcs(unittest.TestCase):
     
     def test__transform_discrete_values(self):
         anno = _object2categrey(self.anno).iloc[:, 1]
-        anno_transformed = [pd.Series([0, 1, 2, 0, 1, 2, 0, 1, 2, 0], name="anno2").astype("category"), {"a": 0, "b": 1, "c": 2}]
+        anno_transformed = [pd.Series([0, 1, 2, 0, 1, 2, 0, 1, 2, 0], name="anno2", dtype=np.int8), {"a": 0, "b": 1, "c": 2}]
         values, values_mapper = _transform_discrete_values(anno)
         pd.testing.assert_series_equal(values, anno_transformed[0])
-        self.assertEqual(values_mapper, anno_transformed[1])
\ No newline at end of file
+        self.assertEqual(values_mapper, anno_transformed[1])
@@ -0,0 +1,38 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from pheatmap import pheatmap_batch
+
+
+class test_pheatmap_batch(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.anno_col = pd.DataFrame(dict(anno=["ABC"[i % 3] for i in np.arange(10)]))
+
+    def test_batch(self):
+        def jobs():
+            for i in range(4):
+                mat = pd.DataFrame(np.random.rand(5 + i, 10))
+                path = os.path.join(self.tmpdir.name, f"heatmap{i}.png")
+                yield mat, None, dict(cmap="Reds"), path
+            # The shared column annotation doesn't match this matrix
+            yield pd.DataFrame(np.random.rand(5, 3)), None, None, "error.png"
+
+        results = list(pheatmap_batch(
+            jobs(), n_workers=2, shared=dict(annotation_col=self.anno_col),
+            savefig_kwargs=dict(dpi=20)
+        ))
+        self.assertEqual(sorted(result.index for result in results), list(range(5)))
+        for result in results:
+            with self.subTest(index=result.index):
+                if result.index < 4:
+                    self.assertIsNone(result.error)
+                    self.assertTrue(os.path.exists(result.path))
+                else:
+                    self.assertIsInstance(result.error, ValueError)
+                    self.assertIsNone(result.seconds)
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from matplotlib.figure import Figure
+from pheatmap import pheatmap, HeatmapList
+from pheatmap._chunked import load_matrix, is_out_of_core, chunk_rows, reduce_chunks
+from pheatmap._downsample import downsample
+from pheatmap._heatmap import Heatmap
+
+
+class RowChunked:
+    """A minimal object of the chunked-array protocol"""
+    def __init__(self, mat):
+        self.mat = mat
+        self.shape = mat.shape
+        self.dtype = mat.dtype
+        self.chunks = (7, mat.shape[1])
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            raise TypeError("Only row slices are supported")
+        return self.mat[key].tolist()
+
+
+class test_chunked(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(0)
+        self.mat = rng.normal(size=(103, 29))
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "mat.npy")
+        np.save(self.path, self.mat)
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_load_matrix(self):
+        mat = load_matrix(self.path)
+        self.assertIsInstance(mat, np.memmap)
+        self.assertTrue(is_out_of_core(mat))
+        self.assertTrue(is_out_of_core(RowChunked(self.mat)))
+        self.assertFalse(is_out_of_core(self.mat))
+        self.assertEqual(chunk_rows(RowChunked(self.mat), chunk_bytes=8 * 29 * 10), 7)
+
+    def test_reduce_chunks(self):
+        rng = np.random.default_rng(1)
+        row_order, col_order = rng.permutation(103), rng.permutation(29)
+        ordered = self.mat[row_order][:, col_order]
+        for method in ["mean", "max", "min", "first"]:
+            with self.subTest(method=method):
+                reduced, vmin, vmax = reduce_chunks(
+                    RowChunked(self.mat), 10, 6, method, row_order, col_order, rows=9)
+                np.testing.assert_allclose(reduced, downsample(ordered, 10, 6, method))
+                self.assertEqual((vmin, vmax), (self.mat.min(), self.mat.max()))
+        with self.assertRaises(KeyError):
+            reduce_chunks(self.mat, 10, 6, "median")
+
+    def test_heatmap(self):
+        fig = Figure(figsize=(1, 1), dpi=20)
+        ax = fig.add_axes([0, 0, 1, 1])
+        ht = Heatmap(self.path, cmap="bwr")
+        self.assertEqual((ht.nrows, ht.ncols), self.mat.shape)
+        self.assertEqual(ht.norm.vmax, self.mat.max())
+        ht.draw(ax)
+        image = ax.get_images()[0]
+        self.assertEqual(image.get_array().shape[:2], (20, 20))
+        self.assertEqual(list(image.get_extent()), [-0.5, 28.5, 102.5, -0.5])
+        self.assertIsInstance(pheatmap(np.load(self.path, mmap_mode="r"), cluster_rows=True), Figure)
+
+    def test_path(self):
+        # A path has no row/column names, with the default `show_rownames` and `show_colnames`
+        fig = pheatmap(self.path)
+        self.assertEqual(fig.axes[0].get_yticklabels(), [])
+        self.assertIsInstance(HeatmapList([self.path, self.path]).plot(), Figure)
+
+    def test_percentile_limits(self):
+        ht = Heatmap(self.path, cmap="bwr", vmin="p1", vmax="p99")
+        np.testing.assert_allclose(
+            [ht.norm.vmin, ht.norm.vmax], np.percentile(self.mat, [1, 99]), atol=0.1)
@@ -0,0 +1,98 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+import numpy as np
+import pandas as pd
+from matplotlib.image import imread
+from pheatmap._cli import main, read_matrix, read_annotation, _align
+
+
+class test_cli(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(0)
+        self.mat = pd.DataFrame(
+            rng.normal(size=(50, 10)), index=[f"row{i}" for i in range(50)],
+            columns=[f"col{j}" for j in range(10)]
+        )
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "mat.tsv")
+        self.mat.to_csv(self.path, sep="\t")
+        # The rows of the annotation are in another order
+        self.anno_row = pd.DataFrame(
+            dict(group=["cab"[i % 3] for i in range(50)], value=np.arange(50.0)),
+            index=self.mat.index[::-1]
+        )
+        self.anno_row_path = os.path.join(self.tmpdir.name, "anno_row.csv")
+        self.anno_row.to_csv(self.anno_row_path)
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_read(self):
+        mat, rownames, colnames = read_matrix(self.path, self.tmpdir.name, rows=7)
+        self.assertIsInstance(mat, np.memmap)
+        np.testing.assert_allclose(mat, self.mat.to_numpy())
+        np.testing.assert_array_equal(rownames, self.mat.index)
+        np.testing.assert_array_equal(colnames, self.mat.columns)
+        mat, rownames, _ = read_matrix(self.path, self.tmpdir.name, dtype=np.float32, names=False)
+        self.assertEqual((mat.dtype, rownames), (np.float32, None))
+
+        anno = read_annotation(self.anno_row_path, rows=7)
+        self.assertEqual(anno["group"].cat.categories.to_list(), ["a", "b", "c"])
+        anno = _align(anno, self.mat.index.to_numpy())
+        pd.testing.assert_frame_equal(
+            anno.astype(dict(group=str)), self.anno_row.loc[self.mat.index])
+        # Rows which aren't annotated are listed, positions are only matched if asked
+        others = np.array([f"other{i}" for i in range(50)])
+        with self.assertRaisesRegex(ValueError, "50 names .* other0, other1, other2, other3"):
+            _align(anno, others)
+        with self.assertRaisesRegex(ValueError, "duplicated names: row0"):
+            _align(pd.concat([anno, anno.iloc[:1]]), self.mat.index.to_numpy())
+        self.assertIs(_align(anno, others, by_position=True), anno)
+        self.assertIs(_align(anno, None), anno)
+
+        bad = os.path.join(self.tmpdir.name, "bad.csv")
+        pd.DataFrame(dict(a=["x", "y"])).to_csv(bad)
+        with self.assertRaises(ValueError):
+            read_matrix(bad, self.tmpdir.name)
+
+    def test_main(self):
+        output = os.path.join(self.tmpdir.name, "heatmap.png")
+        stderr = io.StringIO()
+        with redirect_stderr(stderr):
+            code = main([
+                self.path, "-o", output, "--annotation-row", self.anno_row_path,
+                "--vmin", "p1", "--vmax", "p99", "--cluster-rows", "--rownames", "none", "-v"
+            ])
+        self.assertEqual(code, 0)
+        with open(output, "rb") as f:
+            self.assertTrue(f.read().startswith(b"\x89PNG"))
+        for name in ["read_matrix", "read_annotations", "draw_heatmap", "savefig", "total"]:
+            self.assertIn(name, stderr.getvalue())
+
+        output = os.path.join(self.tmpdir.name, "heatmap.pdf")
+        self.assertEqual(main([self.path, "-o", output, "--vmin", "-1.5", "--dtype", "float32"]), 0)
+        self.assertTrue(os.path.getsize(output) > 0)
+
+        npy = os.path.join(self.tmpdir.name, "mat.npy")
+        np.save(npy, self.mat.to_numpy())
+        self.assertEqual(main([npy, "-o", output]), 0)
+
+        # The rows of the annotation aren't the rows of the matrix
+        other = os.path.join(self.tmpdir.name, "other.csv")
+        self.anno_row.set_axis(self.anno_row.index + "x").to_csv(other)
+        with self.assertRaises(ValueError):
+            main([self.path, "-o", output, "--annotation-row", other, "--rownames", "none"])
+        self.assertEqual(
+            main([self.path, "-o", output, "--annotation-row", other, "--match-by-position"]), 0)
+
+        # The heatmap is drawn and downsampled at `--dpi`
+        output = os.path.join(self.tmpdir.name, "heatmap_dpi.png")
+        self.assertEqual(main([self.path, "-o", output, "--dpi", "50"]), 0)
+        self.assertEqual(imread(output).shape[:2], (300, 400))
+
+
+if __name__ == "__main__":
+    unittest.main()
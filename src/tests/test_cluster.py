@@ -0,0 +1,137 @@
+import unittest
+import numpy as np
+from pheatmap._cluster import (
+    pairwise_distances, linkage, leaves_order, cutree, cluster_order, approximate_cluster_order,
+    _lance_williams
+)
+from pheatmap._heatmap import Heatmap
+
+
+def greedy_linkage(dist: np.ndarray, method: str) -> np.ndarray:
+    """Merge the closest pair of all clusters every time, the reference of `linkage`"""
+    n = dist.shape[0]
+    dist = dist.copy()
+    np.fill_diagonal(dist, np.inf)
+    sizes, labels, active = np.ones(n), np.arange(n), np.ones(n, dtype=bool)
+    Z = []
+    for label in range(n, 2 * n - 1):
+        masked = np.where(active[:, None] & active[None, :], dist, np.inf)
+        x, y = sorted(np.unravel_index(np.argmin(masked), masked.shape))
+        Z.append([min(labels[x], labels[y]), max(labels[x], labels[y]), dist[x, y],
+                  sizes[x] + sizes[y]])
+        new = _lance_williams(dist, x, y, sizes, method)
+        new[x] = np.inf
+        dist[x] = dist[:, x] = new
+        sizes[x] += sizes[y]
+        active[y], labels[x] = False, label
+    return np.array(Z)
+
+
+class test_cluster(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(0)
+        self.X = rng.normal(size=(50, 8))
+        # Two well separated groups, interleaved
+        self.groups = np.arange(40) % 2
+        self.Y = rng.normal(size=(40, 8)) + self.groups[:, None] * 20
+
+    def test_pairwise_distances(self):
+        diff = self.X[:, None, :] - self.X[None, :, :]
+        euclidean = np.sqrt((diff ** 2).sum(axis=2))
+        np.testing.assert_allclose(pairwise_distances(self.X, block_size=7), euclidean, atol=1e-8)
+        correlation = 1 - np.corrcoef(self.X)
+        np.fill_diagonal(correlation, 0)
+        np.testing.assert_allclose(
+            pairwise_distances(self.X, "correlation", block_size=7), correlation, atol=1e-8)
+        with self.assertRaises(KeyError):
+            pairwise_distances(self.X, "manhattan")
+
+    def test_linkage(self):
+        dist = np.array([[0, 1, 4, 5], [1, 0, 3, 6], [4, 3, 0, 2], [5, 6, 2, 0]], dtype=float)
+        linkage_cases = {
+            "single": [[0, 1, 1, 2], [2, 3, 2, 2], [4, 5, 3, 4]],
+            "complete": [[0, 1, 1, 2], [2, 3, 2, 2], [4, 5, 6, 4]],
+            "average": [[0, 1, 1, 2], [2, 3, 2, 2], [4, 5, 4.5, 4]]
+        }
+        for method, Z in linkage_cases.items():
+            with self.subTest(method=method):
+                np.testing.assert_allclose(linkage(dist.copy(), method), Z)
+        with self.assertRaises(KeyError):
+            linkage(dist.copy(), "median")
+
+    def test_linkage_greedy(self):
+        # Enough rows to compact the distance matrix
+        X = np.random.default_rng(1).normal(size=(600, 5))
+        for method in ["single", "complete", "average", "ward"]:
+            with self.subTest(method=method):
+                dist = pairwise_distances(X)
+                np.testing.assert_allclose(
+                    linkage(dist.copy(), method), greedy_linkage(dist, method), rtol=1e-10)
+
+    def test_linkage_monotonic(self):
+        for method in ["single", "complete", "average", "ward"]:
+            with self.subTest(method=method):
+                Z = linkage(pairwise_distances(self.X), method)
+                self.assertTrue(np.all(np.diff(Z[:, 2]) >= -1e-12))
+                self.assertEqual(Z[-1, 3], self.X.shape[0])
+
+    def test_cluster_order(self):
+        for method in ["single", "complete", "average", "ward"]:
+            with self.subTest(method=method):
+                order = cluster_order(self.Y, method=method)
+                np.testing.assert_array_equal(np.sort(order), np.arange(self.Y.shape[0]))
+                # Rows of the same group are adjacent
+                self.assertEqual(np.count_nonzero(np.diff(self.groups[order])), 1)
+        np.testing.assert_array_equal(leaves_order(np.array([[0, 1, 1, 2]])), [0, 1])
+
+    def test_approximate_cluster_order(self):
+        rng = np.random.default_rng(1)
+        groups = rng.integers(0, 5, 3000)
+        Y = rng.normal(size=(3000, 8)) + groups[:, None] * 20
+        for metric in ["euclidean", "correlation"]:
+            with self.subTest(metric=metric):
+                order = cluster_order(Y, metric=metric, memory_limit=1e6)
+                np.testing.assert_array_equal(np.sort(order), np.arange(Y.shape[0]))
+        order = approximate_cluster_order(Y, memory_limit=1e6)
+        self.assertEqual(np.count_nonzero(np.diff(groups[order])), 4)
+        with self.assertRaises(ValueError):
+            approximate_cluster_order(Y, memory_limit=1e4)
+
+    def test_non_finite(self):
+        # NaN and infinite values are rejected by both the exact and the approximate clustering
+        for value in [np.nan, np.inf]:
+            Y = self.Y.copy()
+            Y[3, 2] = value
+            for metric in ["euclidean", "correlation"]:
+                for memory_limit in [None, 1e5]:
+                    with self.subTest(value=value, metric=metric, memory_limit=memory_limit):
+                        with self.assertRaises(ValueError):
+                            cluster_order(Y, metric=metric, memory_limit=memory_limit)
+        # The nearest-neighbor chain stops at a NaN distance instead of looping
+        dist = pairwise_distances(self.Y)
+        dist[3, 5] = dist[5, 3] = np.nan
+        with self.assertRaises(ValueError):
+            linkage(dist, "average")
+
+    def test_cutree(self):
+        Z = np.array([[0, 1, 1, 2], [2, 3, 2, 2], [4, 5, 5, 4]])
+        np.testing.assert_array_equal(cutree(Z, 1), [0, 0, 0, 0])
+        np.testing.assert_array_equal(cutree(Z, 2), [0, 0, 1, 1])
+        np.testing.assert_array_equal(cutree(Z, 3), [0, 0, 1, 2])
+        np.testing.assert_array_equal(cutree(Z, 10), [0, 1, 2, 3])
+        for memory_limit in [None, 1e6]:
+            with self.subTest(memory_limit=memory_limit):
+                order, clusters = cluster_order(
+                    self.Y, memory_limit=memory_limit, n_clusters=2)
+                np.testing.assert_array_equal(np.sort(order), np.arange(self.Y.shape[0]))
+                # The clusters are the groups, contiguous in the order
+                self.assertEqual(len(np.unique(clusters)), 2)
+                self.assertEqual(np.count_nonzero(np.diff(clusters[order])), 1)
+                np.testing.assert_array_equal(
+                    clusters == clusters[0], self.groups == self.groups[0])
+
+    def test_heatmap_order(self):
+        with self.assertRaises(ValueError):
+            Heatmap(self.X, cmap="bwr", row_order=np.zeros(50))
+        ht = Heatmap(self.X, cmap="bwr", row_order=np.arange(50)[::-1])
+        np.testing.assert_array_equal(ht._get_render_mat(None), self.X[::-1])
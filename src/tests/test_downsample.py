@@ -0,0 +1,98 @@
+import io
+import unittest
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.image import imread
+from pheatmap._downsample import (
+    bin_edges, split_bin_edges, binned_gaps, reduce_axis, downsample, axes_pixel_size
+)
+from pheatmap._heatmap import Heatmap
+from pheatmap._pheatmap import pheatmap, savefig_dpi
+
+
+class test_downsample(unittest.TestCase):
+    def setUp(self) -> None:
+        self.mat = np.arange(60, dtype=float).reshape(10, 6)
+
+    def test_bin_edges(self):
+        bin_edges_cases = {
+            (10, 5): [0, 2, 4, 6, 8],
+            (10, 3): [0, 3, 6],
+            (10, 20): np.arange(10),
+            (10, 0): [0]
+        }
+        for (num, nbins), starts in bin_edges_cases.items():
+            with self.subTest(num=num, nbins=nbins):
+                np.testing.assert_array_equal(bin_edges(num, nbins), starts)
+
+    def test_split_bin_edges(self):
+        # Every group gets bins in proportion to its cells, no bin crosses a gap
+        starts = split_bin_edges(100, 10, np.array([30, 31]))
+        np.testing.assert_array_equal(starts, [0, 10, 20, 30, 31, 40, 50, 60, 70, 80, 90])
+        np.testing.assert_array_equal(binned_gaps(100, 10, np.array([30, 31])), [3, 4])
+        np.testing.assert_array_equal(split_bin_edges(10, 5, np.array([], dtype=int)),
+                                      bin_edges(10, 5))
+        reduced = downsample(self.mat, 2, 6, "max", row_gaps=np.array([3]))
+        np.testing.assert_array_equal(reduced, self.mat[[2, 9]])
+
+    def test_reduce_axis(self):
+        starts = np.array([0, 3, 6])
+        methods = {
+            "mean": [1, 4, 7.5],
+            "max": [2, 5, 9],
+            "min": [0, 3, 6],
+            "first": [0, 3, 6]
+        }
+        values = np.arange(10).reshape(-1, 1)
+        for method, expected in methods.items():
+            with self.subTest(method=method):
+                reduced = reduce_axis(values, starts, method, axis=0)
+                np.testing.assert_array_equal(reduced.ravel(), expected)
+        with self.assertRaises(KeyError):
+            reduce_axis(values, starts, "median", axis=0)
+
+    def test_downsample(self):
+        reduced = downsample(self.mat, 5, 3, "mean")
+        self.assertEqual(reduced.shape, (5, 3))
+        self.assertAlmostEqual(reduced.mean(), self.mat.mean())
+        np.testing.assert_array_equal(downsample(self.mat, 100, 100, "max"), self.mat)
+
+    def test_axes_pixel_size(self):
+        fig = Figure(figsize=(2, 1), dpi=100)
+        ax = fig.add_axes([0, 0, 1, 1])
+        self.assertEqual(axes_pixel_size(ax), (100, 200))
+
+    def test_heatmap_draw(self):
+        fig = Figure(figsize=(1, 1), dpi=50)
+        ax = fig.add_axes([0, 0, 1, 1])
+        mat = np.random.rand(1000, 300)
+        Heatmap(mat, cmap="bwr", downsample="max").draw(ax)
+        image = ax.get_images()[0]
+        self.assertEqual(image.get_array().shape[:2], (50, 50))
+        self.assertEqual(list(image.get_extent()), [-0.5, 299.5, 999.5, -0.5])
+        with self.assertRaises(KeyError):
+            Heatmap(mat, cmap="bwr", downsample="median")
+
+    def test_dpi(self):
+        # The pixel grid is counted at the dpi the figure is saved at, so a higher dpi keeps more
+        # rows of the matrix and the annotation
+        mat = np.random.rand(3000, 200)
+        anno = pd.DataFrame(dict(group=np.arange(3000) // 10))
+        rows = dict()
+        for dpi in [100, 300]:
+            fig = pheatmap(mat, annotation_row=anno, downsample="mean", dpi=dpi)
+            self.assertEqual(fig.dpi, dpi)
+            images = {ax: ax.get_images()[0] for ax in fig.axes if ax.get_images()}
+            for ax, image in images.items():
+                self.assertEqual(image.get_array().shape[0], axes_pixel_size(ax)[0])
+            rows[dpi] = max(image.get_array().shape[0] for image in images.values())
+            # `savefig` uses the dpi of the figure by default
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format="png")
+            buffer.seek(0)
+            self.assertEqual(imread(buffer).shape[1], 8 * dpi)
+        self.assertGreater(rows[300], 2.5 * rows[100])
+        self.assertEqual(savefig_dpi(dict(), dict(dpi=300)), dict(dpi=300))
+        self.assertEqual(savefig_dpi(dict(dpi=200), dict(dpi=300)), dict(dpi=200))
+        self.assertEqual(savefig_dpi(dict(), dict(dpi="figure")), dict())
@@ -2,6 +2,7 @@ import unittest
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.colors import Colormap
+from matplotlib.figure import Figure
 from pheatmap._heatmap import Heatmap
 
 
@@ -105,3 +106,116 @@ class testHeatmap(unittest.TestCase):
                             self.mat, cmap="bwr", rownames=self.rownames, colnames=self.colnames,
                             rownames_side=kside[0], colnames_side=kside[1]
                         )
+
+    def test_names_positions(self):
+        fig = Figure(figsize=(4, 4), dpi=100)
+        ax = fig.add_axes([0, 0, 1, 1])
+        mat = np.zeros((1000, 5))
+        rownames = np.array([f"gene{i}" for i in range(1000)])
+
+        ht = Heatmap(mat, cmap="bwr", rownames=rownames, rownames_style=dict(size=6))
+        np.testing.assert_array_equal(ht._get_names_positions(ax, "row"), np.arange(1000))
+
+        # 288 points height, 7.2 points for every name
+        ht = Heatmap(mat, cmap="bwr", rownames=rownames, rownames_thinning=True,
+                     rownames_style=dict(size=6))
+        positions = ht._get_names_positions(ax, "row")
+        np.testing.assert_array_equal(positions, np.arange(0, 1000, 25))
+
+        ht = Heatmap(mat, cmap="bwr", rownames=rownames, rownames_highlight=["gene3", "gene1"],
+                     row_order=np.arange(1000)[::-1])
+        np.testing.assert_array_equal(ht._get_names_positions(ax, "row"), [996, 998])
+        ht.draw(ax)
+        labels = [label.get_text() for label in ax.get_yticklabels()]
+        self.assertEqual(labels, ["gene3", "gene1"])
+
+    def test_edges(self):
+        fig = Figure(figsize=(2, 2), dpi=100)
+        ax = fig.add_axes([0, 0, 1, 1])
+        ht = Heatmap(self.mat, cmap="bwr", edgecolor="black", edgewidth=1)
+        ht.draw(ax)
+        self.assertEqual(len(ax.collections), 1)
+        self.assertEqual(len(ax.collections[0].get_segments()), (self.nrows - 1) + (self.ncols - 1))
+        # Cells are narrower than the edge width
+        ht = Heatmap(np.zeros((1000, 5)), cmap="bwr", edgecolor="black", edgewidth=1)
+        self.assertEqual(len(ht._get_edges(ax)), 4)
+        for edgecolor in ["none", (0, 0, 0, 0)]:
+            with self.subTest(edgecolor=edgecolor):
+                ax = fig.add_axes([0, 0, 1, 1])
+                Heatmap(self.mat, cmap="bwr", edgecolor=edgecolor).draw(ax)
+                self.assertEqual(len(ax.collections), 0)
+                self.assertFalse(ax.spines["left"].get_visible())
+
+    def test_numbers(self):
+        fig = Figure(figsize=(8, 4), dpi=100)
+        ax = fig.add_axes([0, 0, 1, 1])
+        mat = self.mat.copy()
+        mat[0, 0] = np.nan
+        ht = Heatmap(mat, cmap="bwr", display_numbers=True, number_format="%.1f",
+                     row_order=np.arange(self.nrows)[::-1])
+        ht.draw(ax)
+        # One collection for all numbers, NaN is empty
+        self.assertEqual(len(ax.collections), 1)
+        offsets = ht.numbers.get_offsets()
+        self.assertEqual(len(offsets), self.nrows * self.ncols - 1)
+        self.assertIs(ht.numbers.get_offset_transform(), ax.transData)
+        # Numbers are white on the dark blue end of "bwr", black on the light middle
+        colors = dict(zip(map(tuple, offsets), map(tuple, ht.numbers.get_facecolors())))
+        self.assertEqual(colors[1, 9], (1, 1, 1, 1))
+        self.assertEqual(colors[10, 5], (0, 0, 0, 1))
+        fig.canvas.draw()
+
+        # Labels of cells, and a fixed color
+        labels = np.full(mat.shape, "", dtype=object)
+        labels[2, 3] = "*"
+        ht = Heatmap(mat, cmap="bwr", display_numbers=labels, number_color="red")
+        ht.draw(ax)
+        np.testing.assert_array_equal(ht.numbers.get_offsets(), [[3, 2]])
+        with self.assertRaises(ValueError):
+            Heatmap(mat, cmap="bwr", display_numbers=labels[:5])
+
+        # Cells smaller than the numbers
+        ht = Heatmap(np.zeros((200, 5)), cmap="bwr", display_numbers=True)
+        ht.draw(ax)
+        self.assertIsNone(ht.numbers)
+        ht = Heatmap(np.zeros((5, 200)), cmap="bwr", display_numbers=True)
+        ht.draw(ax)
+        self.assertIsNone(ht.numbers)
+
+    def test_gaps(self):
+        fig = Figure(figsize=(2, 2), dpi=100)
+        ax = fig.add_axes([0, 0, 1, 1])
+        ht = Heatmap(self.mat, cmap="bwr", rownames=self.rownames, gaps_row=[6, 3], gaps_col=[10],
+                     edgecolor="black", gap_size=4)
+        ht.draw(ax)
+        # Every group is a view of the image colored once
+        images = ax.get_images()
+        self.assertEqual(len(images), 6)
+        self.assertIs(ht.image, images[0])
+        np.testing.assert_array_equal(
+            np.concatenate([image.get_array() for image in images[::2]]),
+            ht.get_image(ax)[:, :10])
+        # A gap is 4 points, 0.5 of the cells in 1.44 inches
+        width = ht.gap_widths[0]
+        self.assertAlmostEqual(width, 4 * self.nrows / (144 - 2 * 4))
+        self.assertAlmostEqual(images[2].get_extent()[3], 2.5 + width)
+        self.assertEqual(ax.get_ylim(), (9.5 + 2 * width, -0.5))
+        np.testing.assert_allclose(ax.get_yticks()[2:5], [2, 3 + width, 4 + width])
+        # Edges outline every group, and don't cross the gaps
+        segments = ht._get_edges(ax)
+        self.assertEqual(len(segments), (7 + 6) * 2 + (18 + 4) * 3)
+        self.assertFalse(ax.spines["left"].get_visible())
+
+        # Downsampled groups don't share pixels
+        ax = fig.add_axes([0, 0, 1, 1])
+        mat = np.repeat([[0.], [1.]], 500, axis=0)
+        ht = Heatmap(mat, cmap="bwr", downsample="mean", gaps_row=[500])
+        ht.draw(ax)
+        top, bottom = (image.get_array() for image in ax.get_images())
+        self.assertEqual(len(np.unique(top.reshape(-1, 4), axis=0)), 1)
+        self.assertEqual(len(np.unique(bottom.reshape(-1, 4), axis=0)), 1)
+
+        for gaps in [[0], [self.nrows]]:
+            with self.subTest(gaps=gaps):
+                with self.assertRaises(ValueError):
+                    Heatmap(self.mat, cmap="bwr", gaps_row=gaps)
@@ -0,0 +1,102 @@
+import unittest
+import numpy as np
+import pandas as pd
+from pheatmap import HeatmapList, profile
+
+
+def visible_labels(fig) -> list:
+    """Get the texts of the visible tick labels of all Axes"""
+    fig.canvas.draw()
+    return [
+        label.get_text() for ax in fig.axes
+        for label in ax.get_xticklabels() + ax.get_yticklabels() if label.get_visible()
+    ]
+
+
+class test_heatmap_list(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(0)
+        index = [f"gene{i}" for i in range(40)]
+        self.mats = [
+            pd.DataFrame(rng.normal(size=(40, ncols)), index=index) for ncols in [12, 8, 5]
+        ]
+        self.anno_row = pd.DataFrame(dict(
+            group=rng.choice(["a", "b", "c"], 40), score=rng.random(40)), index=index)
+        self.anno_col = pd.DataFrame(dict(batch=rng.choice(["x", "y"], 8)))
+
+    def test_horizontal(self):
+        heatmaps = HeatmapList(
+            self.mats, panels=[dict(name="RNA"), dict(name="ATAC", annotation_col=self.anno_col),
+                               dict(name="protein", cmap="Reds", cluster_cols=True)],
+            cluster_rows=True, cutree_rows=3, annotation_row=self.anno_row, vmin=-3, vmax=3
+        )
+        first = heatmaps.heatmaps[0]
+        self.assertEqual(len(first.gaps_row), 2)
+        # The rows are ordered and split once, by the main matrix
+        for heatmap in heatmaps.heatmaps[1:]:
+            np.testing.assert_array_equal(heatmap.row_order, first.row_order)
+            np.testing.assert_array_equal(heatmap.gaps_row, first.gaps_row)
+        self.assertIsNone(first.col_order)
+        self.assertIsNotNone(heatmaps.heatmaps[2].col_order)
+        # The row names are shown by the last heatmap only
+        self.assertEqual([heatmap.rownames is not None for heatmap in heatmaps.heatmaps],
+                         [False, False, True])
+        self.assertIsNone(heatmaps.annotationbars[0])
+
+        # "RNA" and "ATAC" have the same colors, but their own names
+        names = [legend.name for legend in heatmaps.create_legends()]
+        self.assertEqual(names, ["RNA", "group", "score", "ATAC", "batch", "protein"])
+        with profile() as prof:
+            fig = heatmaps.plot()
+        # 3 heatmaps, 2 row annotations, 1 column annotation and 6 legends
+        self.assertEqual(prof.artists["axes"], 12)
+        self.assertEqual(len(fig.axes), 12)
+        self.assertEqual(visible_labels(fig).count("batch"), 1)
+
+    def test_annotation_names(self):
+        # A name is hidden only if the next heatmap shows a bar of the same name next to it
+        for panels, count in [([0, 1], 1), ([0, 2], 2), ([1], 1)]:
+            with self.subTest(panels=panels):
+                annotations = [
+                    pd.DataFrame(dict(batch=np.resize(["x", "y"], mat.shape[1])))
+                    for mat in self.mats
+                ]
+                heatmaps = HeatmapList(self.mats, panels=[
+                    dict(annotation_col=anno) if i in panels else dict()
+                    for i, anno in enumerate(annotations)
+                ])
+                labels = visible_labels(heatmaps.plot())
+                self.assertEqual(labels.count("batch"), count)
+
+    def test_vertical(self):
+        mats = [mat.T for mat in self.mats[:2]]
+        heatmaps = HeatmapList(
+            mats, direction="vertical", panels=[dict(), dict(annotation_row=self.anno_col)],
+            cluster_cols=True, annotation_col=self.anno_row, colnames_side="top", vmin=-3, vmax=3
+        )
+        self.assertEqual([heatmap.colnames is not None for heatmap in heatmaps.heatmaps],
+                         [True, False])
+        np.testing.assert_array_equal(
+            heatmaps.heatmaps[0].col_order, heatmaps.heatmaps[1].col_order)
+        # The same colors and names are drawn once
+        names = [legend.name for legend in heatmaps.create_legends()]
+        self.assertEqual(names, ["heatmap", "group", "score", "batch"])
+        fig = heatmaps.plot(panel_ratios=[3, 2])
+        self.assertEqual(len(fig.axes), 9)
+
+    def test_options(self):
+        with self.assertRaises(KeyError):
+            HeatmapList(self.mats, direction="diagonal")
+        with self.assertRaises(ValueError):
+            HeatmapList(self.mats, panels=[dict(), dict()])
+        # The shared rows can't be set for one heatmap
+        with self.assertRaises(ValueError):
+            HeatmapList(self.mats, panels=[dict(), dict(cluster_rows=True), dict()])
+        with self.assertRaises(ValueError):
+            HeatmapList([self.mats[0], self.mats[1].iloc[:30]])
+        with self.assertRaises(ValueError):
+            HeatmapList(self.mats).plot(panel_ratios=[1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,26 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+# The source tree of the package, which the fresh interpreter imports as the tests do
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _loaded(statement: str, modules: list) -> list:
+    """Run `statement` in a fresh interpreter, return the `modules` it loaded"""
+    check = f"import sys, json; print(json.dumps([m for m in {modules!r} if m in sys.modules]))"
+    pythonpath = os.pathsep.join([SRC] + os.environ.get("PYTHONPATH", "").split(os.pathsep))
+    result = subprocess.run(
+        [sys.executable, "-c", f"{statement}; {check}"], check=True, capture_output=True,
+        text=True, env={**os.environ, "PYTHONPATH": pythonpath.rstrip(os.pathsep)}
+    )
+    return json.loads(result.stdout)
+
+
+class test_import(unittest.TestCase):
+    def test_lazy_import(self):
+        self.assertEqual(_loaded("import pheatmap", ["matplotlib", "pandas"]), [])
+        self.assertEqual(
+            _loaded("from pheatmap import pheatmap", ["matplotlib.pyplot", "pandas"]), [])
@@ -0,0 +1,58 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from pheatmap import pheatmap_pages, profile
+from tests.test_chunked import RowChunked
+
+
+def count_pages(path: str) -> int:
+    with open(path, "rb") as f:
+        data = f.read()
+    return data.count(b"/Type /Page ")
+
+
+class test_pages(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(0)
+        self.mat = pd.DataFrame(
+            rng.normal(size=(130, 8)), index=[f"row{i}" for i in range(130)])
+        self.anno_row = pd.DataFrame(dict(
+            group=rng.choice(["a", "b", "c"], 130), value=rng.random(130)), index=self.mat.index)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "pages.pdf")
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_pages(self):
+        with profile() as prof:
+            num_pages = pheatmap_pages(
+                self.mat, self.path, rows_per_page=50, annotation_row=self.anno_row,
+                vmin="p1", vmax="p99", cluster_rows=True, cluster_cols=True
+            )
+        self.assertEqual(num_pages, 3)
+        self.assertEqual(count_pages(self.path), 3)
+        # The last page has no legends, only the heatmap and 2 annotation bars
+        self.assertEqual(prof.artists["axes"], 3)
+
+        with profile() as prof:
+            pheatmap_pages(
+                RowChunked(self.mat.to_numpy()), self.path, rows_per_page=100,
+                annotation_row=self.anno_row, page_legends="all", show_rownames=False
+            )
+        self.assertEqual(count_pages(self.path), 2)
+        self.assertEqual(prof.artists["axes"], 6)
+
+    def test_options(self):
+        with self.assertRaises(KeyError):
+            pheatmap_pages(self.mat, self.path, page_legends="last")
+        with self.assertRaises(ValueError):
+            pheatmap_pages(self.mat, self.path, rows_per_page=0)
+        with self.assertRaises(ValueError):
+            pheatmap_pages(self.mat, self.path, show_legends=False)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,7 +2,12 @@ import unittest
 import numpy as np
 import pandas as pd
 import os
-from pheatmap import pheatmap
+import gc
+import io
+import weakref
+import matplotlib.pyplot as plt
+from concurrent.futures import ThreadPoolExecutor
+from pheatmap import pheatmap, profile
 
 
 class test_pheatmap(unittest.TestCase):
@@ -34,6 +39,97 @@ class test_pheatmap(unittest.TestCase):
         fig.savefig("pheatmap.png")
         fig.savefig("pheatmap.pdf")
 
+    def test_limits(self):
+        fig = pheatmap(
+            self.mat, vmin="symmetric", vmax="p90", annotation_row=self.anno_row,
+            annotation_row_limits={"anno1": ("p10", 5)}
+        )
+        # Axes of heatmap, two row annotations, then legends of heatmap and annotations
+        heatmap_vmax, heatmap_vmin = fig.axes[3].get_ylim()
+        self.assertAlmostEqual(heatmap_vmin, -heatmap_vmax)
+        self.assertAlmostEqual(heatmap_vmax, np.percentile(self.mat, 90), delta=0.05)
+        self.assertEqual(fig.axes[4].get_ylim(), (5, 0))
+
+    def test_profile(self):
+        calls = []
+        with profile(callback=lambda name, seconds: calls.append(name)) as prof:
+            fig = pheatmap(self.mat, annotation_row=self.anno_row, annotation_col=self.anno_col)
+            with prof.stage("savefig"):
+                fig.savefig(io.BytesIO(), format="png", dpi=20)
+        self.assertEqual(list(prof.stages), [
+            "prepare_matrix", "cluster", "annotations", "legends", "layout", "draw_heatmap",
+            "draw_annotations", "draw_legends", "savefig"
+        ])
+        self.assertEqual(calls.count("prepare_matrix"), 2)
+        self.assertAlmostEqual(prof.total, sum(prof.stages.values()))
+        self.assertEqual(prof.artists["axes"], 10)
+        self.assertEqual(prof.artists["images"], 5)
+        # Disabled outside the context
+        pheatmap(self.mat)
+        self.assertEqual(calls.count("prepare_matrix"), 2)
+
+    def test_return_handle(self):
+        handle = pheatmap(
+            self.mat, annotation_row=self.anno_row, annotation_col=self.anno_col,
+            return_handle=True
+        )
+        fig, axes = handle.fig, handle.fig.axes
+        image = handle.heatmap.image
+
+        # Values change in place, the layout and artists are kept
+        with profile() as prof:
+            handle.update(mat=self.mat * 2, annotation_row=self.anno_row.assign(anno1=-1))
+        self.assertEqual(list(prof.stages), ["update"])
+        self.assertIs(handle.fig, fig)
+        self.assertEqual(fig.axes, axes)
+        self.assertIs(handle.heatmap.image, image)
+        np.testing.assert_array_equal(
+            image.get_array(), pheatmap(self.mat * 2).axes[0].get_images()[0].get_array())
+        self.assertEqual(handle.legends[0].cbar.ax.get_ylim(), (2, -2))
+        self.assertEqual(handle.legends[0].labels[0], -2)
+
+        # New shapes or categories are laid out again in the same figure
+        handle.update(mat=self.mat.iloc[:5], annotation_row=self.anno_row.iloc[:5])
+        self.assertIs(handle.fig, fig)
+        self.assertEqual(handle.heatmap.nrows, 5)
+        handle.update(annotation_col=self.anno_col.assign(anno4="D"))
+        self.assertEqual(list(handle.legends[-1].labels), ["D"])
+        fig.savefig(io.BytesIO(), format="png", dpi=20)
+
+    def test_gaps(self):
+        rng = np.random.default_rng(0)
+        mat = np.vstack([rng.normal(size=(5, 10)), rng.normal(size=(5, 10)) + 10])[::-1]
+        handle = pheatmap(
+            mat, cluster_rows=True, cutree_rows=2, gaps_row=[1], gaps_col=[3, 7],
+            annotation_row=self.anno_row, annotation_col=self.anno_col, annotation_composite=True,
+            return_handle=True
+        )
+        # `gaps_row` is ignored for clustered rows as R's pheatmap
+        np.testing.assert_array_equal(handle.heatmap.gaps_row, [5])
+        np.testing.assert_array_equal(handle.col_annotationbars.annotationbars[0].gaps, [3, 7])
+        self.assertEqual(len(handle.heatmap.images), 2 * 3)
+        self.assertEqual(len(handle.row_annotationbars.images), 2)
+        self.assertEqual(len(handle.col_annotationbars.images), 3)
+        images = handle.heatmap.images
+        handle.update(mat=mat * 2)
+        self.assertEqual(handle.heatmap.images, images)
+        handle.fig.savefig(io.BytesIO(), format="png", dpi=20)
+
+    def test_threads(self):
+        figs = []
+
+        def render(i):
+            fig = pheatmap(self.mat * i, show_rownames=False, show_colnames=False)
+            fig.savefig(io.BytesIO(), format="png", dpi=20)
+            figs.append(weakref.ref(fig))
+
+        with ThreadPoolExecutor(4) as executor:
+            list(executor.map(render, range(100)))
+        gc.collect()
+        self.assertEqual(plt.get_fignums(), [])
+        self.assertEqual(len(figs), 100)
+        self.assertTrue(all(fig() is None for fig in figs))
+
     def tearDown(self) -> None:
         for file in ["pheatmap.png", "pheatmap.pdf"]:
             if os.path.exists(file):
@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from pheatmap import RenderCache
+
+
+class test_render_cache(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(0)
+        self.mat = rng.normal(size=(20, 10))
+        self.anno_col = pd.DataFrame(dict(
+            group=["ab"[i % 2] for i in range(10)], value=np.arange(10.0)))
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = RenderCache(self.tmpdir.name)
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_key(self):
+        key = self.cache.key(self.mat, annotation_col=self.anno_col)
+        # Arguments equal to their defaults are the same key
+        self.assertEqual(key, self.cache.key(self.mat, annotation_col=self.anno_col, cmap="bwr"))
+        # Not contiguous matrices are hashed by chunks
+        self.assertEqual(
+            self.cache.key(np.asfortranarray(self.mat)), self.cache.key(self.mat.copy()))
+        changed = [
+            self.cache.key(self.mat, annotation_col=self.anno_col, format="pdf"),
+            self.cache.key(self.mat, annotation_col=self.anno_col, savefig_kwargs=dict(dpi=300)),
+            self.cache.key(self.mat * 2, annotation_col=self.anno_col),
+            self.cache.key(self.mat, annotation_col=self.anno_col.iloc[::-1]),
+            self.cache.key(self.mat, annotation_col=self.anno_col.astype(dict(
+                group=pd.CategoricalDtype(["b", "a"])))),
+            self.cache.key(pd.DataFrame(self.mat), annotation_col=self.anno_col),
+        ]
+        self.assertEqual(len(set(changed + [key])), len(changed) + 1)
+        with self.assertRaises(TypeError):
+            self.cache.key(self.mat, rownames_highlight=lambda name: True)
+
+    def test_render(self):
+        data = self.cache.render(self.mat, annotation_col=self.anno_col)
+        self.assertTrue(data.startswith(b"\x89PNG"))
+        self.assertEqual(self.cache.render(self.mat, annotation_col=self.anno_col), data)
+        info = self.cache.cache_info()
+        self.assertEqual((info["hits"], info["misses"], info["entries"]), (1, 1, 1))
+        self.assertEqual(info["bytes"], len(data))
+
+        path = os.path.join(self.tmpdir.name, "heatmap.pdf")
+        self.cache.savefig(path, self.mat, format="pdf")
+        with open(path, "rb") as f:
+            self.assertTrue(f.read().startswith(b"%PDF"))
+        # Other processes see the entries
+        self.assertEqual(RenderCache(self.tmpdir.name).cache_info()["entries"], 2)
+        with self.assertRaises(ValueError):
+            self.cache.render(self.mat, return_handle=True)
+
+        self.cache.clear()
+        self.assertEqual(self.cache.cache_info()["entries"], 0)
+
+    def test_evict(self):
+        first = self.cache.render(self.mat, savefig_kwargs=dict(dpi=20))
+        self.cache.max_bytes = int(len(first) * 2.5)
+        self.cache.render(self.mat * 2, savefig_kwargs=dict(dpi=20))
+        # Hits are the recently used, so the second entry is the least recently used
+        key = self.cache.key(self.mat * 2, savefig_kwargs=dict(dpi=20))
+        os.utime(self.cache._path(key, "png"), (0, 0))
+        self.cache.render(self.mat * 3, savefig_kwargs=dict(dpi=20))
+        info = self.cache.cache_info()
+        self.assertEqual((info["evictions"], info["entries"]), (1, 2))
+        self.assertLessEqual(info["bytes"], self.cache.max_bytes)
+        self.cache.render(self.mat, savefig_kwargs=dict(dpi=20))
+        self.assertEqual(self.cache.cache_info()["hits"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
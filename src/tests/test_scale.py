@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+from pheatmap import pheatmap
+from pheatmap._scale import scale_matrix, column_stats, row_stats, ScaledMatrix
+from pheatmap._heatmap import Heatmap
+
+
+class test_scale(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(0)
+        self.mat = rng.normal(size=(300, 40)) * rng.uniform(1, 100, 40) + 1000
+        self.mat[3, 5] = np.nan
+        df = pd.DataFrame(self.mat)
+        self.expected = {
+            "row": df.sub(df.mean(axis=1), axis=0).div(df.std(axis=1), axis=0).to_numpy(),
+            "column": ((df - df.mean()) / df.std()).to_numpy()
+        }
+
+    def test_scale_matrix(self):
+        for scale, expected in self.expected.items():
+            with self.subTest(scale=scale):
+                np.testing.assert_allclose(scale_matrix(self.mat, scale), expected, atol=1e-10)
+                scaled = scale_matrix(self.mat, scale, dtype=np.float32)
+                self.assertEqual(scaled.dtype, np.float32)
+                np.testing.assert_allclose(scaled, expected, atol=1e-4)
+                mat = self.mat.copy()
+                self.assertIs(scale_matrix(mat, scale, inplace=True), mat)
+                np.testing.assert_allclose(mat, expected, atol=1e-10)
+        self.assertIs(scale_matrix(self.mat, "none"), self.mat)
+        with self.assertRaises(KeyError):
+            scale_matrix(self.mat, "both")
+        with self.assertRaises(ValueError):
+            scale_matrix(self.mat, "row", dtype=np.float32, inplace=True)
+
+    def test_column_stats(self):
+        mean, std = column_stats(self.mat)
+        np.testing.assert_allclose(mean, np.nanmean(self.mat, axis=0))
+        np.testing.assert_allclose(std, np.nanstd(self.mat, axis=0, ddof=1))
+        mean, std = row_stats(self.mat)
+        np.testing.assert_allclose(mean, np.nanmean(self.mat, axis=1))
+        np.testing.assert_allclose(std, np.nanstd(self.mat, axis=1, ddof=1))
+
+    def test_out_of_core(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "mat.npy")
+            np.save(path, self.mat)
+            mat = np.load(path, mmap_mode="r")
+            for scale, expected in self.expected.items():
+                with self.subTest(scale=scale):
+                    scaled = scale_matrix(mat, scale)
+                    self.assertIsInstance(scaled, ScaledMatrix)
+                    np.testing.assert_allclose(scaled[10:20], expected[10:20], atol=1e-10)
+                    np.testing.assert_allclose(np.asarray(scaled), expected, atol=1e-10)
+                    ht = Heatmap(scaled, cmap="bwr")
+                    self.assertAlmostEqual(ht.norm.vmax, np.nanmax(expected))
+                    # The scaled columns are read from the transpose
+                    np.testing.assert_allclose(scaled.T[5:9], expected.T[5:9], atol=1e-10)
+                    np.testing.assert_allclose(scaled.T[7], expected.T[7], atol=1e-10)
+                    np.testing.assert_allclose(np.asarray(scaled.T), expected.T, atol=1e-10)
+                    self.assertIs(scaled.T.T, scaled)
+            del mat
+
+            np.save(path, np.nan_to_num(self.mat))
+            for scale in ["row", "column"]:
+                with self.subTest(scale=scale):
+                    fig = pheatmap(path, scale=scale, cluster_rows=True, cluster_cols=True)
+                    self.assertIsInstance(fig, Figure)
+                    # The approximate clustering of columns reads them by batches
+                    fig = pheatmap(path, scale=scale, cluster_cols=True,
+                                   clustering_memory_limit=2**17)
+                    self.assertIsInstance(fig, Figure)
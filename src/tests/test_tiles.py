@@ -0,0 +1,81 @@
+import os
+import json
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from PIL import Image
+from pheatmap import export_tiles
+from pheatmap._utils import get_cmap, get_norm, map_colors
+from pheatmap._downsample import downsample
+from tests.test_chunked import RowChunked
+
+
+def read_level(path: str, level: int, tile_size: int) -> np.ndarray:
+    """Assemble the tiles of a DZI level"""
+    level_dir = os.path.join(path, str(level))
+    tiles = dict()
+    for file in os.listdir(level_dir):
+        col, row = map(int, os.path.splitext(file)[0].split("_"))
+        tiles[row, col] = np.asarray(Image.open(os.path.join(level_dir, file)))
+    nrows, ncols = max(row for row, _ in tiles) + 1, max(col for _, col in tiles) + 1
+    return np.concatenate([
+        np.concatenate([tiles[row, col] for col in range(ncols)], axis=1)
+        for row in range(nrows)
+    ], axis=0)
+
+
+class test_tiles(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(0)
+        self.mat = rng.normal(size=(150, 100))
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = self.tmpdir.name
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_dzi(self):
+        anno_row = pd.DataFrame(dict(group=["ab"[i % 2] for i in range(150)]))
+        manifest = export_tiles(
+            self.mat, self.path, annotation_row=anno_row, tile_size=32, bar_size=5, n_workers=2)
+        with open(os.path.join(self.path, "manifest.json")) as f:
+            self.assertEqual(json.load(f), manifest)
+        heatmap, bar = manifest["images"]
+        self.assertEqual((heatmap["x"], heatmap["width"], heatmap["height"]), (6, 100, 150))
+        self.assertEqual(heatmap["levels"], 9)
+        self.assertEqual(manifest["legends"][1]["categories"].keys(), {"a", "b"})
+        self.assertTrue(os.path.exists(os.path.join(self.path, "heatmap.dzi")))
+
+        # The full resolution is the colored matrix, the level below aggregates 2 x 2 values
+        cmap, norm = get_cmap("bwr"), get_norm(self.mat, None, None)
+        files = os.path.join(self.path, "heatmap_files")
+        np.testing.assert_array_equal(read_level(files, 8, 32), map_colors(self.mat, cmap, norm))
+        np.testing.assert_array_equal(
+            read_level(files, 7, 32), map_colors(downsample(self.mat, 75, 50), cmap, norm))
+        self.assertEqual(read_level(files, 0, 32).shape, (1, 1, 4))
+        level = read_level(os.path.join(self.path, "annotation_row_0_files"), 8, 32)
+        self.assertEqual(level.shape, (150, 5, 4))
+        self.assertFalse(np.array_equal(level[0], level[1]))
+
+    def test_xyz(self):
+        manifest = export_tiles(
+            RowChunked(self.mat), self.path, tile_size=32, layout="xyz", cell_width=2)
+        self.assertEqual(manifest["images"][0]["levels"], 4)
+        # Zoom 0 fits in one tile, tiles at the edges are padded
+        tile = np.asarray(Image.open(os.path.join(self.path, "heatmap", "0", "0", "0.png")))
+        self.assertEqual(tile.shape, (32, 32, 4))
+        self.assertEqual(tile[-1, -1, 3], 0)
+        self.assertEqual(len(os.listdir(os.path.join(self.path, "heatmap", "3"))), 7)
+
+    def test_options(self):
+        with self.assertRaises(KeyError):
+            export_tiles(self.mat, self.path, layout="tms")
+        with self.assertRaises(KeyError):
+            export_tiles(self.mat, self.path, tile_format="gif")
+        with self.assertRaises(ValueError):
+            export_tiles(self.mat, self.path, tile_size=255)
+
+
+if __name__ == "__main__":
+    unittest.main()
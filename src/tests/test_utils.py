@@ -0,0 +1,154 @@
+import unittest
+import warnings
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.colors import Normalize, BoundaryNorm, LogNorm, ListedColormap
+from pheatmap._utils import (
+    get_lut, map_colors, resample_cmap, get_norm, get_cmap, cycle_cmap, cmap_cache_info,
+    clear_cmap_cache, CMAP_CACHE_SIZE, DISCRETE
+)
+from pheatmap._sketch import QuantileSketch, SORT_LIMIT
+
+
+class test_lut(unittest.TestCase):
+    def setUp(self) -> None:
+        self.values = np.random.default_rng(0).normal(size=(300, 70))
+        self.values[0, 0] = np.nan
+        self.values[1, 1], self.values[2, 2] = 2, -2
+        self.values[3, 3], self.values[4, 4] = np.inf, -np.inf
+        self.cmap = plt.colormaps["bwr"].with_extremes(under="g", over="y", bad="k")
+
+    def test_get_lut(self):
+        lut = get_lut(self.cmap)
+        self.assertEqual(lut.shape, (self.cmap.N + 3, 4))
+        self.assertEqual(lut.dtype, np.uint8)
+        np.testing.assert_array_equal(lut[[0, -2, -1]], [[0, 127, 0, 255], [191, 191, 0, 255], [0, 0, 0, 255]])
+
+    def test_map_colors(self):
+        norms = [Normalize(-2, 2), Normalize(-1, 1), LogNorm(0.1, 2)]
+        for norm in norms:
+            for n_threads in [1, 4]:
+                with self.subTest(norm=norm, n_threads=n_threads):
+                    np.testing.assert_array_equal(
+                        map_colors(self.values, self.cmap, norm, n_threads=n_threads),
+                        self.cmap(norm(self.values), bytes=True)
+                    )
+
+    def test_map_colors_same_limits(self):
+        values, norm = self.values, Normalize(0, 0)
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", RuntimeWarning)
+            image = map_colors(values, self.cmap, norm)
+        # Finite values are the same as matplotlib, the first color
+        finite = np.isfinite(values)
+        np.testing.assert_array_equal(
+            image[finite], self.cmap(norm(values), bytes=True)[finite])
+        lut = get_lut(self.cmap)
+        np.testing.assert_array_equal(image[1:, 0], lut[np.ones(299, dtype=int)])
+        # NaN is bad, infinities are over and under
+        np.testing.assert_array_equal(image[[0, 3, 4], [0, 3, 4]], lut[[-1, -2, 0]])
+
+    def test_map_colors_discrete(self):
+        cmap = ListedColormap(list("rgbyk"))
+        norm = BoundaryNorm(np.arange(-0.5, 5), 5)
+        codes = np.arange(100).reshape(1, -1) % 5
+        np.testing.assert_array_equal(map_colors(codes, cmap, norm), cmap(norm(codes), bytes=True))
+
+    def test_resample_cmap(self):
+        self.assertIs(resample_cmap(self.cmap), self.cmap)
+        self.assertEqual(resample_cmap(self.cmap, 4096).N, 4096)
+
+
+class test_norm(unittest.TestCase):
+    def setUp(self) -> None:
+        self.values = np.random.default_rng(0).normal(size=(1000, 50))
+        self.values[0, 0], self.values[1, 1] = 1000, np.nan
+
+    def test_get_norm(self):
+        norm = get_norm(self.values, None, None)
+        self.assertEqual((norm.vmin, norm.vmax), (np.nanmin(self.values), 1000))
+        norm = get_norm(self.values, "p1", "p99")
+        expected = np.nanpercentile(self.values, [1, 99])
+        np.testing.assert_allclose([norm.vmin, norm.vmax], expected, atol=0.05)
+        norm = get_norm(self.values, "symmetric", 2)
+        self.assertEqual((norm.vmin, norm.vmax), (-2, 2))
+        norm = get_norm(self.values, "symmetric", "symmetric")
+        self.assertEqual((norm.vmin, norm.vmax), (-1000, 1000))
+        for limit in ["q99", "p101", "max"]:
+            with self.subTest(limit=limit):
+                with self.assertRaises(KeyError):
+                    get_norm(self.values, None, limit)
+
+    def test_quantile_sketch(self):
+        values = self.values[~np.isnan(self.values)]
+        merged = QuantileSketch(k=512)
+        for chunk in np.array_split(values, 7):
+            merged.merge(QuantileSketch(k=512).update(chunk))
+        q = np.array([0, 0.01, 0.5, 0.99, 1])
+        ranks = np.searchsorted(np.sort(values), merged.quantile(q)) / values.size
+        np.testing.assert_allclose(ranks, [0, 0.01, 0.5, 0.99, 1 - 1 / values.size], atol=0.01)
+        self.assertEqual(merged.count, values.size)
+        self.assertTrue(np.isnan(QuantileSketch().quantile(0.5)))
+
+    def test_quantile_sketch_rank_error(self):
+        # Inputs larger than `SORT_LIMIT` are compacted deterministically by sorted pieces, the
+        # rank error is bounded by about log2(n / k) / k, not 1 / sqrt(k) of sampling
+        rng = np.random.default_rng(1)
+        values = rng.standard_exponential(3 * SORT_LIMIT + 12345)
+        q = np.linspace(0.001, 0.999, 999)
+        expected = np.sort(values)
+        for k in [1024, 4096]:
+            with self.subTest(k=k):
+                sketch = QuantileSketch(k=k).update(values)
+                ranks = np.searchsorted(expected, sketch.quantile(q)) / values.size
+                self.assertLess(np.abs(ranks - q).max(), np.log2(values.size / k) / k)
+                self.assertLess(sum(level.size for level in sketch.levels), 4 * k)
+
+
+class test_cmap_cache(unittest.TestCase):
+    def setUp(self) -> None:
+        clear_cmap_cache()
+
+    def test_get_cmap(self):
+        cmaps = [get_cmap(["red", "white", "blue"]) for _ in range(3)]
+        self.assertIs(cmaps[0], cmaps[2])
+        self.assertIsNot(get_cmap(["red", "white", "blue"], DISCRETE), cmaps[0])
+        listed = [ListedColormap(plt.colormaps["Set1"].colors) for _ in range(2)]
+        self.assertIs(get_cmap(listed[0], DISCRETE), get_cmap(listed[1], DISCRETE))
+        self.assertIs(cycle_cmap(get_cmap("Set1", DISCRETE), 20), cycle_cmap(get_cmap("Set1", DISCRETE), 20))
+        self.assertIs(resample_cmap(get_cmap("bwr"), 16), resample_cmap(get_cmap("bwr"), 16))
+        self.assertIs(get_lut(cmaps[0]), get_lut(cmaps[1]))
+        self.assertFalse(get_lut(cmaps[0]).flags.writeable)
+        with self.assertRaises(TypeError):
+            get_cmap("bwr", DISCRETE)
+
+        info = cmap_cache_info()
+        self.assertEqual(info["lut"], dict(hits=2, misses=1, maxsize=CMAP_CACHE_SIZE, currsize=1))
+        self.assertGreater(info["cmap"]["hits"], 0)
+        clear_cmap_cache()
+        self.assertEqual(cmap_cache_info()["cmap"]["currsize"], 0)
+
+    def test_read_only(self):
+        # A render changing the shared Colormap would change the colors of the next render
+        cmap = get_cmap("bwr")
+        lut = get_lut(cmap).copy()
+        for method in ["set_bad", "set_under", "set_over"]:
+            with self.subTest(method=method):
+                with self.assertRaises(ValueError):
+                    getattr(cmap, method)("g")
+        with self.assertRaises(ValueError):
+            cmap.set_extremes(bad="g")
+        with self.assertRaises(ValueError):
+            get_cmap("Set1", DISCRETE).set_bad("g")
+        self.assertIs(get_cmap("bwr"), cmap)
+        np.testing.assert_array_equal(get_lut(get_cmap("bwr")), lut)
+
+        # Copies are writable and have their own lookup tables
+        for copied in [cmap.copy(), cmap.with_extremes(bad="g")]:
+            copied.set_bad("g")
+            self.assertNotIsInstance(copied, type(cmap))
+            np.testing.assert_array_equal(get_lut(copied)[-1], [0, 127, 0, 255])
+            np.testing.assert_array_equal(get_lut(copied)[1:-2], lut[1:-2])
+        np.testing.assert_array_equal(get_lut(get_cmap("bwr")), lut)
+        self.assertEqual(resample_cmap(cmap, 16).N, 16)
+        self.assertIsNotNone(cmap.reversed())